@@ -8,6 +8,7 @@ import stanza
 import time
 import datetime
 from eia_crawling.spiders.utils import write_csv
+from eia_crawling.parsing.row_sinks import glob_parsed_outputs, open_parsed_output
 import os
 import sys
 
@@ -176,11 +177,10 @@ def main(country: str,
             # Make sure year folder exists
             if current_year_p.is_dir():
                 print(f"Start collecting {country} {year}")
-                # Get all the parsed documents for that year
-                parsed_files_p = current_year_p.glob('*.csv')
+                # Get all the parsed documents for that year (csv or parquet)
+                parsed_files_p = glob_parsed_outputs(current_year_p)
                 for j, parsed_file_p in enumerate(parsed_files_p):
-                    with codecs.open(parsed_file_p, "r", encoding="utf-8") as file:
-                        reader = csv.DictReader(file)
+                    with open_parsed_output(parsed_file_p) as reader:
                         if j == 0:
                             # Identify the fieldnames for in the first iteration
                             if country == "lithuania":
@@ -0,0 +1,72 @@
+# Downloader with a download limit shared by all crawlers of a process
+#
+# Every crawler of a CrawlerProcess (run_crawls.py) has its own downloader, CONCURRENT_REQUESTS only limits a single
+# crawler. The SharedConcurrencyDownloader takes a token of a process wide semaphore (SHARED_CONCURRENCY tokens) when
+# a request leaves its downloader slot, i.e. after the download delay and AutoThrottle waits of the slot, and returns
+# it when the transfer is done. A request that waits for a token holds its transfer slot, so the slot does not start
+# other requests in the meantime.
+# Enable it with DOWNLOADER = 'eia_crawling.downloader.SharedConcurrencyDownloader'.
+# See: https://docs.scrapy.org/en/latest/topics/settings.html#downloader
+
+import inspect
+from scrapy.core.downloader import Downloader
+from twisted.internet.defer import DeferredSemaphore
+
+try:
+    from scrapy.utils.defer import maybe_deferred_to_future
+except ImportError:
+    # Scrapy < 2.6
+    maybe_deferred_to_future = None
+
+# One semaphore per limit, shared by the downloaders of all crawlers of the process
+_shared_semaphores = {}
+
+
+def get_shared_semaphore(limit: int):
+    if limit <= 0:
+        return None
+    if limit not in _shared_semaphores:
+        _shared_semaphores[limit] = DeferredSemaphore(limit)
+    return _shared_semaphores[limit]
+
+
+class SharedConcurrencyDownloader(Downloader):
+    """Downloader that limits the transfers in flight over all crawlers of the process to SHARED_CONCURRENCY."""
+
+    def __init__(self, crawler) -> None:
+        super().__init__(crawler)
+        self.semaphore = get_shared_semaphore(crawler.settings.getint('SHARED_CONCURRENCY'))
+        self.stats = crawler.stats
+
+    def _acquire(self, slot, request):
+        if self.semaphore.tokens == 0:
+            self.stats.inc_value('shared_concurrency/waited')
+        # Counts against the transfer slots of the downloader slot while it waits
+        slot.transferring.add(request)
+
+        def _acquired(result):
+            slot.transferring.discard(request)
+            return result
+        return self.semaphore.acquire().addBoth(_acquired)
+
+    if inspect.iscoroutinefunction(Downloader._download):
+        async def _download(self, slot, request, *args):
+            if self.semaphore is None:
+                return await super()._download(slot, request, *args)
+            await maybe_deferred_to_future(self._acquire(slot, request))
+            try:
+                return await super()._download(slot, request, *args)
+            finally:
+                self.semaphore.release()
+    else:
+        # Scrapy < 2.13: _download returns a Deferred
+        def _download(self, slot, request, *args):
+            if self.semaphore is None:
+                return super()._download(slot, request, *args)
+
+            def _release(result):
+                self.semaphore.release()
+                return result
+            d = self._acquire(slot, request)
+            d.addCallback(lambda _: super(SharedConcurrencyDownloader, self)._download(slot, request, *args))
+            return d.addBoth(_release)
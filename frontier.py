@@ -0,0 +1,459 @@
+# Shared crawl frontier
+#
+# Scheduler and dupefilter that keep the request queue and the seen fingerprints of a spider in a shared backend,
+# so that several crawler processes (on one or more hosts) drain one country's frontier together:
+#   scrapy crawl france -s SCHEDULER=eia_crawling.frontier.FrontierScheduler -s FRONTIER_BACKEND=redis
+# Backends: redis (FRONTIER_REDIS_URL), sqlite (a database file shared by the processes of one host) and memory
+# (single process, for tests).
+# See: https://docs.scrapy.org/en/latest/topics/scheduler.html
+
+import pathlib
+import json
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import uuid
+import heapq
+import itertools
+import logging
+import time
+from scrapy import signals
+from scrapy.exceptions import DontCloseSpider, NotConfigured
+from twisted.internet import task
+
+try:
+    from scrapy.utils.request import request_from_dict
+except ImportError:
+    # Scrapy < 2.6
+    from scrapy.utils.reqser import request_from_dict, request_to_dict
+else:
+    def request_to_dict(request, spider=None) -> dict:
+        return request.to_dict(spider=spider)
+
+from eia_crawling.spiders.source_store import DATA
+
+logger = logging.getLogger(__name__)
+
+# Define string constants
+FRONTIER = 'frontier'
+REPORTS = 'reports'
+MEMORY = 'memory'
+SQLITE = 'sqlite'
+REDIS = 'redis'
+FINISHED = 'finished'
+DONT_FILTER = 'dont_filter'
+# Meta key that marks the requests a worker took from the frontier, their retries stay with that worker
+FRONTIER_WORKER = 'frontier_worker'
+# Seconds between the heartbeats of a worker and after which a worker without heartbeat is considered dead
+HEARTBEAT = 30
+LEASE = 120
+
+
+class MemoryFrontierBackend:
+    """Queue, fingerprints and stats in the memory of the current process (for tests)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self._queues = {}
+        self._seen = {}
+        self._workers = {}
+        self._stats = {}
+
+    def push(self, key: str, data: bytes, priority: int) -> None:
+        with self._lock:
+            heapq.heappush(self._queues.setdefault(key, []), (-priority, next(self._counter), data))
+
+    def pop(self, key: str):
+        with self._lock:
+            queue = self._queues.get(key)
+            if not queue:
+                return None
+            return heapq.heappop(queue)[2]
+
+    def size(self, key: str) -> int:
+        return len(self._queues.get(key, []))
+
+    def add_fingerprint(self, key: str, fingerprint: str) -> bool:
+        with self._lock:
+            seen = self._seen.setdefault(key, set())
+            if fingerprint in seen:
+                return False
+            seen.add(fingerprint)
+            return True
+
+    def set_worker(self, key: str, worker: str, in_flight: int, heartbeat: float) -> None:
+        with self._lock:
+            self._workers.setdefault(key, {})[worker] = (in_flight, heartbeat)
+
+    def remove_worker(self, key: str, worker: str) -> None:
+        with self._lock:
+            self._workers.get(key, {}).pop(worker, None)
+
+    def get_workers(self, key: str) -> dict:
+        with self._lock:
+            return dict(self._workers.get(key, {}))
+
+    def set_stats(self, key: str, worker: str, stats: dict) -> None:
+        self._stats.setdefault(key, {})[worker] = stats
+
+    def get_stats(self, key: str) -> dict:
+        return dict(self._stats.get(key, {}))
+
+    def clear(self, key: str) -> None:
+        for values in (self._queues, self._seen, self._workers, self._stats):
+            values.pop(key, None)
+
+
+class SqliteFrontierBackend:
+    """Queue, fingerprints and stats in a SQLite database shared by the crawler processes of one host."""
+
+    def __init__(self, path: pathlib.Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(str(path), timeout=60, isolation_level=None, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS queue (id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT, priority INTEGER,
+                                              data BLOB);
+            CREATE INDEX IF NOT EXISTS queue_order ON queue (key, priority DESC, id);
+            CREATE TABLE IF NOT EXISTS seen (key TEXT, fingerprint TEXT, PRIMARY KEY (key, fingerprint));
+            CREATE TABLE IF NOT EXISTS workers (key TEXT, worker TEXT, in_flight INTEGER, heartbeat REAL,
+                                                PRIMARY KEY (key, worker));
+            CREATE TABLE IF NOT EXISTS stats (key TEXT, worker TEXT, stats TEXT, PRIMARY KEY (key, worker));
+        """)
+
+    def push(self, key: str, data: bytes, priority: int) -> None:
+        with self._lock:
+            self.connection.execute('INSERT INTO queue (key, priority, data) VALUES (?, ?, ?)', (key, priority, data))
+
+    def pop(self, key: str):
+        with self._lock:
+            # The write lock is taken before reading, no other process can pop the same row
+            self.connection.execute('BEGIN IMMEDIATE')
+            try:
+                row = self.connection.execute(
+                    'SELECT id, data FROM queue WHERE key = ? ORDER BY priority DESC, id LIMIT 1', (key,)).fetchone()
+                if row is not None:
+                    self.connection.execute('DELETE FROM queue WHERE id = ?', (row[0],))
+                self.connection.execute('COMMIT')
+            except Exception:
+                self.connection.execute('ROLLBACK')
+                raise
+        return row[1] if row is not None else None
+
+    def size(self, key: str) -> int:
+        with self._lock:
+            return self.connection.execute('SELECT COUNT(*) FROM queue WHERE key = ?', (key,)).fetchone()[0]
+
+    def add_fingerprint(self, key: str, fingerprint: str) -> bool:
+        with self._lock:
+            cursor = self.connection.execute('INSERT OR IGNORE INTO seen (key, fingerprint) VALUES (?, ?)',
+                                             (key, fingerprint))
+            return cursor.rowcount == 1
+
+    def set_worker(self, key: str, worker: str, in_flight: int, heartbeat: float) -> None:
+        with self._lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO workers (key, worker, in_flight, heartbeat) VALUES (?, ?, ?, ?)',
+                (key, worker, in_flight, heartbeat))
+
+    def remove_worker(self, key: str, worker: str) -> None:
+        with self._lock:
+            self.connection.execute('DELETE FROM workers WHERE key = ? AND worker = ?', (key, worker))
+
+    def get_workers(self, key: str) -> dict:
+        with self._lock:
+            rows = self.connection.execute('SELECT worker, in_flight, heartbeat FROM workers WHERE key = ?',
+                                           (key,)).fetchall()
+        return {worker: (in_flight, heartbeat) for worker, in_flight, heartbeat in rows}
+
+    def set_stats(self, key: str, worker: str, stats: dict) -> None:
+        with self._lock:
+            self.connection.execute('INSERT OR REPLACE INTO stats (key, worker, stats) VALUES (?, ?, ?)',
+                                    (key, worker, json.dumps(stats, default=str)))
+
+    def get_stats(self, key: str) -> dict:
+        with self._lock:
+            rows = self.connection.execute('SELECT worker, stats FROM stats WHERE key = ?', (key,)).fetchall()
+        return {worker: json.loads(stats) for worker, stats in rows}
+
+    def clear(self, key: str) -> None:
+        with self._lock:
+            for table in ('queue', 'seen', 'workers', 'stats'):
+                self.connection.execute(f'DELETE FROM {table} WHERE key = ?', (key,))
+
+
+class RedisFrontierBackend:
+    """Queue (sorted set), fingerprints (set) and stats (hash) in Redis, shared by all hosts."""
+
+    def __init__(self, url: str) -> None:
+        try:
+            import redis
+        except ImportError:
+            raise NotConfigured('The redis frontier backend requires the redis package')
+        self.client = redis.Redis.from_url(url)
+
+    def push(self, key: str, data: bytes, priority: int) -> None:
+        # Members have to be unique, the score orders by priority (higher first)
+        self.client.zadd(f'{key}:queue', {data: -priority})
+
+    def pop(self, key: str):
+        result = self.client.zpopmin(f'{key}:queue')
+        return result[0][0] if result else None
+
+    def size(self, key: str) -> int:
+        return self.client.zcard(f'{key}:queue')
+
+    def add_fingerprint(self, key: str, fingerprint: str) -> bool:
+        return self.client.sadd(f'{key}:seen', fingerprint) == 1
+
+    def set_worker(self, key: str, worker: str, in_flight: int, heartbeat: float) -> None:
+        self.client.hset(f'{key}:workers', worker, json.dumps([in_flight, heartbeat]))
+
+    def remove_worker(self, key: str, worker: str) -> None:
+        self.client.hdel(f'{key}:workers', worker)
+
+    def get_workers(self, key: str) -> dict:
+        return {worker.decode(): tuple(json.loads(value))
+                for worker, value in self.client.hgetall(f'{key}:workers').items()}
+
+    def set_stats(self, key: str, worker: str, stats: dict) -> None:
+        self.client.hset(f'{key}:stats', worker, json.dumps(stats, default=str))
+
+    def get_stats(self, key: str) -> dict:
+        return {worker.decode(): json.loads(stats) for worker, stats in self.client.hgetall(f'{key}:stats').items()}
+
+    def clear(self, key: str) -> None:
+        self.client.delete(*(f'{key}:{name}' for name in ('queue', 'seen', 'workers', 'stats')))
+
+
+_memory_backend = MemoryFrontierBackend()
+
+
+def get_frontier_backend(settings, spider_name: str):
+    backend = settings.get('FRONTIER_BACKEND', SQLITE)
+    if backend == MEMORY:
+        return _memory_backend
+    if backend == SQLITE:
+        path = settings.get('FRONTIER_SQLITE_PATH')
+        return SqliteFrontierBackend(pathlib.Path(path) if path else DATA.joinpath(FRONTIER, f'{spider_name}.sqlite'))
+    if backend == REDIS:
+        return RedisFrontierBackend(settings.get('FRONTIER_REDIS_URL', 'redis://localhost:6379/0'))
+    raise NotConfigured(f'Unknown frontier backend: {backend}')
+
+
+def get_frontier_key(settings, spider_name: str) -> str:
+    """Name of the frontier: FRONTIER_KEY (default: spider name), scoped to FRONTIER_JOB if it is set."""
+    key = settings.get('FRONTIER_KEY') or spider_name
+    job = settings.get('FRONTIER_JOB')
+    return f'{key}:{job}' if job else key
+
+
+def aggregate_stats(worker_stats: dict) -> dict:
+    """Sum of the numeric stats of all workers."""
+    aggregated = {}
+    for stats in worker_stats.values():
+        for name, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                aggregated[name] = aggregated.get(name, 0) + value
+    return aggregated
+
+
+def get_fingerprint(crawler, request) -> str:
+    fingerprinter = getattr(crawler, 'request_fingerprinter', None)
+    if fingerprinter is not None:
+        return fingerprinter.fingerprint(request).hex()
+    # Scrapy < 2.7
+    from scrapy.utils.request import request_fingerprint
+    return request_fingerprint(request)
+
+
+class FrontierDupeFilter:
+    """
+    Dupefilter on the fingerprints of the shared frontier (set DUPEFILTER_CLASS to use it with another scheduler).
+
+    Only the FrontierScheduler clears the fingerprints when a crawl finishes, with another scheduler set FRONTIER_JOB
+    to a new id for every crawl (or FRONTIER_RESET).
+    """
+
+    def __init__(self, crawler, backend, key: str) -> None:
+        self.crawler = crawler
+        self.backend = backend
+        self.key = key
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        key = get_frontier_key(crawler.settings, crawler.spidercls.name)
+        return cls(crawler, get_frontier_backend(crawler.settings, crawler.spidercls.name), key)
+
+    def request_seen(self, request) -> bool:
+        return not self.backend.add_fingerprint(self.key, get_fingerprint(self.crawler, request))
+
+    def open(self):
+        pass
+
+    def close(self, reason):
+        pass
+
+    def log(self, request, spider):
+        self.crawler.stats.inc_value('frontier/filtered', spider=spider)
+
+
+class FrontierScheduler:
+    """
+    Scheduler on a shared request queue.
+
+    Requests are filtered on the shared fingerprints and pushed to the shared queue, each worker pops the next
+    request when it has a free download slot. Requests with dont_filter (start requests, probes) are created by every
+    worker: only the first worker that schedules one pushes it to the shared queue, the others drop it (the same
+    dont_filter request is only downloaded once per crawl). Retries and other copies of a request that a worker took
+    from the frontier stay in the local queue of that worker.
+    Every worker publishes its number of requests in flight with a heartbeat: requests taken from the frontier that
+    are downloaded or whose callback output is not yet scheduled. A worker only closes when the shared queue is empty
+    and no live worker (heartbeat within FRONTIER_LEASE seconds) has a request in flight, so a killed worker does not
+    keep the others open; the requests it had popped are lost.
+    When a worker closes, its stats are published to the backend and the stats aggregated over all workers are logged
+    and written to <data>/reports/frontier_<key>.json. When the last worker finishes the crawl, the frontier (queue,
+    fingerprints, workers and stats) is cleared, so that the next crawl starts from the start requests again. A crawl
+    that is interrupted keeps its frontier and resumes where it stopped.
+
+    Settings:
+    - FRONTIER_BACKEND: redis, sqlite (default) or memory
+    - FRONTIER_REDIS_URL: e.g. redis://host:6379/0
+    - FRONTIER_SQLITE_PATH: database file (default: <data>/frontier/<spider>.sqlite)
+    - FRONTIER_KEY: name of the frontier (default: spider name)
+    - FRONTIER_JOB: id of the crawl, workers of one crawl share it and crawls with another id do not share fingerprints
+    - FRONTIER_RESET: start with an empty frontier (only for the first worker)
+    - FRONTIER_HEARTBEAT, FRONTIER_LEASE: seconds between heartbeats and until a silent worker is considered dead
+    """
+
+    def __init__(self, crawler, backend, key: str) -> None:
+        self.crawler = crawler
+        self.backend = backend
+        self.key = key
+        # Several crawlers of one process (run_crawls.py) are separate workers
+        self.worker = f'{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}'
+        self.dupefilter = FrontierDupeFilter(crawler, backend, key)
+        self.local = []
+        self._counter = itertools.count()
+        # Requests taken from the frontier that may still schedule follow-up requests
+        self.in_flight = set()
+        self.heartbeat = crawler.settings.getfloat('FRONTIER_HEARTBEAT', HEARTBEAT)
+        self.lease = crawler.settings.getfloat('FRONTIER_LEASE', LEASE)
+        self._heartbeat_task = None
+        self.spider = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        key = get_frontier_key(crawler.settings, crawler.spidercls.name)
+        backend = get_frontier_backend(crawler.settings, crawler.spidercls.name)
+        if crawler.settings.getbool('FRONTIER_RESET'):
+            backend.clear(key)
+        s = cls(crawler, backend, key)
+        crawler.signals.connect(s.spider_idle, signal=signals.spider_idle)
+        return s
+
+    def open(self, spider):
+        self.spider = spider
+        self._beat()
+        self._heartbeat_task = task.LoopingCall(self._heartbeat)
+        self._heartbeat_task.start(self.heartbeat, now=False)
+        logger.info(f'Frontier {self.key}: worker {self.worker}, {self.backend.size(self.key)} queued requests',
+                    extra={'spider': spider})
+
+    def close(self, reason):
+        if self._heartbeat_task is not None and self._heartbeat_task.running:
+            self._heartbeat_task.stop()
+        self.backend.set_stats(self.key, self.worker, self.crawler.stats.get_stats())
+        self.backend.remove_worker(self.key, self.worker)
+        worker_stats = self.backend.get_stats(self.key)
+        aggregated = aggregate_stats(worker_stats)
+        logger.info(f'Frontier {self.key}: stats of all workers {aggregated}', extra={'spider': self.spider})
+        path = DATA.joinpath(REPORTS, f'frontier_{self.key.replace(":", "_")}.json')
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({'workers': worker_stats, 'aggregated': aggregated}, file, indent=2, default=str)
+        # The crawl is done once the last live worker finished with an empty queue
+        if reason == FINISHED and self.backend.size(self.key) == 0 and not self._live_workers():
+            logger.info(f'Frontier {self.key}: crawl finished, clearing the frontier', extra={'spider': self.spider})
+            self.backend.clear(self.key)
+
+    def has_pending_requests(self) -> bool:
+        return bool(self.local) or self.backend.size(self.key) > 0
+
+    def enqueue_request(self, request) -> bool:
+        if request.dont_filter:
+            # Retries and requests held back by a circuit breaker keep the mark of the worker that took them
+            if request.meta.get(FRONTIER_WORKER) == self.worker:
+                heapq.heappush(self.local, (-request.priority, next(self._counter), request))
+                self.crawler.stats.inc_value('frontier/enqueued/local', spider=self.spider)
+                return True
+            # Start requests and probes are created by every worker, only the first one is shared
+            fingerprint = get_fingerprint(self.crawler, request)
+            if not self.backend.add_fingerprint(self.key, f'{DONT_FILTER}:{fingerprint}'):
+                self.crawler.stats.inc_value('frontier/filtered/dont_filter', spider=self.spider)
+                return False
+        elif self.dupefilter.request_seen(request):
+            self.dupefilter.log(request, self.spider)
+            return False
+        self._push(request)
+        self.crawler.stats.inc_value('frontier/enqueued/shared', spider=self.spider)
+        return True
+
+    def next_request(self):
+        if self.local:
+            request = heapq.heappop(self.local)[2]
+        else:
+            data = self.backend.pop(self.key)
+            if data is None:
+                return None
+            request = request_from_dict(pickle.loads(data), spider=self.spider)
+            request.meta[FRONTIER_WORKER] = self.worker
+            self.crawler.stats.inc_value('frontier/dequeued/shared', spider=self.spider)
+        self._prune()
+        self.in_flight.add(request)
+        self._beat()
+        return request
+
+    def __len__(self) -> int:
+        return len(self.local) + self.backend.size(self.key)
+
+    def spider_idle(self, spider):
+        # An idle worker has nothing in flight (requests dropped before the downloader never reached it)
+        self.in_flight.clear()
+        self._beat()
+        # Another worker may still add requests to the shared queue
+        if self.backend.size(self.key) > 0 or any(in_flight > 0 for in_flight in self._live_workers().values()):
+            raise DontCloseSpider
+
+    def _heartbeat(self) -> None:
+        self._prune()
+        self._beat()
+
+    def _prune(self) -> None:
+        """
+        Forgets the requests in flight that are done. A request is done once it is neither downloaded nor scraped:
+        the scraper keeps it active until the output of its callback (or errback) is processed, i.e. until its
+        follow-up requests are in the queue.
+        """
+        engine = self.crawler.engine
+        scraper_slot = getattr(engine.scraper, 'slot', None) if engine is not None else None
+        if scraper_slot is not None:
+            active = set(engine.downloader.active) | set(scraper_slot.active)
+            self.in_flight = {request for request in self.in_flight if request in active}
+
+    def _beat(self) -> None:
+        self.backend.set_worker(self.key, self.worker, len(self.in_flight), time.time())
+
+    def _live_workers(self) -> dict:
+        """Requests in flight of the other workers whose heartbeat is within the lease."""
+        deadline = time.time() - self.lease
+        return {worker: in_flight for worker, (in_flight, heartbeat) in self.backend.get_workers(self.key).items()
+                if worker != self.worker and heartbeat >= deadline}
+
+    def _push(self, request) -> None:
+        data = pickle.dumps(request_to_dict(request, spider=self.spider), protocol=4)
+        self.backend.push(self.key, data, request.priority)
@@ -0,0 +1,119 @@
+# Offline replay cache
+#
+# Storage backend for Scrapy's HttpCacheMiddleware that keeps every response zstd compressed under
+# <data>/httpcache/<spider>. Run a spider once with the cache enabled ("record"), afterwards it can be replayed
+# without the network:
+#   scrapy crawl legislative_observatory -s HTTPCACHE_ENABLED=True -s HTTPCACHE_IGNORE_MISSING=True
+# See: https://docs.scrapy.org/en/latest/topics/downloader-middleware.html#httpcache-middleware-settings
+
+import pathlib
+import hashlib
+import json
+import os
+import pickle
+import time
+import logging
+import zstandard
+from w3lib.url import canonicalize_url
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+
+from eia_crawling.spiders.source_store import DATA
+
+logger = logging.getLogger(__name__)
+
+# Define string constants
+HTTPCACHE = 'httpcache'
+COMPRESSION_LEVEL = 10
+
+
+def request_cache_key(request, meta_keys: list = ()) -> str:
+    """
+    Key of a request: canonical URL (sorted query, no fragment), method, body and the given meta keys.
+    Requests for the same document that only differ in parameter order or fragment share a cache entry,
+    requests that differ in the given meta keys (e.g. the date a callback relies on) do not.
+    """
+    key = {
+        'url': canonicalize_url(request.url),
+        'method': request.method,
+        'body': hashlib.sha256(request.body).hexdigest(),
+        'meta': {meta_key: request.meta.get(meta_key) for meta_key in sorted(meta_keys)},
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class CompressedCacheStorage:
+    """
+    HTTP cache storage with one zstd compressed file per request (<cache dir>/<spider>/<h[:2]>/<h>.zst).
+
+    Settings:
+    - REPLAY_CACHE_DIR: cache folder (default: <data>/httpcache)
+    - REPLAY_CACHE_META_KEYS: request meta keys that are part of the cache key
+    - HTTPCACHE_EXPIRATION_SECS: entries older than this are treated as missing (0: never expire)
+    """
+
+    def __init__(self, settings) -> None:
+        cache_dir = settings.get('REPLAY_CACHE_DIR')
+        self.cache_dir = pathlib.Path(cache_dir) if cache_dir else DATA.joinpath(HTTPCACHE)
+        self.meta_keys = settings.getlist('REPLAY_CACHE_META_KEYS')
+        self.expiration_secs = settings.getint('HTTPCACHE_EXPIRATION_SECS')
+        self.compressor = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL)
+        self.decompressor = zstandard.ZstdDecompressor()
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+
+    def open_spider(self, spider):
+        self.spider_dir = self.cache_dir.joinpath(spider.name)
+        self.spider_dir.mkdir(parents=True, exist_ok=True)
+        logger.debug(f'Using replay cache in {self.spider_dir}', extra={'spider': spider})
+
+    def close_spider(self, spider):
+        requests = self.hits + self.misses
+        hit_rate = round(self.hits / requests * 100, 1) if requests else 0.0
+        spider.logger.info(f'Replay cache {spider.name}: {self.hits} hits, {self.misses} misses ({hit_rate}%), '
+                           f'{self.stored} responses stored')
+
+    def retrieve_response(self, spider, request):
+        data = self._read_data(request)
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        url = data['url']
+        headers = Headers(data['headers'])
+        body = data['body']
+        respcls = responsetypes.from_args(headers=headers, url=url, body=body)
+        return respcls(url=url, headers=headers, status=data['status'], body=body)
+
+    def store_response(self, spider, request, response):
+        data = {
+            'timestamp': time.time(),
+            'url': response.url,
+            'request_url': request.url,
+            'method': request.method,
+            'status': response.status,
+            'headers': dict(response.headers),
+            'body': response.body,
+        }
+        path = self._get_request_path(request)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first, an interrupted crawl must not leave a truncated entry
+        tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp_path, 'wb') as file:
+            file.write(self.compressor.compress(pickle.dumps(data, protocol=4)))
+        os.replace(tmp_path, path)
+        self.stored += 1
+
+    def _read_data(self, request):
+        path = self._get_request_path(request)
+        if not path.is_file():
+            return None
+        if 0 < self.expiration_secs < time.time() - path.stat().st_mtime:
+            return None
+        with open(path, 'rb') as file:
+            return pickle.loads(self.decompressor.decompress(file.read()))
+
+    def _get_request_path(self, request) -> pathlib.Path:
+        key = request_cache_key(request, self.meta_keys)
+        return self.spider_dir.joinpath(key[:2], f'{key}.zst')
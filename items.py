@@ -6,7 +6,16 @@
 import scrapy
 
 
-class LegisObservatoryItem(scrapy.Item):
-    # define the fields for your item here like:
-    # name = scrapy.Field()
-    pass
+class SourceDocumentItem(scrapy.Item):
+    """
+    A downloaded document, persisted by the LegisObservatoryPipeline.
+    body is the raw source document (bytes) or a parsed text (str), meta the content of the <report_name>.json
+    """
+    path = scrapy.Field()
+    body = scrapy.Field()
+    meta_path = scrapy.Field()
+    meta = scrapy.Field()
+
+    def __repr__(self):
+        # Do not log the whole document for every scraped item
+        return f'<SourceDocumentItem {self.get("path")}>'
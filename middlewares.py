@@ -1,103 +1,567 @@
-# Define here the models for your spider middleware
+# Define here the models for your spider and downloader middlewares
 #
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+import pathlib
+import hashlib
+import json
+import bisect
+import weakref
+import pickle
+import random
+import time
+from urllib.parse import urlparse
 from scrapy import signals
+from scrapy.exceptions import DontCloseSpider, IgnoreRequest, NotConfigured
+from twisted.internet import task, reactor, error
+from twisted.internet.defer import TimeoutError
+from twisted.web.client import ResponseFailed
+from scrapy.core.downloader.handlers.http11 import TunnelError
+
+try:
+    from scrapy.utils.request import request_from_dict
+except ImportError:
+    # Scrapy < 2.6
+    from scrapy.utils.reqser import request_from_dict, request_to_dict
+else:
+    def request_to_dict(request, spider=None) -> dict:
+        return request.to_dict(spider=spider)
 
 # useful for handling different item types with a single interface
 from itemadapter import is_item, ItemAdapter
 
+from eia_crawling.items import SourceDocumentItem
+from eia_crawling.spiders.source_store import get_source_store, DATA
+
+# Define string constants
+NATIONAL = 'national'
+SOURCE = 'source'
+STORE = 'store'
+VALIDATORS = 'validators'
+URL = 'URL'
+ETAG = 'etag'
+LAST_MODIFIED = 'last_modified'
+CONTENT_HASH = 'sha256'
+REPORTS = 'reports'
+RETRY_QUEUE = 'retry_queue'
+EXCEPTION = 'exception'
+# Request meta key: time before which a retry must not be downloaded
+RETRY_AT = 'smart_retry_at'
+# Statuses that say something about the health of a server, they count for the circuit breaker even without retries
+OVERLOAD_HTTP_CODES = [408, 429]
+
+
+class CrawlMetrics:
+    """
+    Metrics of a crawl per domain and callback, shared by the spider and downloader metrics middlewares.
+
+    - Request latency histograms (domain, callback)
+    - Response sizes (domain, callback)
+    - Status codes and retries (domain)
+    - Scraped items (callback) and written files (domain)
+
+    The metrics are exported periodically to <data>/reports/metrics_<spider>.json and, in the Prometheus text
+    format, to <data>/reports/metrics_<spider>.prom.
+    """
 
-class LegisObservatorySpiderMiddleware:
-    # Not all methods need to be defined. If a method is not defined,
-    # scrapy acts as if the spider middleware does not modify the
-    # passed objects.
+    LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+    SIZE_BUCKETS = [1e3, 1e4, 1e5, 1e6, 1e7, 1e8]
+
+    def __init__(self, spider_name: str, interval: float, data_path: pathlib.Path = DATA) -> None:
+        self.spider_name = spider_name
+        self.interval = interval
+        self.data_path = data_path
+        self.latency = {}
+        self.size = {}
+        self.status = {}
+        self.retries = {}
+        self.items = {}
+        self.files = {}
+        self.task = None
 
     @classmethod
     def from_crawler(cls, crawler):
-        # This method is used by Scrapy to create your spiders.
-        s = cls()
-        crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
-        return s
+        # A single instance per crawler, shared by both middlewares
+        if crawler not in _crawl_metrics:
+            metrics = cls(crawler.spidercls.name, crawler.settings.getfloat('CRAWL_METRICS_EXPORT_INTERVAL'))
+            crawler.signals.connect(metrics.spider_opened, signal=signals.spider_opened)
+            crawler.signals.connect(metrics.spider_closed, signal=signals.spider_closed)
+            _crawl_metrics[crawler] = metrics
+        return _crawl_metrics[crawler]
 
-    def process_spider_input(self, response, spider):
-        # Called for each response that goes through the spider
-        # middleware and into the spider.
+    @staticmethod
+    def _observe(histograms: dict, key: tuple, buckets: list, value: float) -> None:
+        if key not in histograms:
+            histograms[key] = {'buckets': [0] * (len(buckets) + 1), 'sum': 0.0, 'count': 0}
+        histogram = histograms[key]
+        histogram['buckets'][bisect.bisect_left(buckets, value)] += 1
+        histogram['sum'] += value
+        histogram['count'] += 1
 
-        # Should return None or raise an exception.
-        return None
+    @staticmethod
+    def _inc(counters: dict, key: tuple, value: int = 1) -> None:
+        counters[key] = counters.get(key, 0) + value
 
-    def process_spider_output(self, response, result, spider):
-        # Called with the results returned from the Spider, after
-        # it has processed the response.
+    def record_response(self, domain: str, callback: str, status: int, latency: float, size: int) -> None:
+        if latency is not None:
+            self._observe(self.latency, (domain, callback), self.LATENCY_BUCKETS, latency)
+        self._observe(self.size, (domain, callback), self.SIZE_BUCKETS, size)
+        self._inc(self.status, (domain, str(status)))
+
+    def record_retry(self, domain: str) -> None:
+        self._inc(self.retries, (domain,))
+
+    def record_item(self, domain: str, callback: str, files: int) -> None:
+        self._inc(self.items, (callback,))
+        if files:
+            self._inc(self.files, (domain,), files)
+
+    def spider_opened(self, spider):
+        if self.interval > 0:
+            self.task = task.LoopingCall(self.export)
+            self.task.start(self.interval, now=False)
+
+    def spider_closed(self, spider):
+        if self.task is not None and self.task.running:
+            self.task.stop()
+        self.export()
+
+    def to_dict(self) -> dict:
+        def histograms(data, buckets):
+            return [{'domain': domain, 'callback': callback, 'le': buckets + ['+Inf'], **histogram}
+                    for (domain, callback), histogram in data.items()]
+        return {
+            'spider': self.spider_name,
+            'latency_seconds': histograms(self.latency, self.LATENCY_BUCKETS),
+            'response_bytes': histograms(self.size, self.SIZE_BUCKETS),
+            'responses': [{'domain': domain, 'status': status, 'count': count}
+                          for (domain, status), count in self.status.items()],
+            'retries': [{'domain': domain, 'count': count} for (domain,), count in self.retries.items()],
+            'items': [{'callback': callback, 'count': count} for (callback,), count in self.items.items()],
+            'files_written': [{'domain': domain, 'count': count} for (domain,), count in self.files.items()],
+        }
+
+    def to_prometheus(self) -> str:
+        lines = []
+        spider = self.spider_name
+
+        def histogram(name, description, data, buckets):
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} histogram')
+            for (domain, callback), values in data.items():
+                labels = f'spider="{spider}",domain="{domain}",callback="{callback}"'
+                cumulative = 0
+                for le, count in zip(buckets + ['+Inf'], values['buckets']):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f'{name}_sum{{{labels}}} {values["sum"]}')
+                lines.append(f'{name}_count{{{labels}}} {values["count"]}')
+
+        def counter(name, description, data, label_names):
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} counter')
+            for key, count in data.items():
+                labels = ','.join([f'spider="{spider}"'] + [f'{n}="{v}"' for n, v in zip(label_names, key)])
+                lines.append(f'{name}{{{labels}}} {count}')
+
+        histogram('crawl_request_latency_seconds', 'Download latency of the requests.', self.latency,
+                  self.LATENCY_BUCKETS)
+        histogram('crawl_response_size_bytes', 'Size of the response bodies.', self.size, self.SIZE_BUCKETS)
+        counter('crawl_responses_total', 'Responses by status code.', self.status, ['domain', 'status'])
+        counter('crawl_retries_total', 'Retried requests.', self.retries, ['domain'])
+        counter('crawl_items_total', 'Items scraped by the callbacks.', self.items, ['callback'])
+        counter('crawl_files_written_total', 'Source documents and meta data files written.', self.files,
+                ['domain'])
+        return '\n'.join(lines) + '\n'
+
+    def export(self) -> None:
+        folder = self.data_path.joinpath(REPORTS)
+        folder.mkdir(parents=True, exist_ok=True)
+        with open(folder.joinpath(f'metrics_{self.spider_name}.json'), 'w', encoding='utf-8') as file:
+            json.dump(self.to_dict(), file, indent=2)
+        with open(folder.joinpath(f'metrics_{self.spider_name}.prom'), 'w', encoding='utf-8') as file:
+            file.write(self.to_prometheus())
 
-        # Must return an iterable of Request, or item objects.
+
+_crawl_metrics = weakref.WeakKeyDictionary()
+
+
+def get_domain(url: str) -> str:
+    return urlparse(url).hostname or ''
+
+
+def get_callback_name(request) -> str:
+    if request is None:
+        return ''
+    callback = request.callback
+    if callback is None:
+        return 'parse'
+    return getattr(callback, '__name__', str(callback))
+
+
+class CrawlMetricsSpiderMiddleware:
+    """Counts the items scraped per callback and the files written per domain (see CrawlMetrics)."""
+
+    def __init__(self, metrics: CrawlMetrics) -> None:
+        self.metrics = metrics
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('CRAWL_METRICS_ENABLED'):
+            raise NotConfigured
+        return cls(CrawlMetrics.from_crawler(crawler))
+
+    def process_spider_output(self, response, result, spider):
+        domain = get_domain(response.url)
+        callback = get_callback_name(response.request)
         for i in result:
+            if is_item(i):
+                files = 0
+                if isinstance(i, SourceDocumentItem):
+                    adapter = ItemAdapter(i)
+                    files = 1 + (adapter.get('meta') is not None)
+                self.metrics.record_item(domain, callback, files)
             yield i
 
-    def process_spider_exception(self, response, exception, spider):
-        # Called when a spider or process_spider_input() method
-        # (from other spider middleware) raises an exception.
 
-        # Should return either None or an iterable of Request or item objects.
-        pass
+class CrawlMetricsDownloaderMiddleware:
+    """Records latency, response size, status code and retries per domain and callback (see CrawlMetrics)."""
 
-    def process_start_requests(self, start_requests, spider):
-        # Called with the start requests of the spider, and works
-        # similarly to the process_spider_output() method, except
-        # that it doesn’t have a response associated.
+    def __init__(self, metrics: CrawlMetrics) -> None:
+        self.metrics = metrics
 
-        # Must return only requests (not items).
-        for r in start_requests:
-            yield r
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('CRAWL_METRICS_ENABLED'):
+            raise NotConfigured
+        return cls(CrawlMetrics.from_crawler(crawler))
 
-    def spider_opened(self, spider):
-        spider.logger.info("Spider opened: %s" % spider.name)
+    def process_request(self, request, spider):
+        # Retried requests pass the downloader middlewares again
+        if request.meta.get('retry_times'):
+            self.metrics.record_retry(get_domain(request.url))
+        return None
+
+    def process_response(self, request, response, spider):
+        self.metrics.record_response(domain=get_domain(request.url),
+                                     callback=get_callback_name(request),
+                                     status=response.status,
+                                     latency=request.meta.get('download_latency'),
+                                     size=len(response.body))
+        return response
 
 
 class LegisObservatoryDownloaderMiddleware:
-    # Not all methods need to be defined. If a method is not defined,
-    # scrapy acts as if the downloader middleware does not modify the
-    # passed objects.
+    """
+    Incremental crawling with conditional GET requests.
+
+    Every spider writes a <report_name>.json next to each source document, which tells us the URLs of the documents
+    that were already downloaded. For those URLs the ETag/Last-Modified validators and the content hash of the last
+    response are kept per spider in <data>/store/validators/<spider>.json. Requests for known documents are sent with
+    If-None-Match/If-Modified-Since and are dropped before the write path, if the server answers 304 or the body is
+    identical to the stored document. Overview/listing pages are never in the metadata and are always crawled.
+    """
+
+    def __init__(self, stats, data_path: pathlib.Path = DATA, revalidate: bool = True) -> None:
+        self.stats = stats
+        self.data_path = data_path
+        # With the http cache the full responses are recorded, a cached 304 could never be replayed
+        self.revalidate = revalidate
+        self.validators = {}
+        self.documents = {}
 
     @classmethod
     def from_crawler(cls, crawler):
         # This method is used by Scrapy to create your spiders.
-        s = cls()
+        if not crawler.settings.getbool('INCREMENTAL_CRAWL_ENABLED'):
+            raise NotConfigured
+        s = cls(crawler.stats, revalidate=not crawler.settings.getbool('HTTPCACHE_ENABLED'))
         crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
         return s
 
     def process_request(self, request, spider):
-        # Called for each request that goes through the downloader
-        # middleware.
-
-        # Must either:
-        # - return None: continue processing this request
-        # - or return a Response object
-        # - or return a Request object
-        # - or raise IgnoreRequest: process_exception() methods of
-        #   installed downloader middleware will be called
+        if not self.revalidate or request.url not in self.documents or request.meta.get('dont_revalidate'):
+            return None
+        validators = self.validators.get(request.url, {})
+        if validators.get(ETAG):
+            request.headers.setdefault('If-None-Match', validators[ETAG])
+        if validators.get(LAST_MODIFIED):
+            request.headers.setdefault('If-Modified-Since', validators[LAST_MODIFIED])
         return None
 
     def process_response(self, request, response, spider):
-        # Called with the response returned from the downloader.
+        # Responses replayed from the http cache are always passed to the spider
+        if 'cached' in response.flags:
+            return response
+        known_document = request.url in self.documents or response.url in self.documents
+
+        if response.status == 304 and known_document:
+            self.stats.inc_value('incremental/not_modified', spider=spider)
+            raise IgnoreRequest(f'Not modified: {request.url}')
 
-        # Must either;
-        # - return a Response object
-        # - return a Request object
-        # - or raise IgnoreRequest
+        if response.status == 200:
+            digest = hashlib.sha256(response.body).hexdigest()
+            previous_digest = self.validators.get(request.url, {}).get(CONTENT_HASH) or self.documents.get(request.url)
+            validators = {
+                ETAG: response.headers.get('ETag', b'').decode('latin-1'),
+                LAST_MODIFIED: response.headers.get('Last-Modified', b'').decode('latin-1'),
+                CONTENT_HASH: digest,
+            }
+            self.validators[request.url] = validators
+            self.validators[response.url] = validators
+            if known_document and digest == previous_digest:
+                self.stats.inc_value('incremental/unchanged', spider=spider)
+                raise IgnoreRequest(f'Unchanged: {request.url}')
         return response
 
+    def spider_opened(self, spider):
+        path = self._validators_path(spider)
+        if path.is_file():
+            with open(path, 'r', encoding='utf-8') as file:
+                self.validators = json.load(file)
+        self.documents = self._load_documents(spider)
+        spider.logger.info(f'Incremental crawl: {len(self.documents)} known documents for {spider.name}')
+
+    def spider_closed(self, spider):
+        path = self._validators_path(spider)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.validators, file)
+
+    def _validators_path(self, spider) -> pathlib.Path:
+        return self.data_path.joinpath(STORE, VALIDATORS, f'{spider.name}.json')
+
+    def _load_documents(self, spider) -> dict:
+        """Map the URL of every already downloaded document to the content hash of its source document."""
+        country_path = self.data_path.joinpath(NATIONAL, spider.name)
+        if not country_path.is_dir():
+            # The European Observatory spider writes to <data>/eu
+            country_path = self.data_path.joinpath(spider.name)
+        if not country_path.is_dir():
+            return {}
+
+        # Index the stored source documents by folder and report name
+        store = get_source_store(self.data_path)
+        digests = {}
+        for key, entry in store.manifest.items():
+            key_p = pathlib.PurePosixPath(key)
+            digests[(key_p.parent.as_posix(), key_p.stem)] = entry['sha256']
+
+        documents = {}
+        for meta_path in country_path.rglob(f'{SOURCE}/*.json'):
+            with open(meta_path, 'r', encoding='utf-8') as file:
+                meta_data = json.load(file)
+            folder_key = store.key(meta_path.parent)
+            for report_name, meta in meta_data.items():
+                if not isinstance(meta, dict) or not meta.get(URL):
+                    continue
+                documents[meta[URL]] = digests.get((folder_key, report_name))
+        return documents
+
+
+class SmartRetryMiddleware:
+    """
+    Retries with a policy per status class, exponential backoff and a circuit breaker per domain.
+
+    - SMART_RETRY_POLICIES: maximum number of retries per status code, status class ('4xx', '5xx') or 'exception'.
+      A spider can override single entries with a smart_retry_policies attribute, e.g. {'404': 1} for a site that
+      answers 404 for documents that are not published yet. Statuses that the request handles itself
+      (handle_httpstatus_list/all, e.g. probes for missing sittings) are never retried.
+    - Retry n waits SMART_RETRY_BASE_DELAY * 2^n seconds (at most SMART_RETRY_MAX_DELAY, or Retry-After),
+      randomized by +-50% so that retries of several requests do not arrive together.
+    - After CIRCUIT_BREAKER_THRESHOLD consecutive failures of a domain, its requests are held back for
+      CIRCUIT_BREAKER_COOLDOWN seconds. A failure after the cooldown opens the circuit again. Failures are
+      exceptions and statuses that are retried, 408, 429 and 5xx. Permanent client errors (a 4xx with policy 0, e.g.
+      documents that do not exist) are passed to the spider without counting for or against the circuit.
+    - Waiting requests (retries and requests of an open circuit) are held outside of the downloader, so that they
+      do not take its slots: they are dropped when they are scheduled and passed to the engine again once their time
+      has come. The spider is kept open while requests are held, requests still held when it closes are added to
+      the retry queue.
+    - Requests that still fail are appended to <data>/store/retry_queue/<spider>.pickle, the next run
+      requests them again (see RetryQueueSpiderMiddleware).
+    Replaces Scrapy's RetryMiddleware.
+    """
+
+    EXCEPTIONS_TO_RETRY = (TimeoutError, error.TimeoutError, error.DNSLookupError, error.ConnectionRefusedError,
+                           error.ConnectionDone, error.ConnectError, error.ConnectionLost, error.TCPTimedOutError,
+                           ResponseFailed, TunnelError, IOError)
+
+    def __init__(self, crawler, data_path: pathlib.Path = DATA) -> None:
+        settings = crawler.settings
+        self.crawler = crawler
+        self.policies = {str(key): value for key, value in settings.getdict('SMART_RETRY_POLICIES').items()}
+        self.base_delay = settings.getfloat('SMART_RETRY_BASE_DELAY')
+        self.max_delay = settings.getfloat('SMART_RETRY_MAX_DELAY')
+        self.priority_adjust = settings.getint('RETRY_PRIORITY_ADJUST')
+        self.threshold = settings.getint('CIRCUIT_BREAKER_THRESHOLD')
+        self.cooldown = settings.getfloat('CIRCUIT_BREAKER_COOLDOWN')
+        self.stats = crawler.stats
+        self.data_path = data_path
+        # Per domain: consecutive failures and the time until which the circuit is open
+        self.failures = {}
+        self.open_until = {}
+        self.failed = []
+        # Requests held outside of the downloader: id -> (delayed call, request)
+        self.held = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('SMART_RETRY_ENABLED'):
+            raise NotConfigured
+        s = cls(crawler)
+        crawler.signals.connect(s.request_scheduled, signal=signals.request_scheduled)
+        crawler.signals.connect(s.spider_idle, signal=signals.spider_idle)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def request_scheduled(self, request, spider):
+        # Retries and requests of a domain with an open circuit wait here instead of in the downloader
+        wait = max(request.meta.get(RETRY_AT, 0), self.open_until.get(get_domain(request.url), 0)) - time.time()
+        if wait > 0:
+            self.held[id(request)] = (reactor.callLater(wait, self._release, request), request)
+            raise IgnoreRequest
+
+    def spider_idle(self, spider):
+        if self.held:
+            raise DontCloseSpider
+
+    def process_request(self, request, spider):
+        # Requests that were scheduled before the circuit of their domain opened go back to the engine
+        if self.open_until.get(get_domain(request.url), 0) > time.time():
+            self.stats.inc_value('circuit_breaker/delayed', spider=spider)
+            return request.replace(dont_filter=True)
+        return None
+
+    def process_response(self, request, response, spider):
+        domain = get_domain(request.url)
+        if request.meta.get('dont_retry') or self._is_handled(request, response.status):
+            self._success(domain)
+            return response
+        max_retries = self._get_max_retries(response.status, spider)
+        if max_retries is None:
+            if response.status < 400:
+                self._success(domain)
+            return response
+        if max_retries == 0 and response.status not in OVERLOAD_HTTP_CODES and response.status < 500:
+            return response
+        self._failure(domain, spider)
+        retry_after = response.headers.get('Retry-After', b'').decode('latin-1').strip()
+        min_delay = float(retry_after) if retry_after.isdigit() else 0.0
+        return self._retry(request, f'{response.status}', max_retries, spider, min_delay) or response
+
     def process_exception(self, request, exception, spider):
-        # Called when a download handler or a process_request()
-        # (from other downloader middleware) raises an exception.
+        if not isinstance(exception, self.EXCEPTIONS_TO_RETRY) or request.meta.get('dont_retry'):
+            return None
+        self._failure(get_domain(request.url), spider)
+        max_retries = self._get_policies(spider).get(EXCEPTION, 0)
+        return self._retry(request, exception.__class__.__name__, max_retries, spider)
 
-        # Must either:
-        # - return None: continue processing this exception
-        # - return a Response object: stops process_exception() chain
-        # - return a Request object: stops process_exception() chain
-        pass
+    def spider_closed(self, spider):
+        for call, request in self.held.values():
+            call.cancel()
+            self.failed.append(request)
+        self.held.clear()
+        if not self.failed:
+            return
+        path = retry_queue_path(self.data_path, spider.name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'ab') as file:
+            for request in self.failed:
+                pickle.dump(request_to_dict(request, spider=spider), file, protocol=4)
+        spider.logger.info(f'{len(self.failed)} failed requests added to the retry queue {path}')
 
-    def spider_opened(self, spider):
-        spider.logger.info("Spider opened: %s" % spider.name)
+    @staticmethod
+    def _is_handled(request, status: int) -> bool:
+        return request.meta.get('handle_httpstatus_all') or status in request.meta.get('handle_httpstatus_list', [])
+
+    def _get_policies(self, spider) -> dict:
+        return dict(self.policies, **{str(key): value
+                                      for key, value in getattr(spider, 'smart_retry_policies', {}).items()})
+
+    def _get_max_retries(self, status: int, spider):
+        policies = self._get_policies(spider)
+        for key in (str(status), f'{str(status)[0]}xx'):
+            if key in policies:
+                return policies[key]
+        return None
+
+    def _release(self, request) -> None:
+        del self.held[id(request)]
+        self.crawler.engine.crawl(request)
+
+    def _success(self, domain: str) -> None:
+        self.failures[domain] = 0
+
+    def _failure(self, domain: str, spider) -> None:
+        self.failures[domain] = self.failures.get(domain, 0) + 1
+        if self.failures[domain] >= self.threshold and self.open_until.get(domain, 0) <= time.time():
+            self.open_until[domain] = time.time() + self.cooldown
+            self.stats.inc_value('circuit_breaker/opened', spider=spider)
+            spider.logger.warning(f'Circuit breaker: {self.failures[domain]} consecutive failures of {domain}, '
+                                  f'pausing it for {self.cooldown:.0f}s')
+
+    def _retry(self, request, reason: str, max_retries: int, spider, min_delay: float = 0.0):
+        retries = request.meta.get('retry_times', 0) + 1
+        if retries > max_retries:
+            # Only transient failures are worth a later run, permanent ones (policy 0) are not queued
+            if max_retries > 0:
+                self.stats.inc_value('retry/max_reached', spider=spider)
+                spider.logger.warning(f'Gave up retrying {request} ({reason}) after {max_retries} retries')
+                self.failed.append(request)
+            return None
+
+        retry_request = request.copy()
+        retry_request.meta['retry_times'] = retries
+        retry_request.dont_filter = True
+        retry_request.priority = request.priority + self.priority_adjust
+        self.stats.inc_value('retry/count', spider=spider)
+        self.stats.inc_value(f'retry/reason_count/{reason}', spider=spider)
+
+        delay = min(self.max_delay, self.base_delay * 2 ** (retries - 1)) * random.uniform(0.5, 1.5)
+        delay = max(delay, min_delay)
+        spider.logger.debug(f'Retrying {request} ({reason}) in {delay:.1f}s, retry {retries}/{max_retries}')
+        # Held back when it is scheduled (see request_scheduled)
+        retry_request.meta[RETRY_AT] = time.time() + delay
+        return retry_request
+
+
+def retry_queue_path(data_path: pathlib.Path, spider_name: str) -> pathlib.Path:
+    return data_path.joinpath(STORE, RETRY_QUEUE, f'{spider_name}.pickle')
+
+
+class RetryQueueSpiderMiddleware:
+    """
+    Requests the URLs of the retry queue (written by SmartRetryMiddleware) before the start requests.
+    The queue is emptied, requests that fail again are added to it again at the end of the run.
+    """
+
+    def __init__(self, data_path: pathlib.Path = DATA) -> None:
+        self.data_path = data_path
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('RETRY_QUEUE_DRAIN'):
+            raise NotConfigured
+        return cls()
+
+    def process_start_requests(self, start_requests, spider):
+        path = retry_queue_path(self.data_path, spider.name)
+        if path.is_file():
+            # Move the queue aside first, the failures of this run are written to a new queue
+            draining_path = path.with_suffix('.draining')
+            path.replace(draining_path)
+            requests = []
+            with open(draining_path, 'rb') as file:
+                while True:
+                    try:
+                        requests.append(request_from_dict(pickle.load(file), spider=spider))
+                    except EOFError:
+                        break
+            draining_path.unlink()
+            spider.logger.info(f'Retrying {len(requests)} requests of the retry queue')
+            for request in requests:
+                request.meta.pop('retry_times', None)
+                yield request
+        yield from start_requests
@@ -1,6 +1,9 @@
-import requests
+import asyncio
+import aiohttp
 import pathlib
-from .utils import (write_source_doc, prepare_folder_national)
+import datetime
+from argparse import ArgumentParser
+from eia_crawling.spiders.utils import write_source_doc, read_source_head, source_doc_exists, prepare_folder_national
 
 # Define string constants
 COUNTRY = 'finland'
@@ -10,20 +13,159 @@ URL = 'URL'
 SOURCE = 'source'
 REPORT = 'session'
 NATIONAL = 'national'
+FOUND = 'found'
+MISSING = 'missing'
+FAILED = 'failed'
 
 ROOT = pathlib.Path(__file__).absolute().parent.parent
-DATA = ROOT.joinpath("spiders","data")
+DATA = ROOT.joinpath("spiders", "data")
 
-prepare_folder_national(DATA, COUNTRY)
+BASE_URL = 'https://www.eduskunta.fi/FI/vaski/Poytakirja/Documents'
+# The PDF header has to appear within the first 1024 bytes of the file
+PDF_MAGIC = b'%PDF-'
+PDF_HEADER_SIZE = 1024
+FIRST_YEAR = 2015
+CONCURRENCY = 8
+MAX_MISSES = 10
+TIMEOUT = 120
+# Server errors and timeouts are retried, a protocol that still fails is neither found nor missing
+RETRIES = 3
+RETRY_DELAY = 5
+RETRY_HTTP_CODES = [408, 429, 500, 502, 503, 504]
 
-year_upper_lims_dict = {2019:87, 2018:181, 2017:147, 2016:139, 2015:85}
 
-for year, upper_lim in year_upper_lims_dict.items():
-   for number in range(1,upper_lim+1):
-	   try:
-	        url = f'https://www.eduskunta.fi/FI/vaski/Poytakirja/Documents/PTK_{number}+{year}.pdf'
-	        response = requests.get(url)
-	        path = DATA.joinpath(NATIONAL, COUNTRY, str(year), SOURCE, f'{number}.pdf')
-	        write_source_doc(path, response.content)
-	   except Exception as e:
-	        print(e)
\ No newline at end of file
+def is_pdf(content: bytes) -> bool:
+    return PDF_MAGIC in content[:PDF_HEADER_SIZE]
+
+
+def is_downloaded(path: pathlib.Path, data_path: pathlib.Path) -> bool:
+    # Earlier versions of this script also wrote error pages, only the header of the document is read
+    return source_doc_exists(path, data_path) and is_pdf(read_source_head(path, PDF_HEADER_SIZE, data_path))
+
+
+async def fetch_pdf(session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, url: str, retries: int = RETRIES,
+                    retry_delay: float = RETRY_DELAY):
+    """
+    Returns the body of the url if it is a PDF, None if there is no PDF (missing document, error page, ...).
+    Raises the last error if the server still fails after the retries.
+    """
+    for attempt in range(retries + 1):
+        try:
+            async with semaphore:
+                async with session.get(url) as response:
+                    if response.status in RETRY_HTTP_CODES:
+                        raise aiohttp.ClientResponseError(response.request_info, response.history,
+                                                          status=response.status, message=response.reason or '')
+                    if response.status != 200:
+                        return None
+                    content = await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt == retries:
+                raise
+            print(f'{url}: {e!r}, retrying')
+            await asyncio.sleep(retry_delay * 2 ** attempt)
+            continue
+        return content if is_pdf(content) else None
+
+
+async def download_protocol(session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, base_url: str,
+                            data_path: pathlib.Path, year: int, number: int, retry_delay: float = RETRY_DELAY) -> str:
+    """Download the protocol (PTK) <number>/<year>. Returns whether the protocol was found, is missing or failed."""
+    path = data_path.joinpath(NATIONAL, COUNTRY, str(year), SOURCE, f'{number}.pdf')
+    # Keep the disk I/O off the event loop
+    if await asyncio.to_thread(is_downloaded, path, data_path):
+        return FOUND
+    url = f'{base_url}/PTK_{number}+{year}.pdf'
+    try:
+        content = await fetch_pdf(session, semaphore, url, retry_delay=retry_delay)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        print(f'{url}: {e!r}')
+        return FAILED
+    if content is None:
+        return MISSING
+    await asyncio.to_thread(write_source_doc, path, content, data_path)
+    return FOUND
+
+
+async def download_year(session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, base_url: str,
+                        data_path: pathlib.Path, year: int, batch_size: int, max_misses: int,
+                        retry_delay: float = RETRY_DELAY) -> int:
+    """
+    Download all protocols of a year and return the last protocol number found.
+    The protocol numbers are probed in batches, the year is done after max_misses consecutive missing numbers.
+    Failed protocols (server errors, timeouts) do not count as missing, the year is aborted after max_misses
+    consecutive failures.
+    """
+    number = 1
+    last_found = 0
+    misses = 0
+    failures = 0
+    failed = []
+    while misses < max_misses and failures < max_misses:
+        numbers = range(number, number + batch_size)
+        results = await asyncio.gather(
+            *(download_protocol(session, semaphore, base_url, data_path, year, n, retry_delay) for n in numbers))
+        for n, result in zip(numbers, results):
+            if result == FOUND:
+                last_found = n
+                misses = 0
+                failures = 0
+            elif result == MISSING:
+                misses += 1
+                failures = 0
+            else:
+                failed.append(n)
+                failures += 1
+        number += batch_size
+    if failures >= max_misses:
+        print(f'{COUNTRY} {year}: aborted after {failures} failed protocols')
+    if failed:
+        print(f'{COUNTRY} {year}: failed protocols {failed}, run the download again')
+    print(f'{COUNTRY} {year}: {last_found} protocols')
+    return last_found
+
+
+async def download(years: list, base_url: str = BASE_URL, data_path: pathlib.Path = DATA,
+                   concurrency: int = CONCURRENCY, max_misses: int = MAX_MISSES,
+                   retry_delay: float = RETRY_DELAY) -> dict:
+    """Download the protocols of the given years with at most <concurrency> parallel requests."""
+    semaphore = asyncio.Semaphore(concurrency)
+    # A single connection pool is shared by all requests
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=TIMEOUT)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        last_found = await asyncio.gather(
+            *(download_year(session, semaphore, base_url, data_path, year, concurrency, max_misses, retry_delay)
+              for year in years))
+    return dict(zip(years, last_found))
+
+
+def main(years: list = None,
+         base_url: str = BASE_URL,
+         data_path: pathlib.Path = DATA,
+         concurrency: int = CONCURRENCY,
+         max_misses: int = MAX_MISSES) -> dict:
+    """
+    Download the plenary protocols of the Eduskunta.
+    The number of protocols per year is found automatically, new years do not require any changes.
+    """
+    if years is None:
+        years = list(range(FIRST_YEAR, datetime.date.today().year + 1))
+    prepare_folder_national(data_path, COUNTRY)
+    return asyncio.run(download(years, base_url, data_path, concurrency, max_misses))
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--years", type=int, nargs='+', help="years to download (default: 2015 until today)")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="maximum number of parallel requests")
+    parser.add_argument("--max_misses", type=int, default=MAX_MISSES,
+                        help="number of consecutive missing protocols after which a year is done")
+    parser.add_argument("--base_url", type=str, default=BASE_URL,
+                        help="URL of the document folder (e.g. a local server for testing)")
+    args = parser.parse_args()
+
+    main(years=args.years,
+         base_url=args.base_url.rstrip('/'),
+         concurrency=args.concurrency,
+         max_misses=args.max_misses)
@@ -1,39 +1,182 @@
-from selenium import webdriver
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-import time
+import asyncio
+import aiohttp
 import pathlib
-import os
+import json
+import re
+from argparse import ArgumentParser
+from urllib.parse import urljoin, unquote
+from lxml import html
+from eia_crawling.spiders.utils import write_source_doc, source_doc_exists
 
 ROOT = pathlib.Path(__file__).absolute().parent.parent
-DATA_PATH = ROOT.joinpath("spiders","data","national","greece")
+DATA = ROOT.joinpath("spiders", "data")
 
-if not os.path.isdir(DATA_PATH):
-    os.mkdir(DATA_PATH)
+# Define string constants
+COUNTRY = 'greece'
+NATIONAL = 'national'
 
+BASE_URL = 'https://www.hellenicparliament.gr'
+LISTING_PATH = '/en/Praktika/Synedriaseis-Olomeleias'
+FIRST_PAGE = 31
+LAST_PAGE = 43
+CONCURRENCY = 4
+TIMEOUT = 120
+# Progress of earlier runs (listing pages that were completely downloaded)
+PROGRESS_FILE = 'download_progress.json'
 
-chrome_options = Options()
-chrome_options.add_argument("--headless")
-CHROME_PATH = "/usr/local/bin/chromedriver"
+# Result links of the ASP.NET repeater, e.g. ctl00_ContentPlaceHolder1_rr_repSearchResults_ctl01_lnkTxt
+RESULT_LINK_XPATH = '//a[contains(@id, "_repSearchResults_") and contains(@id, "_lnkTxt")]'
+POSTBACK_MATCH = r"__doPostBack\('([^']*)','([^']*)'\)"
+# Hidden ASP.NET fields that have to be sent back with every postback
+ASP_NET_FIELDS = ['__VIEWSTATE', '__VIEWSTATEGENERATOR', '__EVENTVALIDATION', '__VIEWSTATEENCRYPTED']
+# A .docx is a zip archive, error pages are sometimes sent with the .docx content type
+ZIP_MAGIC = b'PK\x03\x04'
+# Characters that are not allowed in file names (the titles contain dates like 12/03/2019)
+UNSAFE_FILE_NAME_MATCH = r'[\\/:*?"<>|\x00-\x1f]'
 
-prefs = {"download.default_directory": str(DATA_PATH.absolute())}
-chrome_options.add_experimental_option("prefs",prefs)
 
-driver = webdriver.Chrome(CHROME_PATH,options=chrome_options)
-for i in range(31,44):
-    driver.get(f'https://www.hellenicparliament.gr/en/Praktika/Synedriaseis-Olomeleias?pageNo={i}')
+def parse_listing(page: str, page_url: str):
+    """
+    Returns the hidden form fields of the listing page and the result links.
+    A result link is either a direct link to the .docx or the target/argument of an ASP.NET postback.
+    """
+    tree = html.fromstring(page)
+    form_fields = {}
+    for name in ASP_NET_FIELDS:
+        value = tree.xpath(f'//input[@name="{name}"]/@value')
+        if value:
+            form_fields[name] = value[0]
 
-    WebDriverWait(driver,10).until(EC.presence_of_element_located((By.XPATH, '//*[@id="pagecontent"]/table/tbody')))
-    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+    links = []
+    for anchor in tree.xpath(RESULT_LINK_XPATH):
+        href = anchor.get('href', '')
+        postback = re.search(POSTBACK_MATCH, href)
+        if postback is not None:
+            links.append({'postback': (postback.group(1), postback.group(2)), 'title': anchor.text_content().strip()})
+        elif href:
+            links.append({'url': urljoin(page_url, href), 'title': anchor.text_content().strip()})
+    return form_fields, links
 
-    for j in range(1,11):
-        j = str(j)
-        if len(j) == 1:
-            j = "0"+j
-        row = driver.find_element_by_id(f'ctl00_ContentPlaceHolder1_rr_repSearchResults_ctl{j}_lnkTxt')
-        row.click()
-        time.sleep(2)
-    time.sleep(1)
\ No newline at end of file
+
+def safe_file_name(name: str) -> str:
+    """The name without directories and characters that are not allowed in file names."""
+    return re.sub(UNSAFE_FILE_NAME_MATCH, '_', name).strip(' .')
+
+
+def file_name_from_response(response: aiohttp.ClientResponse, fallback: str) -> str:
+    disposition = response.headers.get('Content-Disposition', '')
+    match = re.search(r"filename\*=UTF-8''([^;]+)|filename=\"?([^\";]+)\"?", disposition)
+    if match is not None:
+        return safe_file_name(unquote(match.group(1) or match.group(2)))
+    name = unquote(response.url.path.split('/')[-1])
+    if name.endswith('.docx'):
+        return safe_file_name(name)
+    return safe_file_name(fallback)
+
+
+async def fetch_document(session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, page_url: str,
+                         form_fields: dict, link: dict, data_path: pathlib.Path) -> bool:
+    """Download a single .docx, either directly or by replaying the postback of the result link."""
+    # Files that are named after their URL can be skipped without a request
+    if 'url' in link:
+        name = safe_file_name(unquote(link['url'].split('/')[-1].split('?')[0]))
+        if name.endswith('.docx') and source_doc_exists(data_path.joinpath(NATIONAL, COUNTRY, name), data_path):
+            return True
+
+    async with semaphore:
+        try:
+            if 'url' in link:
+                request = session.get(link['url'])
+            else:
+                target, argument = link['postback']
+                data = dict(form_fields, __EVENTTARGET=target, __EVENTARGUMENT=argument)
+                request = session.post(page_url, data=data)
+            async with request as response:
+                if response.status != 200:
+                    print(f'{page_url} {link}: status {response.status}')
+                    return False
+                content = await response.read()
+                name = file_name_from_response(response, f'{link["title"]}.docx')
+                content_type = response.headers.get('Content-Type', '')
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f'{page_url} {link}: {e!r}')
+            return False
+
+    if not content.startswith(ZIP_MAGIC):
+        print(f'{page_url} {link}: response is not a .docx ({content_type})')
+        return False
+    path = data_path.joinpath(NATIONAL, COUNTRY, name)
+    if not source_doc_exists(path, data_path):
+        await asyncio.to_thread(write_source_doc, path, content, data_path)
+    return True
+
+
+async def download_page(session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, base_url: str,
+                        data_path: pathlib.Path, page_no: int) -> bool:
+    """Download all documents of a listing page. Returns whether all documents were downloaded."""
+    page_url = f'{base_url}{LISTING_PATH}?pageNo={page_no}'
+    async with semaphore:
+        async with session.get(page_url) as response:
+            # Decoded with the charset of the response, lxml would read undeclared bytes as latin-1
+            page = await response.text()
+    form_fields, links = parse_listing(page, page_url)
+    results = await asyncio.gather(
+        *(fetch_document(session, semaphore, page_url, form_fields, link, data_path) for link in links))
+    print(f'Page {page_no}: {sum(results)}/{len(links)} documents')
+    return bool(links) and all(results)
+
+
+async def download(pages: list, base_url: str = BASE_URL, data_path: pathlib.Path = DATA,
+                   concurrency: int = CONCURRENCY) -> dict:
+    """
+    Download the documents of the given listing pages with at most <concurrency> parallel requests to
+    <data_path>/national/greece (kept in the source store of data_path).
+    Pages that were completely downloaded in an earlier run are skipped.
+    """
+    country_p = data_path.joinpath(NATIONAL, COUNTRY)
+    country_p.mkdir(parents=True, exist_ok=True)
+    progress_p = country_p.joinpath(PROGRESS_FILE)
+    done = set()
+    if progress_p.is_file():
+        with open(progress_p, 'r', encoding='utf-8') as f:
+            done = set(json.load(f))
+
+    semaphore = asyncio.Semaphore(concurrency)
+    # A single session keeps the ASP.NET cookies and the connection pool for all requests
+    timeout = aiohttp.ClientTimeout(total=TIMEOUT)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        todo = [page_no for page_no in pages if page_no not in done]
+        results = await asyncio.gather(
+            *(download_page(session, semaphore, base_url, data_path, page_no) for page_no in todo))
+
+    done.update(page_no for page_no, complete in zip(todo, results) if complete)
+    with open(progress_p, 'w', encoding='utf-8') as f:
+        json.dump(sorted(done), f)
+    return dict(zip(todo, results))
+
+
+def main(first_page: int = FIRST_PAGE,
+         last_page: int = LAST_PAGE,
+         base_url: str = BASE_URL,
+         data_path: pathlib.Path = DATA,
+         concurrency: int = CONCURRENCY) -> dict:
+    """
+    Download the plenary protocols (.docx) of the Hellenic Parliament without a browser.
+    """
+    return asyncio.run(download(list(range(first_page, last_page + 1)), base_url, data_path, concurrency))
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--first_page", type=int, default=FIRST_PAGE, help="first listing page")
+    parser.add_argument("--last_page", type=int, default=LAST_PAGE, help="last listing page")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="maximum number of parallel requests")
+    parser.add_argument("--base_url", type=str, default=BASE_URL,
+                        help="URL of the parliament website (e.g. a local server serving recorded pages)")
+    args = parser.parse_args()
+
+    main(first_page=args.first_page,
+         last_page=args.last_page,
+         base_url=args.base_url.rstrip('/'),
+         concurrency=args.concurrency)
@@ -0,0 +1,137 @@
+# Benchmark of the pdfminer line extraction of the Portuguese parser
+#
+# Compares the former extraction (a full TextConverter pass into a module-level StringIO followed by a second pass
+# with extract_pages) with the single-pass page streaming of pdf_extraction.iter_pdf_lines, on all PDFs of a year.
+# The extraction through the cache is compared as well, on a cache miss: the former cache of the whole line list
+# (json of the whole document) and the streamed cache of pdf_extraction.iter_pdfminer_lines, both in a temporary
+# cache folder. Reports the time per document and the memory (tracemalloc) that is still allocated after each
+# document and at its peak.
+# Run from the ./eia_crawling directory, e.g.:
+#   python -m eia_crawling.parsing.benchmark_pdf_extraction portugal 2019 --limit 20
+
+import os
+import pathlib
+import tempfile
+import time
+import tracemalloc
+from io import StringIO
+from argparse import ArgumentParser
+
+from eia_crawling.parsing.pdf_extraction import iter_pdf_lines, iter_pdfminer_lines, cached_extraction, \
+    PDFMINER_LINES, PDF_CACHE_DIR_ENV
+from eia_crawling.spiders.utils import glob_source_docs, materialize_source_doc
+
+# Define string constants
+SPIDERS = 'spiders'
+DATA = 'data'
+NATIONAL = 'national'
+SOURCE = 'source'
+TWO_PASS = 'two_pass'
+SINGLE_PASS = 'single_pass'
+CACHED = 'cached'
+STREAMED = 'streamed'
+
+# The module-level buffer of the former parser, it is never reset
+legacy_output_string = StringIO()
+
+
+def two_pass_lines(pdf_path: pathlib.Path) -> list:
+    """Line extraction as the Portuguese parser did it before the single pass."""
+    from pdfminer.converter import TextConverter
+    from pdfminer.layout import LAParams, LTTextContainer
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
+    from pdfminer.pdfpage import PDFPage
+    from pdfminer.pdfparser import PDFParser
+    from pdfminer.high_level import extract_pages
+    with open(str(pdf_path), 'rb') as in_file:
+        parser = PDFParser(in_file)
+        doc = PDFDocument(parser)
+        rsrcmgr = PDFResourceManager()
+        device = TextConverter(rsrcmgr, legacy_output_string, laparams=LAParams())
+        interpreter = PDFPageInterpreter(rsrcmgr, device)
+        for page in PDFPage.create_pages(doc):
+            interpreter.process_page(page)
+
+    doc_lines = []
+    for page_layout in extract_pages(str(pdf_path)):
+        for element in page_layout:
+            if isinstance(element, LTTextContainer):
+                for line in element:
+                    doc_lines.append([line.get_text().strip('\n'), line.bbox])
+    return doc_lines
+
+
+def single_pass_lines(pdf_path: pathlib.Path) -> list:
+    return list(iter_pdf_lines(pdf_path))
+
+
+def cached_lines(source_file_p: pathlib.Path) -> list:
+    """Line extraction through the cache of the whole line list, as the Portuguese parser did it before streaming."""
+    return cached_extraction(source_file_p, PDFMINER_LINES, {}, single_pass_lines)
+
+
+def streamed_lines(source_file_p: pathlib.Path) -> list:
+    return list(iter_pdfminer_lines(source_file_p))
+
+
+def extract_lines(method: str, source_file_p: pathlib.Path) -> list:
+    if method == CACHED:
+        return cached_lines(source_file_p)
+    if method == STREAMED:
+        return streamed_lines(source_file_p)
+    with materialize_source_doc(source_file_p) as pdf_path:
+        return two_pass_lines(pdf_path) if method == TWO_PASS else single_pass_lines(pdf_path)
+
+
+def run(method: str, source_files_p: list) -> dict:
+    documents = []
+    tracemalloc.start()
+    start = time.perf_counter()
+    for source_file_p in source_files_p:
+        tracemalloc.reset_peak()
+        document_start = time.perf_counter()
+        lines = extract_lines(method, source_file_p)
+        seconds = time.perf_counter() - document_start
+        # The lines are dropped, everything that stays allocated leaks into the next document
+        del lines
+        current, peak = tracemalloc.get_traced_memory()
+        documents.append({'document': source_file_p.name, 'seconds': seconds, 'retained_mb': current / 2 ** 20,
+                          'peak_mb': peak / 2 ** 20})
+        print(f'{method} {source_file_p.name}: {seconds:.2f}s, retained {current / 2 ** 20:.1f} MB, '
+              f'peak {peak / 2 ** 20:.1f} MB')
+    total = time.perf_counter() - start
+    tracemalloc.stop()
+    return {'seconds': total, 'documents': documents}
+
+
+def main(country: str, year: int, limit: int = None):
+    root_p = pathlib.Path(__file__).absolute().parent.parent.joinpath(SPIDERS, DATA, NATIONAL, country)
+    source_files_p = glob_source_docs(root_p.joinpath(str(year), SOURCE), '*.pdf')[:limit]
+    results = {}
+    for method in [TWO_PASS, SINGLE_PASS, CACHED, STREAMED]:
+        # Every document is a cache miss
+        with tempfile.TemporaryDirectory() as cache_dir:
+            os.environ[PDF_CACHE_DIR_ENV] = cache_dir
+            try:
+                results[method] = run(method, source_files_p)
+            finally:
+                del os.environ[PDF_CACHE_DIR_ENV]
+
+    print(f'{len(source_files_p)} documents of {country} {year}')
+    for method, result in results.items():
+        documents = result['documents']
+        if documents:
+            print(f'{method}: {result["seconds"]:.1f}s, retained after the last document '
+                  f'{documents[-1]["retained_mb"]:.1f} MB, highest peak {max(d["peak_mb"] for d in documents):.1f} MB')
+    return results
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("country", type=str, help="name of the national folder", metavar="country")
+    parser.add_argument("year", type=int, help="year of the PDFs to extract")
+    parser.add_argument("--limit", type=int, help="extract only the first documents")
+    args = parser.parse_args()
+
+    main(country=args.country, year=args.year, limit=args.limit)
@@ -1,6 +1,7 @@
 import pathlib
 import pandas as pd
 from argparse import ArgumentParser
+from eia_crawling.parsing.row_sinks import glob_parsed_outputs
 
 
 def main(country: str):
@@ -12,10 +13,11 @@ def main(country: str):
 
     list_of_csv = []
     for year in root_path.iterdir():
-        parsed_docs = list(year.glob('*.csv'))
-        list_of_csv += parsed_docs
+        if year.is_dir():
+            list_of_csv += glob_parsed_outputs(year)
 
-    combined_csv = pd.concat([pd.read_csv(f) for f in list_of_csv])
+    # Parquet outputs are read with their column types (dictionary columns as categoricals)
+    combined_csv = pd.concat([pd.read_parquet(f) if f.suffix == '.parquet' else pd.read_csv(f) for f in list_of_csv])
     combined_csv.to_csv(target_path.joinpath(f'{country}_corpus.csv'), index=False)
     print('Corpus has been successfully written.')
 
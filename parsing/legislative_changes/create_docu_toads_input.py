@@ -5,7 +5,7 @@ import re
 from eia_crawling.parsing.parsing_eu_proposal import parse_eu_proposal_not_formatted, parse_eu_proposal_formatted
 from eia_crawling.parsing.parsing_eu_final_act_full import parse_eu_final_act_full
 import pickle
-from eia_crawling.spiders.utils import write_csv, normalize_string
+from eia_crawling.spiders.utils import write_csv, normalize_string, read_source_doc, source_doc_exists
 import string
 
 SPIDERS = 'spiders'
@@ -60,7 +60,7 @@ def parse_doc_pair(proposal_path: pathlib.Path, full_act_path: pathlib.Path):
 
     ### Parsing proposal ###
     # Convert .html to Beautiful Soup object
-    soup = BeautifulSoup(open(str(proposal_path), encoding=ENCODING), "html.parser")
+    soup = BeautifulSoup(read_source_doc(proposal_path).decode(ENCODING), "html.parser")
 
     # Depending on whether proposal doc is somewhat formatted or not, different parsing methods are used. Thus, first
     # one must check that. Non-formatted document is one that contains tags of following class: 'contentWrapper'.
@@ -142,7 +142,7 @@ def main():
 
                 proposal_path = cod.joinpath('full', 'source').joinpath('full_legislative_proposal_1.html')
                 full_act_path = cod.joinpath('full', 'source').joinpath('full_final_act_1.html')
-                if full_act_path.exists() and proposal_path.exists() and proposal_path not in EXCLUDE:
+                if source_doc_exists(full_act_path) and source_doc_exists(proposal_path) and proposal_path not in EXCLUDE:
                     result = parse_doc_pair(proposal_path, full_act_path)
                     if result is not None:
                         result = result[:4] + [''.join([year.stem, cod.stem])] + result[4:]
@@ -2,7 +2,7 @@ import pandas as pd
 import pathlib
 from bs4 import BeautifulSoup
 import re
-from eia_crawling.spiders.utils import write_csv, normalize_string
+from eia_crawling.spiders.utils import write_csv, normalize_string, read_source_doc, source_doc_exists
 from argparse import ArgumentParser
 
 SPIDERS = 'spiders'
@@ -66,8 +66,8 @@ def extract_change(doc_name: str, year: pathlib.Path, cod: pathlib.Path):
     if if_hard_case:
         doc_path = cod.joinpath('full', 'source').joinpath(doc_name).with_suffix('.html')
 
-        if doc_path.exists():
-            soup = BeautifulSoup(open(str(doc_path), encoding=ENCODING), "html.parser")
+        if source_doc_exists(doc_path):
+            soup = BeautifulSoup(read_source_doc(doc_path).decode(ENCODING), "html.parser")
             texts = []
             all_tags = soup.findAll(re.compile(r'.*'))  # Get all tags from HTTP document
 
@@ -1,39 +1,117 @@
 import numpy as np
 import pathlib
-from eia_crawling.parsing.parsing_french_parliament import parse_french_parliament
-from eia_crawling.parsing.parsing_german_parliament import parse_german_parliament
-from eia_crawling.parsing.parsing_irish_parliament import parse_irish_parliament
-from eia_crawling.parsing.parsing_belgian_parliament import parse_belgian_parliament
-from eia_crawling.parsing.parsing_austrian_parliament import parse_austrian_parliament
-from eia_crawling.parsing.parsing_danish_parliament import parse_danish_parliament
-from eia_crawling.parsing.parsing_hungarian_parliament import parse_hungarian_parliament
-from eia_crawling.parsing.parsing_lithuanian_parliament import parse_lithuanian_parliament
-from eia_crawling.parsing.parsing_estonian_parliament import parse_estonian_parliament
-from eia_crawling.parsing.parsing_swedish_parliament import parse_swedish_parliament
-from eia_crawling.parsing.parsing_portuguese_parliament import parse_portuguese_parliament
-from eia_crawling.parsing.parsing_polish_parliament import parse_polish_parliament
-from eia_crawling.parsing.parsing_romanian_parliament import parse_romanian_parliament
-from eia_crawling.parsing.parsing_bulgarian_parliament import parse_bulgarian_parliament
-from eia_crawling.parsing.parsing_slovakian_parliament import parse_slovakian_parliament
-from eia_crawling.parsing.parsing_uk_parliament import parse_uk_parliament
-from eia_crawling.parsing.parsing_ep_parliament import parse_ep_parliament
-from eia_crawling.parsing.parsing_cypriot_parliament import parse_cypriot_parliament
-from eia_crawling.parsing.parsing_greek_parliament import parse_greek_parliament
-from eia_crawling.parsing.parsing_finnish_parliament import parse_finnish_parliament
-from eia_crawling.parsing.parsing_maltese_parliament import parse_maltese_parliament
+import os
+import json
+import csv
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from eia_crawling.parsing.registry import get_parser
+from eia_crawling.parsing.row_sinks import count_output_rows, OUTPUT_FORMAT_ENV, CSV, PARQUET, CATALOG
+from eia_crawling.parsing.pdf_extraction import PAGE_WORKERS_ENV
+from eia_crawling.spiders.utils import glob_source_docs, source_doc_digest
+from eia_crawling.spiders.catalog import get_document_catalog, PARSED, FAILED
 from argparse import ArgumentParser
 
 SOURCE = 'source'
 SPIDERS = 'spiders'
 DATA = 'data'
 NATIONAL = 'national'
+PARSE_MANIFEST = 'parse_manifest.json'
+
+# Parsed documents can contain very large fields
+# sys.maxsize overflows the C long of csv.field_size_limit on Windows, decrease it until it fits
+max_int = sys.maxsize
+while True:
+    try:
+        csv.field_size_limit(max_int)
+        break
+    except OverflowError:
+        max_int = int(max_int / 10)
+
+
+def find_source_docs(country: str, year: int, source_p: pathlib.Path, pattern: str):
+    """
+    Source documents of a year from the document catalog and the source folder (downloaders outside Scrapy, e.g.
+    the Finnish and Greek ones, do not catalog their documents).
+    """
+    source_files_p = set(get_document_catalog().source_paths(country, year, pattern))
+    source_files_p.update(glob_source_docs(source_p, pattern))
+    return sorted(source_files_p)
+
+
+def load_parse_manifest(year_p: pathlib.Path) -> dict:
+    """
+    Manifest of the parsed documents of a year: source file name -> source (and meta data) hash,
+    parser version, output file and number of output rows
+    """
+    path = year_p.joinpath(PARSE_MANIFEST)
+    if not path.is_file():
+        return {}
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def write_parse_manifest(year_p: pathlib.Path, manifest: dict) -> None:
+    with open(year_p.joinpath(PARSE_MANIFEST), 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+
+
+def get_inputs(source_file_p: pathlib.Path, meta_file_p: pathlib.Path, parser_version: str,
+               output_format: str = CSV) -> dict:
+    """Everything the output of a parsed document depends on."""
+    inputs = {'source_sha256': source_doc_digest(source_file_p), 'parser_version': parser_version,
+              'output_format': output_format}
+    if meta_file_p is not None:
+        inputs['meta_sha256'] = source_doc_digest(meta_file_p) if meta_file_p.exists() else None
+    return inputs
+
+
+def is_up_to_date(entry: dict, inputs: dict, year_p: pathlib.Path) -> bool:
+    if entry is None or any(entry.get(key) != value for key, value in inputs.items()):
+        return False
+    # The output may have been deleted in the meantime
+    return entry.get('output') is None or year_p.joinpath(entry['output']).is_file()
+
+
+def parse_source_file(country: str,
+                      year: int,
+                      current_year_p: pathlib.Path,
+                      source_file_p: pathlib.Path,
+                      meta_file_p: pathlib.Path = None):
+    """
+    Parse a single source document with the national specific parser
+    """
+    get_parser(country).parse(current_year_p, year, source_file_p, meta_file_p)
+
+
+def run_parse_task(task: tuple):
+    """
+    Parse a single source document, errors are returned instead of raised (one bad file must not stop the run)
+    """
+    source_file_p = task[3]
+    try:
+        parse_source_file(*task)
+    except Exception:
+        return source_file_p, traceback.format_exc()
+    return source_file_p, None
 
 
 def main(country: str,
-         year: int = None):
+         year: int = None,
+         workers: int = 1,
+         force: bool = False,
+         output_format: str = CSV,
+         page_workers: int = 1):
     """
     Parse the national parliamentary speeches
+    Documents whose source, meta data and parser are unchanged since the last run are skipped (unless force is set)
+    The parsers write their rows as csv, parquet or to the document catalog (output_format)
+    PDFs are extracted in page ranges on page_workers processes (per parsing process)
     """
+    # The parsers (also in the worker processes) read the output format and page workers from the environment
+    os.environ[OUTPUT_FORMAT_ENV] = output_format
+    os.environ[PAGE_WORKERS_ENV] = str(page_workers)
 
     # Get the path to the national folder
     current_p = pathlib.Path(__file__).absolute().parent.parent
@@ -45,140 +123,77 @@ def main(country: str,
     else:
         years = [year]
 
-    # Iterate through the years
+    national_parser = get_parser(country)
+    catalog = get_document_catalog()
+    parser_version = national_parser.version()
+
+    # Collect the source documents of all years
+    tasks = []
+    manifests = {}
+    inputs = {}
+    skipped = 0
     for year in years:
         print(f'Started with {root_p.stem} {year}')
         current_year_p = root_p.joinpath(str(year))
         current_year_source_p = root_p.joinpath(str(year), 'source')
         # Make sure source folder exists
         if current_year_source_p.is_dir():
-            # Get the path to all html documents in the source folder
-            if country == 'france' or country == 'austria' or country == 'denmark' or country == 'hungary' or country == 'lithuania' or country == 'estonia' or country == 'romania' or country == 'bulgaria' or country == 'united_kingdom' or country == 'sweeden':
-                source_files_p = current_year_source_p.glob('*.html')
-            # Get the path to XML documents
-            elif country == 'germany' or country == 'ireland' or country == 'ep':
-                source_files_p = current_year_source_p.glob('*.xml')
-            elif country == 'belgium' or country == 'portugal' or country == 'finland':
-                source_files_p = current_year_source_p.glob('*.pdf')
-            elif country == 'malta':
-                source_files_p = current_year_source_p.glob('*.doc')
-            elif country == 'poland':
-                source_files_p = current_year_source_p.glob('*text_structure.xml')
-                meta_files_p = list(current_year_source_p.glob('*header.xml'))
-            elif country == 'slovakia' or country == 'greece':
-                source_files_p = current_year_source_p.glob('*.docx')
-            elif country == 'cyprus':
-                source_files_p = current_year_source_p.glob('*.txt')
-            for i, source_file_p in enumerate(source_files_p):
-                # Call the national specific parser
-                if country == 'france':
-                    meta_file_p = source_file_p.with_suffix('.json')
-                    parse_french_parliament(year_path=current_year_p,
-                                            year=year,
-                                            source_html_path=source_file_p,
-                                            meta_json_path=meta_file_p)
-                elif country == 'germany':
-                    parse_german_parliament(year_path=current_year_p,
-                                            year=year,
-                                            source_xml_path=source_file_p)
-                elif country == 'ireland':
-                    parse_irish_parliament(year_path=current_year_p,
-                                           year=year,
-                                           source_xml_path=source_file_p)
-                elif country == 'belgium':
-                    # call specific docs for testing
-                    # source_file_p = source_file_p.parent.joinpath('0284_session.pdf')
-                    meta_file_p = source_file_p.with_suffix('.json')
-                    parse_belgian_parliament(year_path=current_year_p,
-                                             year=year,
-                                             source_pdf_path=source_file_p,
-                                             meta_json_path=meta_file_p)
-                elif country == 'austria':
-                    # Call specific sessions for testing
-                    # source_file_p = source_file_p.parent.joinpath('session_72.html')
-                    meta_file_p = source_file_p.with_suffix('.json')
-                    parse_austrian_parliament(year_path=current_year_p,
-                                              year=year,
-                                              source_html_path=source_file_p,
-                                              meta_json_path=meta_file_p)
-
-                elif country == 'denmark':
-                    parse_danish_parliament(year_path=current_year_p,
-                                            year=year,
-                                            source_html_path=source_file_p)
-
-                elif country == 'hungary':
-                    parse_hungarian_parliament(year_path=current_year_p,
-                                               year=year,
-                                               source_html_path=source_file_p)
-                elif country == 'lithuania':
-                    # source_file_p = source_file_p.parent.joinpath("Seimo rytinio plenarinio posėdžio Nr. 447 stenograma.html")
-                    parse_lithuanian_parliament(year_path=current_year_p,
-                                                year=year,
-                                                source_html_path=source_file_p)
-                elif country == 'estonia':
-                    meta_file_p = source_file_p.with_suffix('.json')
-                    parse_estonian_parliament(year_path=current_year_p,
-                                              year=year,
-                                              source_html_path=source_file_p,
-                                              meta_json_path=meta_file_p)
-                elif country == 'portugal':
-                    parse_portuguese_parliament(year_path=current_year_p,
-                                                year=year,
-                                                source_pdf_path=source_file_p)
-                elif country == 'poland':
-                    meta_file_p = meta_files_p[i]
-                    parse_polish_parliament(year_path=current_year_p,
-                                            year=year,
-                                            source_xml_path=source_file_p,
-                                            meta_xml_path=meta_file_p)
-                elif country == 'romania':
-                    # source_file_p = source_file_p.parent.joinpath("Şedinţa Camerei Deputaţilor din 2 martie 2009.html")
-                    parse_romanian_parliament(year_path=current_year_p,
-                                              year=year,
-                                              source_html_path=source_file_p)
-                elif country == 'slovakia':
-                    # source_file_p = source_file_p.parent.joinpath("Şedinţa Camerei Deputaţilor din 2 martie 2009.html")
-                    parse_slovakian_parliament(year_path=current_year_p,
-                                               year=year,
-                                               source_doc_path=source_file_p)
-                elif country == 'bulgaria':
-                    # source_file_p = source_file_p.parent.joinpath("ТРИСТА СЕДЕМДЕСЕТ И ПЕТО ЗАСЕДАНИЕ София, петък, 13 юли 2012.html")
-                    parse_bulgarian_parliament(year_path=current_year_p,
-                                               year=year,
-                                               source_html_path=source_file_p)
-                elif country == 'united_kingdom':
-                    parse_uk_parliament(year_path=current_year_p,
-                                        year=year,
-                                        source_html_path=source_file_p)
-                elif country == 'ep':
-                    parse_ep_parliament(year_path=current_year_p,
-                                        year=year,
-                                        source_xml_path=source_file_p,
-                                        )
-                elif country == 'cyprus':
-                    # source_file_p = source_file_p.parent.joinpath("2017-03-24_ΙΑ΄ ΒΟΥΛΕΥΤΙΚΗ ΠΕΡΙΟΔΟΣ_ΣΎΝΟΔΟΣ Α΄_24.txt")
-                    parse_cypriot_parliament(year_path=current_year_p,
-                                             year=year,
-                                             source_txt_path=source_file_p,
-                                             )
-                elif country == 'sweeden':
-                    parse_swedish_parliament(year_path=current_year_p,
-                                             year=year,
-                                             source_html_path=source_file_p)
-                elif country == 'greece':
-                    parse_greek_parliament(year_path=current_year_p,
-                                           year=year,
-                                           source_doc_path=source_file_p
-                                           )
-                elif country == 'finland':
-                    parse_finnish_parliament(year_path=current_year_p,
-                                             year=year,
-                                             source_pdf_path=source_file_p)
-                elif country == 'malta':
-                    parse_maltese_parliament(year_path=current_year_p,
-                                             year=year,
-                                             source_doc_path=source_file_p)
+            # Get the path to all source documents (and their meta data) in the source folder
+            source_files_p = find_source_docs(country, year, current_year_source_p, national_parser.pattern)
+            meta_files_p = national_parser.meta_files(
+                source_files_p, lambda pattern: find_source_docs(country, year, current_year_source_p, pattern))
+            manifests[current_year_p] = load_parse_manifest(current_year_p)
+            for source_file_p, meta_file_p in zip(source_files_p, meta_files_p):
+                inputs[source_file_p] = get_inputs(source_file_p, meta_file_p, parser_version, output_format)
+                if not force and is_up_to_date(manifests[current_year_p].get(source_file_p.name),
+                                               inputs[source_file_p], current_year_p):
+                    skipped += 1
+                    continue
+                tasks.append((country, year, current_year_p, source_file_p, meta_file_p))
+
+    # Parse the source documents, with several workers the documents are distributed over a process pool
+    # The results are collected in the order of the tasks
+    results = []
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(run_parse_task, task) for task in tasks]
+            for task, future in zip(tasks, futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    # E.g. a worker that was killed by a crashing extraction library
+                    results.append((task[3], repr(e)))
+    else:
+        results = [run_parse_task(task) for task in tasks]
+
+    failed = []
+    for task, (source_file_p, error) in zip(tasks, results):
+        current_year_p = task[2]
+        manifest = manifests[current_year_p]
+        if error is None:
+            catalog.set_parse_status(source_file_p, PARSED, parser_version)
+            output_p = national_parser.output_path(current_year_p, source_file_p)
+            if output_format == PARQUET:
+                output_p = output_p.with_suffix('.parquet')
+            # Rows written to the catalog have no output file
+            has_output = output_format != CATALOG and output_p.is_file()
+            manifest[source_file_p.name] = dict(inputs[source_file_p],
+                                                output=output_p.name if has_output else None,
+                                                rows=count_output_rows(output_p) if has_output else 0)
+        else:
+            catalog.set_parse_status(source_file_p, FAILED, parser_version)
+            manifest.pop(source_file_p.name, None)
+            failed.append((source_file_p, error))
+    for current_year_p, manifest in manifests.items():
+        write_parse_manifest(current_year_p, manifest)
+
+    # Summary
+    print(f'Parsed {len(results) - len(failed)}/{len(results)} {country} documents, {skipped} unchanged documents skipped')
+    for source_file_p, error in failed:
+        print(f'Failed: {source_file_p}\n{error}')
+    return {'parsed': [str(p) for p, error in results if error is None],
+            'failed': {str(p): error for p, error in failed},
+            'skipped': skipped}
 
 
 if __name__ == "__main__":
@@ -186,9 +201,19 @@ if __name__ == "__main__":
     parser.add_argument("country", type=str,
                         help="name of the national folder that should be parsed", metavar="path")
     parser.add_argument("--year", type=int, help="year to parse")
+    parser.add_argument("--workers", type=int, default=1, help="number of processes parsing in parallel")
+    parser.add_argument("--force", action="store_true", help="parse unchanged documents again")
+    parser.add_argument("--output_format", type=str, default=CSV, choices=[CSV, PARQUET, CATALOG],
+                        help="output of the parsers that write through parsing/row_sinks.py")
+    parser.add_argument("--page_workers", type=int, default=1,
+                        help="number of processes extracting the page ranges of a PDF (Belgium, Finland, Portugal)")
     args = parser.parse_args()
     input_path = args.country
     year = args.year
 
     main(country=input_path,
-         year=year)
+         year=year,
+         workers=args.workers,
+         force=args.force,
+         output_format=args.output_format,
+         page_workers=args.page_workers)
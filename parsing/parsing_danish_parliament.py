@@ -1,7 +1,8 @@
 import pathlib
 import datetime
 from bs4 import BeautifulSoup
-from eia_crawling.spiders.utils import get_parliament_name, get_iso_2_digit_code, get_iso_3_digit_code, write_csv, normalize_string
+from eia_crawling.spiders.utils import get_parliament_name, get_iso_2_digit_code, get_iso_3_digit_code, write_csv, normalize_string, \
+    read_source_doc
 
 COUNTRY = 'denmark'
 ENCODING = 'utf8'
@@ -75,7 +76,7 @@ def parse_danish_parliament(source_html_path: pathlib,
     iso_3_digits = get_iso_3_digit_code("denmark")
 
     # Convert document into Beautiful Soup object
-    soup = BeautifulSoup(open(str(source_html_path), encoding=ENCODING), "html.parser")
+    soup = BeautifulSoup(read_source_doc(source_html_path).decode(ENCODING), "html.parser")
 
     # Parse the date
     date = soup.find('meta', {'name': 'DateOfSitting'})['content']
@@ -2,7 +2,7 @@ import re
 import pathlib
 from lxml import etree
 import datetime
-from eia_crawling.spiders.utils import write_csv, normalize_string
+from eia_crawling.spiders.utils import write_csv, normalize_string, read_source_doc
 
 
 def parse_ep_parliament(year_path: pathlib.Path,
@@ -24,7 +24,7 @@ def parse_ep_parliament(year_path: pathlib.Path,
     file_name = source_xml_path.stem
 
     # Read source root
-    xml = etree.parse(str(source_xml_path))
+    xml = etree.ElementTree(etree.fromstring(read_source_doc(source_xml_path)))
 
     # Get header information
     header = xml.xpath("//text")
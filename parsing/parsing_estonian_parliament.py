@@ -3,7 +3,7 @@ import json
 import pathlib
 from scrapy.http import HtmlResponse
 import datetime
-from eia_crawling.spiders.utils import write_csv, normalize_string
+from eia_crawling.spiders.utils import write_csv, normalize_string, read_source_doc
 
 
 def parse_estonian_parliament(year_path: pathlib.Path,
@@ -23,8 +23,7 @@ def parse_estonian_parliament(year_path: pathlib.Path,
     url = meta_data[file_name]['URL']
 
     # Read source html
-    source_f = open(source_html_path, "rb")
-    source_html = source_f.read()
+    source_html = read_source_doc(source_html_path)
     # Replace <br> with __br__ to split on it later
     source_html = source_html.decode('UTF-8').replace('<br/>', '__br__').encode('UTF-8')
     response = HtmlResponse(url=url, body=source_html)
@@ -4,7 +4,7 @@ from bs4 import BeautifulSoup
 import re
 from dateutil import parser
 import json
-from eia_crawling.spiders.utils import normalize_string
+from eia_crawling.spiders.utils import normalize_string, read_source_doc
 
 sys.path.append('../')
 
@@ -134,7 +134,7 @@ def parse_eu_final_act_full(doc_path: pathlib,
         doc_celex = list(json_meta_data.values())[0]['celex']
 
     # Convert .html to Beautiful Soup object
-    soup = BeautifulSoup(open(str(target_path), encoding=ENCODING), "html.parser")
+    soup = BeautifulSoup(read_source_doc(target_path).decode(ENCODING), "html.parser")
 
     # Get required features
     doc_year = get_year(soup)  # get year
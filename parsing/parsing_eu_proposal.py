@@ -2,7 +2,7 @@ import pathlib
 from bs4 import BeautifulSoup
 import re
 import json
-from eia_crawling.spiders.utils import normalize_string
+from eia_crawling.spiders.utils import normalize_string, read_source_doc
 import datetime
 
 ENCODING = 'utf8'
@@ -54,7 +54,7 @@ def parse_eu_proposal_not_formatted(doc_path: pathlib,
     target_path = doc_path.joinpath(doc_name + '.html')
 
     # Convert .html to Beautiful Soup object
-    soup = BeautifulSoup(open(str(target_path), encoding=ENCODING), "html.parser")
+    soup = BeautifulSoup(read_source_doc(target_path).decode(ENCODING), "html.parser")
 
     ## Find first tag
     opening_tag = soup.find('p', text=OPENING_PHRASE)
@@ -109,7 +109,7 @@ def parse_eu_proposal_formatted(doc_path: pathlib,
     target_path = doc_path.joinpath(doc_name + '.html')
 
     # Convert .html to Beautiful Soup object
-    soup = BeautifulSoup(open(str(target_path), encoding=ENCODING), "html.parser")
+    soup = BeautifulSoup(read_source_doc(target_path).decode(ENCODING), "html.parser")
 
     # Get all tags that start an Article
     art_tags = soup.findAll('p', attrs={'class': ['Titrearticle']})
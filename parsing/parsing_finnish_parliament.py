@@ -1,7 +1,7 @@
 import pathlib
 from eia_crawling.spiders.utils import write_csv
+from eia_crawling.parsing.pdf_extraction import extract_tika_text
 import re
-from tika import parser
 import datetime
 
 parliament = "Eduskunta"
@@ -335,8 +335,7 @@ def parse_finnish_parliament(source_pdf_path: pathlib,
     # What is going to be the name of the written file?
     file_name = source_pdf_path.stem
     SESSION = file_name
-    rawText = parser.from_file(str(source_pdf_path))
-    rows = rawText['content'].splitlines()
+    rows = extract_tika_text(source_pdf_path).splitlines()
 
     rows = clean_blanks_beginning(rows)
 
@@ -1,8 +1,9 @@
 from docx import Document
+from io import BytesIO
 import pathlib
 import os
 import re
-from eia_crawling.spiders.utils import write_csv
+from eia_crawling.spiders.utils import write_csv, read_source_doc
 
 DATE_MATCH = '.*2019.*'
 
@@ -94,7 +95,7 @@ def parse_greek_parliament(year_path: pathlib.Path,
                            year: int,
                            source_doc_path: pathlib.Path):
 
-        document = Document(source_doc_path)
+        document = Document(BytesIO(read_source_doc(source_doc_path)))
         file_name = source_doc_path.stem
         parsed_file = []
 
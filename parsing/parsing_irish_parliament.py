@@ -1,7 +1,7 @@
 import pathlib
 from lxml import etree
 import datetime
-from eia_crawling.spiders.utils import write_csv, normalize_string
+from eia_crawling.spiders.utils import write_csv, normalize_string, read_source_doc
 import re
 
 
@@ -16,7 +16,7 @@ def parse_irish_parliament(year_path: pathlib.Path,
 
     # Read source root and define namespace for xpath queries
     ns = {'d': 'http://docs.oasis-open.org/legaldocml/ns/akn/3.0/CSD13'}
-    xml = etree.parse(str(source_xml_path))
+    xml = etree.ElementTree(etree.fromstring(read_source_doc(source_xml_path)))
 
     # Get the date of the session
     date = file_name.split('_')[0]
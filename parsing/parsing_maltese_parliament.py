@@ -3,7 +3,7 @@ import win32com.client as win32
 import pathlib
 import re
 from eia_crawling.spiders.utils import get_parliament_name, get_iso_2_digit_code, get_iso_3_digit_code, write_csv, \
-    normalize_string
+    normalize_string, materialize_source_doc
 
 COUNTRY = 'malta'
 
@@ -20,9 +20,9 @@ def save_as_docx(doc_path):
 def parse_maltese_parliament(source_doc_path: pathlib,
                              year_path: pathlib.Path,
                              year: int):
-    save_as_docx(str(source_doc_path))
-
-    doc = Document(str(pathlib.Path(source_doc_path).with_suffix('.docx')))
+    with materialize_source_doc(source_doc_path) as doc_path:
+        save_as_docx(str(doc_path))
+        doc = Document(str(pathlib.Path(doc_path).with_suffix('.docx')))
 
     # Extract and remove comments to the session that appear in between speeches
     breaking_lines = []
@@ -6,8 +6,7 @@ import requests
 from bs4 import BeautifulSoup
 import datetime
 import re
-from eia_crawling.spiders.utils import write_csv
-import codecs
+from eia_crawling.spiders.utils import write_csv, read_source_doc
 
 # Agenda points that are not specifically marked in the HTML, but used in the existing Austrian data
 SECTION_HTML_TAG = ['strtngt_presinnlegg',
@@ -228,8 +227,7 @@ def open_file(source_html_path, meta_json_path):
     print("Process: {url}".format(url=url))
 
     # Read source html
-    f = codecs.open(source_html_path, 'r', 'utf-8')
-    response = BeautifulSoup(f.read(), 'html.parser')
+    response = BeautifulSoup(read_source_doc(source_html_path).decode('utf-8'), 'html.parser')
 
     return file_name, response
 
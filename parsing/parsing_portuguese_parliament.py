@@ -1,21 +1,16 @@
 import pathlib
 import datetime
+import zipfile
 from docx import Document
-from io import StringIO
-from pdfminer.converter import TextConverter
-from pdfminer.layout import LAParams
-from pdfminer.pdfdocument import PDFDocument
-from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
-from pdfminer.pdfpage import PDFPage
-from pdfminer.pdfparser import PDFParser
-from pdfminer.high_level import extract_pages
-from pdfminer.layout import LTTextContainer
+from docx.opc.exceptions import PackageNotFoundError
 import re
 import pandas as pd
 import numpy as np
 import math
-from eia_crawling.spiders.utils import get_parliament_name, get_iso_2_digit_code, get_iso_3_digit_code, write_csv, \
+from eia_crawling.spiders.utils import get_parliament_name, get_iso_2_digit_code, get_iso_3_digit_code, \
     normalize_string
+from eia_crawling.parsing.pdf_extraction import iter_pdfminer_lines
+from eia_crawling.parsing.row_sinks import write_rows
 
 COUNTRY = 'portugal'
 
@@ -46,32 +41,10 @@ MONTHS_DCT = {'Janeiro': 1,
 
 SPEAKER_ROLES = re.compile(r'(Secretário|Presidente|Secretária|Ministro)')
 
-output_string = StringIO()
-
 
 def parse_portuguese_parliament(source_pdf_path: pathlib,
                                 year_path: pathlib.Path,
                                 year: int):
-    with open(str(source_pdf_path), 'rb') as in_file:
-        parser = PDFParser(in_file)
-        doc = PDFDocument(parser)
-        rsrcmgr = PDFResourceManager()
-        device = TextConverter(rsrcmgr, output_string, laparams=LAParams())
-        interpreter = PDFPageInterpreter(rsrcmgr, device)
-        for page in PDFPage.create_pages(doc):
-            interpreter.process_page(page)
-
-    doc_lines = []
-
-    for page_layout in extract_pages(str(source_pdf_path)):
-        for element in page_layout:
-            if isinstance(element, LTTextContainer):
-                for line in element:
-                    text_line = line.get_text()
-                    text_line = text_line.strip('\n')
-                    bbox = line.bbox
-                    doc_lines.append([text_line, bbox])
-
     # Get speech breakers
     def get_speech_breakers(path: pathlib):
         """
@@ -100,16 +73,18 @@ def parse_portuguese_parliament(source_pdf_path: pathlib,
 
     # Filter out speech breakers
     try:
-        breaking_lines = get_speech_breakers(source_pdf_path)
-    except:
-        breaking_lines = []
-        print('DOCUMENT NOT PROCESSED')
-
-    doc_lines = [i for i in doc_lines if re.sub(r'[^\w\s]', '', i[0].strip()) not in breaking_lines]
-
-    # Filter out lines with page numbers
+        breaking_lines = set(get_speech_breakers(source_pdf_path))
+    except (OSError, PackageNotFoundError, zipfile.BadZipFile, KeyError) as e:
+        # The .docx conversion of the PDF is missing or broken, the speech breakers stay in the text
+        breaking_lines = set()
+        print(f' Doc: {source_pdf_path.stem} Speech breakers not removed: {e!r}')
+
+    # Lines of the document, streamed page by page (and cached, see pdf_extraction.py) without the speech breakers
+    # and the lines with page numbers
     page_pattern = re.compile(r'^\d+$')
-    doc_lines = [i for i in doc_lines if not re.match(page_pattern, i[0].strip())]
+    doc_lines = [i for i in iter_pdfminer_lines(source_pdf_path)
+                 if re.sub(r'[^\w\s]', '', i[0].strip()) not in breaking_lines
+                 and not re.match(page_pattern, i[0].strip())]
 
     # Parse date,then filter out lines with date
     date_pattern = re.compile(r'^\d+\s+DE\s+'.format('|'.join(map(lambda x: x.upper(), MONTHS_DCT.keys()))))
@@ -246,4 +221,4 @@ def parse_portuguese_parliament(source_pdf_path: pathlib,
     # Write parsed document
     file_name = source_pdf_path.stem
     path = year_path.joinpath(f"{file_name}_parsed.csv")
-    output_data.to_csv(path, index=False)
+    write_rows(path, output_data.to_dict('records'), fieldnames=list(output_data.columns), source_path=source_pdf_path)
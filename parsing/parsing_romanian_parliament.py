@@ -3,7 +3,7 @@ import pathlib
 from scrapy.http import HtmlResponse
 import datetime
 import numpy as np
-from eia_crawling.spiders.utils import write_csv, normalize_string
+from eia_crawling.spiders.utils import write_csv, normalize_string, read_source_doc
 
 
 # Helper method
@@ -22,8 +22,7 @@ def parse_romanian_parliament(year_path: pathlib.Path,
     file_name = source_html_path.stem
 
     # Read source html
-    source_f = open(source_html_path, "rb")
-    source_html = source_f.read()
+    source_html = read_source_doc(source_html_path)
     response = HtmlResponse(url="", body=source_html)
 
     parsed_output = []
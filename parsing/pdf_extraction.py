@@ -0,0 +1,324 @@
+# Cached PDF text extraction
+#
+# The Belgian (pdfminer columns), Finnish (tika) and Portuguese (pdfminer) parsers spend most of their time extracting the
+# text of the PDFs, which never change once they are crawled. The extraction results are cached zstd compressed in
+# <data>/pdf_cache/<extractor>/<h[:2]>/<h>.json.zst, keyed on the hash of the PDF, the extractor and its options,
+# so that parsing a year again only runs the parser. Line extractions are streamed: the lines are written to and read
+# from <h>.jsonl.zst one at a time, so neither the extraction nor its json is held as a whole.
+# Large PDFs can be extracted in page ranges on several processes (PDF_PAGE_WORKERS), the ranges are joined in page
+# order to the same output as the extraction of the whole document (pdfminer, tika is never split).
+
+import pathlib
+import hashlib
+import io
+import json
+import os
+import math
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+import zstandard
+
+from eia_crawling.spiders.source_store import DATA
+from eia_crawling.spiders.utils import materialize_source_doc, source_doc_digest
+
+# Define string constants
+PDF_CACHE = 'pdf_cache'
+TIKA = 'tika'
+PDFMINER_LINES = 'pdfminer_lines'
+PDFMINER_COLUMNS = 'pdfminer_columns'
+# Set to 0 to extract without reading or writing the cache
+PDF_CACHE_ENV = 'PDF_EXTRACTION_CACHE'
+# Folder of the cache (default: <data>/pdf_cache)
+PDF_CACHE_DIR_ENV = 'PDF_EXTRACTION_CACHE_DIR'
+# Bump to invalidate all cached extractions (e.g. after a change of the line extraction)
+EXTRACTION_VERSION = 1
+COMPRESSION_LEVEL = 10
+# Number of processes extracting the page ranges of one PDF (parse_national --page_workers)
+PAGE_WORKERS_ENV = 'PDF_PAGE_WORKERS'
+MIN_RANGE_PAGES = 10
+# Two column layouts: the column boundary is searched in the middle of the page (share of the page width),
+# characters of different columns are at least COLUMN_GAP points apart, fragments of one line within LINE_TOLERANCE
+COLUMN_SEARCH = (0.3, 0.7)
+COLUMN_GAP = 6
+LINE_TOLERANCE = 2
+MISSING = object()
+
+
+def extraction_key(digest: str, extractor: str, options: dict) -> str:
+    key = {'sha256': digest, 'extractor': extractor, 'options': options, 'version': EXTRACTION_VERSION}
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class ExtractionCache:
+    """Extraction results (anything json serializable) of the PDFs, one compressed file per key."""
+
+    def __init__(self, cache_dir: pathlib.Path = None) -> None:
+        cache_dir = cache_dir or os.environ.get(PDF_CACHE_DIR_ENV)
+        self.cache_dir = pathlib.Path(cache_dir) if cache_dir else DATA.joinpath(PDF_CACHE)
+        self.compressor = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL)
+        self.decompressor = zstandard.ZstdDecompressor()
+
+    def path(self, extractor: str, key: str) -> pathlib.Path:
+        return self.cache_dir.joinpath(extractor, key[:2], f'{key}.json.zst')
+
+    def stream_path(self, extractor: str, key: str) -> pathlib.Path:
+        return self.cache_dir.joinpath(extractor, key[:2], f'{key}.jsonl.zst')
+
+    def get(self, extractor: str, key: str, default=None):
+        """Cached result, default if the extraction is not cached."""
+        path = self.path(extractor, key)
+        if not path.is_file():
+            return default
+        with open(path, 'rb') as file:
+            return json.loads(self.decompressor.decompress(file.read()).decode('utf-8'))['result']
+
+    def set(self, extractor: str, key: str, result) -> None:
+        path = self.path(extractor, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first, parallel parser processes must never read a partial entry
+        tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        with open(tmp_path, 'wb') as file:
+            file.write(self.compressor.compress(json.dumps({'result': result}).encode('utf-8')))
+        os.replace(tmp_path, path)
+
+    def iter_stream(self, extractor: str, key: str, default=None):
+        """The cached items of a streamed extraction one by one, default if the extraction is not cached."""
+        path = self.stream_path(extractor, key)
+        if not path.is_file():
+            return default
+
+        def items():
+            with open(path, 'rb') as file, self.decompressor.stream_reader(file) as reader:
+                for line in io.TextIOWrapper(reader, encoding='utf-8'):
+                    yield json.loads(line)
+        return items()
+
+    def write_stream(self, extractor: str, key: str, items):
+        """Passes the items through and caches them, the entry only exists once all items were written."""
+        path = self.stream_path(extractor, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        try:
+            with open(tmp_path, 'wb') as file, self.compressor.stream_writer(file, closefd=False) as writer:
+                for item in items:
+                    writer.write(json.dumps(item).encode('utf-8') + b'\n')
+                    yield item
+            os.replace(tmp_path, path)
+        finally:
+            # An extraction that failed or was not consumed to the end is not cached
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+
+def use_cache() -> bool:
+    return os.environ.get(PDF_CACHE_ENV, '1') != '0'
+
+
+def cached_extraction(source_pdf_path: pathlib.Path, extractor: str, options: dict, extract):
+    """
+    Result of extract(pdf_path, **options) for a source document, taken from the cache if the same PDF was extracted
+    with the same extractor and options before. The source document may be stored (see spiders/source_store.py).
+    """
+    if not use_cache():
+        with materialize_source_doc(source_pdf_path) as pdf_path:
+            return extract(pdf_path, **options)
+    cache = ExtractionCache()
+    key = extraction_key(source_doc_digest(source_pdf_path), extractor, options)
+    result = cache.get(extractor, key, MISSING)
+    if result is MISSING:
+        with materialize_source_doc(source_pdf_path) as pdf_path:
+            result = extract(pdf_path, **options)
+        cache.set(extractor, key, result)
+    return result
+
+
+def cached_stream_extraction(source_pdf_path: pathlib.Path, extractor: str, options: dict, extract):
+    """Like cached_extraction, for an extract(pdf_path, **options) that yields its result item by item."""
+    if not use_cache():
+        with materialize_source_doc(source_pdf_path) as pdf_path:
+            yield from extract(pdf_path, **options)
+        return
+    cache = ExtractionCache()
+    key = extraction_key(source_doc_digest(source_pdf_path), extractor, options)
+    items = cache.iter_stream(extractor, key)
+    if items is not None:
+        yield from items
+        return
+    with materialize_source_doc(source_pdf_path) as pdf_path:
+        yield from cache.write_stream(extractor, key, extract(pdf_path, **options))
+
+
+def get_page_workers() -> int:
+    return max(int(os.environ.get(PAGE_WORKERS_ENV, 1)), 1)
+
+
+def page_ranges(n_pages: int, workers: int) -> List[Tuple[int, int]]:
+    """Contiguous (first, last) page ranges (zero based, last excluded), one per worker, of MIN_RANGE_PAGES or more."""
+    range_pages = max(math.ceil(n_pages / workers), MIN_RANGE_PAGES)
+    return [(first, min(first + range_pages, n_pages)) for first in range(0, n_pages, range_pages)]
+
+
+def extract_page_ranges(pdf_path: pathlib.Path, n_pages: int, extract_range, workers: int, **options) -> list:
+    """
+    Results of extract_range(pdf_path, first, last, **options) for the page ranges of the PDF, in page order.
+    The ranges are extracted in a process pool, a short document is extracted in one range in this process.
+    """
+    ranges = page_ranges(n_pages, workers)
+    if len(ranges) <= 1:
+        return [extract_range(pdf_path, 0, n_pages, **options)]
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as executor:
+        futures = [executor.submit(extract_range, pdf_path, first, last, **options) for first, last in ranges]
+        return [future.result() for future in futures]
+
+
+def count_pdfminer_pages(pdf_path: pathlib.Path) -> int:
+    from pdfminer.pdfpage import PDFPage
+    with open(pdf_path, 'rb') as file:
+        return sum(1 for _ in PDFPage.get_pages(file))
+
+
+def _tika_text(pdf_path: pathlib.Path, **options) -> str:
+    # tika always extracts the whole document: the content of page range PDFs differs from it (page separators,
+    # metadata), which would give different cached results for the same key
+    from tika import parser
+    return parser.from_file(str(pdf_path), **options)['content']
+
+
+def iter_pdf_lines(pdf_path: pathlib.Path, **options):
+    """
+    Yields [text, bbox] of every text line of the PDF, page by page: pdfminer lays out one page at a time and the
+    layout of a page is released as soon as its lines are yielded, so memory does not grow with the document.
+    """
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTTextContainer
+    for page_layout in extract_pages(str(pdf_path), **options):
+        page_lines = [[line.get_text().strip('\n'), list(line.bbox)]
+                      for element in page_layout if isinstance(element, LTTextContainer)
+                      for line in element]
+        del page_layout
+        yield from page_lines
+
+
+def _pdfminer_lines_range(pdf_path: pathlib.Path, first: int, last: int, **options) -> list:
+    return list(iter_pdf_lines(pdf_path, page_numbers=range(first, last), **options))
+
+
+def _pdfminer_lines(pdf_path: pathlib.Path, **options):
+    workers = get_page_workers()
+    if workers > 1 and 'page_numbers' not in options:
+        ranges_lines = extract_page_ranges(pdf_path, count_pdfminer_pages(pdf_path), _pdfminer_lines_range, workers,
+                                           **options)
+        return (line for range_lines in ranges_lines for line in range_lines)
+    return iter_pdf_lines(pdf_path, **options)
+
+
+def find_column_boundary(chars: list, width: float) -> float:
+    """
+    x coordinate between the two columns of a page: the centre of the longest run of the least covered 1pt bins of
+    the character coverage histogram in the middle of the page (COLUMN_SEARCH). Headers, footers or tables that run
+    across the columns only raise the minimum, they do not move it.
+    """
+    histogram = [0] * (int(math.ceil(width)) + 1)
+    for _, x0, x1 in chars:
+        for x in range(max(int(x0), 0), min(int(math.ceil(x1)), len(histogram))):
+            histogram[x] += 1
+    start, end = int(width * COLUMN_SEARCH[0]), int(width * COLUMN_SEARCH[1])
+    window = histogram[start:end]
+    if not window or not chars:
+        return width / 2
+    minimum = min(window)
+    best_start, best_length, run_start = start, 0, None
+    for x in range(start, end + 1):
+        if x < end and histogram[x] == minimum:
+            run_start = x if run_start is None else run_start
+        elif run_start is not None:
+            if x - run_start > best_length:
+                best_start, best_length = run_start, x - run_start
+            run_start = None
+    return best_start + best_length / 2
+
+
+def join_fragments(fragments: list) -> list:
+    """Sorts the [text, bbox] lines of a column top to bottom and joins the fragments that are on the same line."""
+    lines = []
+    for text, bbox in sorted(fragments, key=lambda fragment: (-fragment[1][3], fragment[1][0])):
+        if lines and abs(lines[-1][1][1] - bbox[1]) <= LINE_TOLERANCE:
+            last_text, last_bbox = lines[-1]
+            lines[-1] = [f'{last_text} {text}', [min(last_bbox[0], bbox[0]), min(last_bbox[1], bbox[1]),
+                                                 max(last_bbox[2], bbox[2]), max(last_bbox[3], bbox[3])]]
+        else:
+            lines.append([text, bbox])
+    return lines
+
+
+def iter_pdf_columns(pdf_path: pathlib.Path, **options):
+    """
+    Yields the text of every page of a two column PDF, split on the character x coordinates:
+    {'boundary': x, 'columns': [left lines, right lines], 'spanning': lines}, each line [text, bbox].
+    A line that has characters on both sides of the boundary is split unless the two sides are closer than
+    COLUMN_GAP, such lines (headers, footers, ...) are returned as spanning.
+    """
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTTextContainer, LTChar
+    for page_layout in extract_pages(str(pdf_path), **options):
+        # (text, x0, x1) of the characters of every line, virtual spaces get the coordinates of the previous char
+        lines = []
+        for element in page_layout:
+            if isinstance(element, LTTextContainer):
+                for line in element:
+                    line_chars = []
+                    for char in line:
+                        if isinstance(char, LTChar):
+                            line_chars.append((char.get_text(), char.x0, char.x1))
+                        elif line_chars:
+                            line_chars.append((char.get_text(), line_chars[-1][2], line_chars[-1][2]))
+                    if line_chars:
+                        lines.append((line_chars, line.bbox))
+        width = page_layout.width
+        del page_layout
+        boundary = find_column_boundary([char for line_chars, _ in lines for char in line_chars], width)
+
+        columns = [[], []]
+        spanning = []
+        for line_chars, (_, y0, _, y1) in lines:
+            sides = [[char for char in line_chars if (char[1] + char[2]) / 2 < boundary],
+                     [char for char in line_chars if (char[1] + char[2]) / 2 >= boundary]]
+            if sides[0] and sides[1] and \
+                    min(char[1] for char in sides[1]) - max(char[2] for char in sides[0]) < COLUMN_GAP:
+                spanning.append([''.join(char[0] for char in line_chars).strip(),
+                                 [line_chars[0][1], y0, line_chars[-1][2], y1]])
+                continue
+            for column, side in zip(columns, sides):
+                text = ''.join(char[0] for char in side).strip()
+                if text:
+                    column.append([text, [min(char[1] for char in side), y0, max(char[2] for char in side), y1]])
+        yield {'boundary': boundary, 'columns': [join_fragments(column) for column in columns],
+               'spanning': spanning}
+
+
+def _pdfminer_columns_range(pdf_path: pathlib.Path, first: int, last: int, **options) -> list:
+    return list(iter_pdf_columns(pdf_path, page_numbers=range(first, last), **options))
+
+
+def _pdfminer_columns(pdf_path: pathlib.Path, **options) -> list:
+    workers = get_page_workers()
+    if workers > 1 and 'page_numbers' not in options:
+        ranges_pages = extract_page_ranges(pdf_path, count_pdfminer_pages(pdf_path), _pdfminer_columns_range,
+                                           workers, **options)
+        return [page for range_pages in ranges_pages for page in range_pages]
+    return list(iter_pdf_columns(pdf_path, **options))
+
+
+def extract_tika_text(source_pdf_path: pathlib.Path, **options) -> str:
+    """Text content of the PDF extracted by tika (None for an empty document)."""
+    return cached_extraction(source_pdf_path, TIKA, options, _tika_text)
+
+
+def iter_pdfminer_lines(source_pdf_path: pathlib.Path, **options):
+    """Yields [text, bbox] of every text line of the PDF in the order pdfminer lays them out (see iter_pdf_lines)."""
+    return cached_stream_extraction(source_pdf_path, PDFMINER_LINES, options, _pdfminer_lines)
+
+
+def extract_pdfminer_columns(source_pdf_path: pathlib.Path, **options) -> list:
+    """The pages of a two column PDF split into their columns (see iter_pdf_columns)."""
+    return cached_extraction(source_pdf_path, PDFMINER_COLUMNS, options, _pdfminer_columns)
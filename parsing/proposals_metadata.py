@@ -2,6 +2,7 @@ import pathlib
 from bs4 import BeautifulSoup
 import csv
 import re
+from eia_crawling.spiders.utils import read_source_doc, source_doc_exists
 from parsing_eu_proposal import parse_eu_proposal_not_formatted, parse_eu_proposal_formatted
 from parsing_eu_final_act_full import parse_eu_final_act_full
 
@@ -30,10 +31,10 @@ for year in ROOT_PATH.iterdir():
         proposal_path = cod.joinpath('full', 'source').joinpath('full_legislative_proposal_1.html')
         full_act_path = cod.joinpath('full', 'source').joinpath('full_final_act_1.html')
 
-        if proposal_path.exists() and proposal_path not in EXCLUDE:
+        if source_doc_exists(proposal_path) and proposal_path not in EXCLUDE:
 
             # Convert .html to Beautiful Soup object
-            soup = BeautifulSoup(open(str(proposal_path), encoding=ENCODING), "html.parser")
+            soup = BeautifulSoup(read_source_doc(proposal_path).decode(ENCODING), "html.parser")
 
             # Check if document is formatted
             formatted = 1
@@ -89,7 +90,7 @@ for year in ROOT_PATH.iterdir():
 
         embedded_dct_final = dict.fromkeys(EMBED_VOCAB, 0)
         celex_final = None
-        if full_act_path.exists():
+        if source_doc_exists(full_act_path):
             output = parse_eu_final_act_full(full_act_path.parent, 'full_final_act_1')
             output_len = len(output)
             for art in output:
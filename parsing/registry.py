@@ -0,0 +1,119 @@
+import importlib
+import importlib.util
+import hashlib
+import pathlib
+
+# Define string constants
+PARSING_PACKAGE = 'eia_crawling.parsing'
+# Meta data rules
+JSON_SIDECAR = 'json_sidecar'
+# All parsers write <source file name>_parsed.csv to the year folder
+OUTPUT_SUFFIX = '_parsed.csv'
+# Shared modules the output of the parsers depends on (PDF extraction, output formats, source documents)
+HELPER_MODULES = ['eia_crawling.parsing.pdf_extraction', 'eia_crawling.parsing.row_sinks', 'eia_crawling.spiders.utils']
+
+
+class NationalParser:
+    """
+    Parser of a national folder: the glob pattern of its source documents, the keyword argument the source path is
+    passed as, an optional meta data rule and the parser function, which is only imported when it is first used
+    (the parsers depend on textract, tika, pdfminer, python-docx, ...).
+
+    Meta data rules:
+    - JSON_SIDECAR: the <report_name>.json next to the source document
+    - a glob pattern: the meta data documents of the year, paired with the source documents in sorted order
+    """
+
+    def __init__(self, country: str, module: str, function: str, pattern: str, source_argument: str,
+                 meta: str = None, meta_argument: str = None) -> None:
+        self.country = country
+        self.module = module
+        self.function = function
+        self.pattern = pattern
+        self.source_argument = source_argument
+        self.meta = meta
+        self.meta_argument = meta_argument
+        self._parser = None
+
+    @property
+    def module_name(self) -> str:
+        return f'{PARSING_PACKAGE}.{self.module}'
+
+    def load(self):
+        if self._parser is None:
+            self._parser = getattr(importlib.import_module(self.module_name), self.function)
+        return self._parser
+
+    def version(self) -> str:
+        """Short hash of the source code of the parser module and the helper modules (without importing them)."""
+        digest = hashlib.sha256()
+        for module_name in [self.module_name] + HELPER_MODULES:
+            digest.update(pathlib.Path(importlib.util.find_spec(module_name).origin).read_bytes())
+        return digest.hexdigest()[:12]
+
+    @staticmethod
+    def output_path(year_path: pathlib.Path, source_file_p: pathlib.Path) -> pathlib.Path:
+        return year_path.joinpath(f'{source_file_p.stem}{OUTPUT_SUFFIX}')
+
+    def meta_files(self, source_files_p: list, find_files) -> list:
+        """Meta data document of every source document (None if the parser does not take one)."""
+        if self.meta is None:
+            return [None] * len(source_files_p)
+        if self.meta == JSON_SIDECAR:
+            return [source_file_p.with_suffix('.json') for source_file_p in source_files_p]
+        return find_files(self.meta)
+
+    def parse(self, year_path: pathlib.Path, year: int, source_file_p: pathlib.Path,
+              meta_file_p: pathlib.Path = None) -> None:
+        kwargs = {'year_path': year_path, 'year': year, self.source_argument: source_file_p}
+        if self.meta_argument is not None:
+            kwargs[self.meta_argument] = meta_file_p
+        self.load()(**kwargs)
+
+
+PARSERS = {}
+
+
+def register(country: str, module: str, function: str, pattern: str, source_argument: str,
+             meta: str = None, meta_argument: str = None) -> NationalParser:
+    PARSERS[country] = NationalParser(country, module, function, pattern, source_argument, meta, meta_argument)
+    return PARSERS[country]
+
+
+def get_parser(country: str) -> NationalParser:
+    if country not in PARSERS:
+        raise KeyError(f'No parser registered for {country}')
+    return PARSERS[country]
+
+
+# HTML
+register('france', 'parsing_french_parliament', 'parse_french_parliament', '*.html', 'source_html_path',
+         meta=JSON_SIDECAR, meta_argument='meta_json_path')
+register('austria', 'parsing_austrian_parliament', 'parse_austrian_parliament', '*.html', 'source_html_path',
+         meta=JSON_SIDECAR, meta_argument='meta_json_path')
+register('estonia', 'parsing_estonian_parliament', 'parse_estonian_parliament', '*.html', 'source_html_path',
+         meta=JSON_SIDECAR, meta_argument='meta_json_path')
+register('denmark', 'parsing_danish_parliament', 'parse_danish_parliament', '*.html', 'source_html_path')
+register('hungary', 'parsing_hungarian_parliament', 'parse_hungarian_parliament', '*.html', 'source_html_path')
+register('lithuania', 'parsing_lithuanian_parliament', 'parse_lithuanian_parliament', '*.html', 'source_html_path')
+register('romania', 'parsing_romanian_parliament', 'parse_romanian_parliament', '*.html', 'source_html_path')
+register('bulgaria', 'parsing_bulgarian_parliament', 'parse_bulgarian_parliament', '*.html', 'source_html_path')
+register('united_kingdom', 'parsing_uk_parliament', 'parse_uk_parliament', '*.html', 'source_html_path')
+register('sweeden', 'parsing_swedish_parliament', 'parse_swedish_parliament', '*.html', 'source_html_path')
+# XML
+register('germany', 'parsing_german_parliament', 'parse_german_parliament', '*.xml', 'source_xml_path')
+register('ireland', 'parsing_irish_parliament', 'parse_irish_parliament', '*.xml', 'source_xml_path')
+register('ep', 'parsing_ep_parliament', 'parse_ep_parliament', '*.xml', 'source_xml_path')
+register('poland', 'parsing_polish_parliament', 'parse_polish_parliament', '*text_structure.xml', 'source_xml_path',
+         meta='*header.xml', meta_argument='meta_xml_path')
+# PDF
+register('belgium', 'parsing_belgian_parliament', 'parse_belgian_parliament', '*.pdf', 'source_pdf_path',
+         meta=JSON_SIDECAR, meta_argument='meta_json_path')
+register('portugal', 'parsing_portuguese_parliament', 'parse_portuguese_parliament', '*.pdf', 'source_pdf_path')
+register('finland', 'parsing_finnish_parliament', 'parse_finnish_parliament', '*.pdf', 'source_pdf_path')
+# Word
+register('malta', 'parsing_maltese_parliament', 'parse_maltese_parliament', '*.doc', 'source_doc_path')
+register('slovakia', 'parsing_slovakian_parliament', 'parse_slovakian_parliament', '*.docx', 'source_doc_path')
+register('greece', 'parsing_greek_parliament', 'parse_greek_parliament', '*.docx', 'source_doc_path')
+# Text
+register('cyprus', 'parsing_cypriot_parliament', 'parse_cypriot_parliament', '*.txt', 'source_txt_path')
@@ -0,0 +1,332 @@
+import pathlib
+import os
+import csv
+import codecs
+import json
+import math
+import numbers
+import contextlib
+import tempfile
+from typing import Iterable, List
+
+# Define string constants
+CSV = 'csv'
+PARQUET = 'parquet'
+CATALOG = 'catalog'
+# Output format of write_rows, parse_national sets it for all parser processes (--output_format)
+OUTPUT_FORMAT_ENV = 'PARSE_OUTPUT_FORMAT'
+# Rows that are buffered before they are written
+FLUSH_ROWS = 1000
+PARQUET_BATCH_ROWS = 10000
+PARQUET_COMPRESSION = 'zstd'
+# Column descriptions of the parsed output, the parquet schema follows their order
+FIELDNAMES_CONFIG = pathlib.Path(__file__).absolute().parent.parent.joinpath('config', 'fieldnames.json')
+INTEGER_FIELDS = ['speechnumber', 'paragraphnumber']
+# Metadata that repeats on every paragraph of a session, stored as dictionary (categorical) columns
+DICTIONARY_FIELDS = ['date', 'agenda', 'speaker', 'party', 'parliament', 'iso3country', 'partyname', 'speakerrole']
+
+
+class RowSink:
+    """
+    Receives the parsed rows of one source document and writes them incrementally, so that a parser never has to
+    keep the rows of a whole session in memory. The output only replaces an existing one when the sink is closed
+    without an error (use it as a context manager).
+    """
+
+    def __init__(self, fieldnames: List[str]) -> None:
+        self.fieldnames = fieldnames
+        self.rows = 0
+
+    def write(self, row: dict) -> None:
+        raise NotImplementedError
+
+    def write_rows(self, rows: Iterable[dict]) -> int:
+        for row in rows:
+            self.write(row)
+        return self.rows
+
+    def close(self) -> None:
+        raise NotImplementedError
+
+    def abort(self) -> None:
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+class CsvRowSink(RowSink):
+    """<name>.csv, written like spiders.utils.write_csv"""
+
+    def __init__(self, path: pathlib.Path, fieldnames: List[str]) -> None:
+        super().__init__(fieldnames)
+        self.path = pathlib.Path(path).with_suffix('.csv')
+        self.tmp_path = self.path.with_name(f'{self.path.name}.{os.getpid()}.tmp')
+        self.file = codecs.open(self.tmp_path, "w", encoding="utf-8")
+        self.writer = csv.DictWriter(self.file, fieldnames=fieldnames)
+        self.writer.writeheader()
+
+    def write(self, row: dict) -> None:
+        self.writer.writerow(row)
+        self.rows += 1
+        if self.rows % FLUSH_ROWS == 0:
+            self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self) -> None:
+        self.file.close()
+        self.tmp_path.unlink()
+
+
+def load_fieldnames_config() -> dict:
+    with open(FIELDNAMES_CONFIG, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def parquet_fields(fieldnames: List[str]) -> List[str]:
+    """The fieldnames of a parser in the order of config/fieldnames.json, additional fields at the end."""
+    config_fieldnames = list(load_fieldnames_config())
+    return ([fieldname for fieldname in config_fieldnames if fieldname in fieldnames] +
+            [fieldname for fieldname in fieldnames if fieldname not in config_fieldnames])
+
+
+def parquet_schema(fieldnames: List[str], integer_fields: List[str] = INTEGER_FIELDS):
+    """
+    Parquet schema of a parser output: speech and paragraph numbers as integers, the metadata repeated on every
+    row dictionary encoded, the text and any other field as plain strings.
+    """
+    import pyarrow as pa
+    fields = []
+    for fieldname in parquet_fields(fieldnames):
+        if fieldname in integer_fields:
+            fields.append(pa.field(fieldname, pa.int64()))
+        elif fieldname in DICTIONARY_FIELDS:
+            fields.append(pa.field(fieldname, pa.dictionary(pa.int32(), pa.string())))
+        else:
+            fields.append(pa.field(fieldname, pa.string()))
+    return pa.schema(fields)
+
+
+def is_missing(value) -> bool:
+    """None, empty strings and NaN (e.g. of pandas) are written as nulls."""
+    return value is None or value == '' or (isinstance(value, numbers.Real) and math.isnan(value))
+
+
+def to_integer(value):
+    """The value as int (None for missing values), raises ValueError if it is not integral (e.g. 12.5 or '12a')."""
+    if is_missing(value):
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f'Not an integer: {value!r}')
+    # Python and numpy integers
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    if isinstance(value, numbers.Real) and float(value).is_integer():
+        return int(value)
+    if isinstance(value, str) and value.strip().lstrip('+-').isdigit():
+        return int(value)
+    raise ValueError(f'Not an integer: {value!r}')
+
+
+def is_integer(value) -> bool:
+    try:
+        to_integer(value)
+    except ValueError:
+        return False
+    return True
+
+
+class ParquetRowSink(RowSink):
+    """
+    <name>.parquet (see parquet_schema), every PARQUET_BATCH_ROWS rows are written as a row group.
+    Dictionary columns are read back as pandas categoricals.
+    Speech and paragraph numbers are stored as integers as long as all their values are integral. A later batch with
+    other values (e.g. the EP speech numbers are intervention ids) turns the column into strings, the row groups
+    written before are rewritten.
+    """
+
+    def __init__(self, path: pathlib.Path, fieldnames: List[str], batch_rows: int = PARQUET_BATCH_ROWS) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        super().__init__(parquet_fields(fieldnames))
+        self.pa = pa
+        self.pq = pq
+        self.path = pathlib.Path(path).with_suffix('.parquet')
+        self.tmp_path = self.path.with_name(f'{self.path.name}.{os.getpid()}.tmp')
+        # The schema is fixed with the first batch
+        self.schema = None
+        self.writer = None
+        self.batch_rows = batch_rows
+        self.batch = {fieldname: [] for fieldname in self.fieldnames}
+
+    def write(self, row: dict) -> None:
+        for fieldname in self.fieldnames:
+            value = row.get(fieldname)
+            self.batch[fieldname].append(None if is_missing(value) else value)
+        self.rows += 1
+        if len(self.batch[self.fieldnames[0]]) >= self.batch_rows:
+            self._flush()
+
+    def _open_writer(self) -> None:
+        integer_fields = [fieldname for fieldname in INTEGER_FIELDS
+                          if all(is_integer(value) for value in self.batch.get(fieldname, []))]
+        self.schema = parquet_schema(self.fieldnames, integer_fields)
+        self.writer = self.pq.ParquetWriter(str(self.tmp_path), self.schema, compression=PARQUET_COMPRESSION)
+
+    def _to_strings(self, fieldnames: List[str]) -> None:
+        """Turn integer columns into string columns, the rows written so far are rewritten with the new schema."""
+        self.writer.close()
+        written = self.pq.read_table(str(self.tmp_path))
+        integer_fields = [field.name for field in self.schema
+                          if self.pa.types.is_integer(field.type) and field.name not in fieldnames]
+        self.schema = parquet_schema(self.fieldnames, integer_fields)
+        self.writer = self.pq.ParquetWriter(str(self.tmp_path), self.schema, compression=PARQUET_COMPRESSION)
+        self.writer.write_table(written.cast(self.schema))
+
+    def _flush(self) -> None:
+        if self.writer is None:
+            self._open_writer()
+        if self.batch[self.fieldnames[0]]:
+            non_integral = [field.name for field in self.schema if self.pa.types.is_integer(field.type)
+                            and not all(is_integer(value) for value in self.batch[field.name])]
+            if non_integral:
+                self._to_strings(non_integral)
+            columns = {}
+            for field in self.schema:
+                if self.pa.types.is_integer(field.type):
+                    columns[field.name] = [to_integer(value) for value in self.batch[field.name]]
+                elif field.name in INTEGER_FIELDS:
+                    # Integral values as in the rows written before (4.0 -> '4')
+                    columns[field.name] = [None if value is None else str(to_integer(value)) if is_integer(value)
+                                           else str(value) for value in self.batch[field.name]]
+                else:
+                    columns[field.name] = [None if value is None else str(value) for value in self.batch[field.name]]
+            self.writer.write_table(self.pa.table(columns, schema=self.schema))
+            self.batch = {fieldname: [] for fieldname in self.fieldnames}
+
+    def close(self) -> None:
+        self._flush()
+        self.writer.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.tmp_path.unlink()
+
+
+class CatalogRowSink(RowSink):
+    """
+    Rows in the document catalog (parsed_rows table), keyed by the source document of the output path.
+    The rows are spooled to a temporary file while parsing and written to the catalog in one short transaction on
+    close, so that parallel parser processes do not hold the database lock for the duration of a parse.
+    """
+
+    def __init__(self, path: pathlib.Path, fieldnames: List[str], source_path: pathlib.Path) -> None:
+        super().__init__(fieldnames)
+        self.source_path = source_path
+        self.file = tempfile.TemporaryFile('w+', encoding='utf-8')
+
+    def write(self, row: dict) -> None:
+        self.file.write(json.dumps({fieldname: row.get(fieldname) for fieldname in self.fieldnames}, default=str))
+        self.file.write('\n')
+        self.rows += 1
+
+    def close(self) -> None:
+        from eia_crawling.spiders.catalog import get_document_catalog
+        self.file.seek(0)
+        try:
+            get_document_catalog().replace_rows(self.source_path, (line.rstrip('\n') for line in self.file))
+        finally:
+            self.file.close()
+
+    def abort(self) -> None:
+        self.file.close()
+
+
+def get_output_format() -> str:
+    return os.environ.get(OUTPUT_FORMAT_ENV, CSV)
+
+
+def open_row_sink(path: pathlib.Path, fieldnames: List[str], output_format: str = None,
+                  source_path: pathlib.Path = None) -> RowSink:
+    """Row sink for the output path of a parser (<year>/<name>_parsed.csv), the suffix follows the format."""
+    output_format = output_format or get_output_format()
+    if output_format == CSV:
+        return CsvRowSink(path, fieldnames)
+    if output_format == PARQUET:
+        return ParquetRowSink(path, fieldnames)
+    if output_format == CATALOG:
+        return CatalogRowSink(path, fieldnames, source_path)
+    raise ValueError(f'Unknown output format: {output_format}')
+
+
+def write_rows(path: pathlib.Path, rows: Iterable[dict], fieldnames: List[str], output_format: str = None,
+               source_path: pathlib.Path = None) -> int:
+    """
+    Streaming replacement of spiders.utils.write_csv: the parser yields its rows instead of collecting them in a list.
+    Returns the number of rows written.
+    """
+    with open_row_sink(path, fieldnames, output_format, source_path) as sink:
+        return sink.write_rows(rows)
+
+
+class ParquetDictReader:
+    """
+    csv.DictReader like reader of a parser output in parquet: iterates over the rows batch by batch, with the values
+    as csv.DictReader returns them (strings, '' for missing values).
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        import pyarrow.parquet as pq
+        self.parquet_file = pq.ParquetFile(str(path))
+        self.fieldnames = self.parquet_file.schema_arrow.names
+
+    def __iter__(self):
+        for batch in self.parquet_file.iter_batches(batch_size=PARQUET_BATCH_ROWS):
+            for row in batch.to_pylist():
+                yield {key: '' if value is None else str(value) for key, value in row.items()}
+
+
+def glob_parsed_outputs(year_path: pathlib.Path) -> List[pathlib.Path]:
+    """
+    Parser outputs of a year folder (csv and parquet), sorted by name.
+    If a document was parsed to both formats, the more recent output is returned.
+    """
+    outputs = {}
+    for path in list(year_path.glob('*.csv')) + list(year_path.glob('*.parquet')):
+        current = outputs.get(path.stem)
+        if current is None or path.stat().st_mtime > current.stat().st_mtime:
+            outputs[path.stem] = path
+    return [outputs[stem] for stem in sorted(outputs)]
+
+
+@contextlib.contextmanager
+def open_parsed_output(path: pathlib.Path):
+    """Reader of a parser output: csv.DictReader, or ParquetDictReader for <name>.parquet."""
+    path = pathlib.Path(path)
+    if path.suffix == '.parquet':
+        yield ParquetDictReader(path)
+    else:
+        with codecs.open(path, "r", encoding="utf-8") as file:
+            yield csv.DictReader(file)
+
+
+def count_output_rows(path: pathlib.Path) -> int:
+    """Number of rows of a parser output (<name>_parsed.csv or <name>_parsed.parquet)."""
+    path = pathlib.Path(path)
+    if path.suffix == '.parquet':
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(str(path)).metadata.num_rows
+    with open(path, 'r', encoding='utf-8', newline='') as file:
+        return max(sum(1 for _ in csv.reader(file)) - 1, 0)
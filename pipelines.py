@@ -4,10 +4,119 @@
 # See: https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 
 
+import logging
+
 # useful for handling different item types with a single interface
 from itemadapter import ItemAdapter
+from twisted.internet import reactor
+from twisted.internet.defer import Deferred, DeferredList, DeferredSemaphore
+from twisted.internet.threads import deferToThreadPool
+from twisted.python.failure import Failure
+from twisted.python.threadpool import ThreadPool
+
+from eia_crawling.items import SourceDocumentItem
+from eia_crawling.spiders.catalog import get_document_catalog
+from eia_crawling.spiders.utils import write_source_doc, write_meta, write_txt
+
+logger = logging.getLogger(__name__)
 
 
 class LegisObservatoryPipeline:
+    """
+    Persists SourceDocumentItems without blocking the reactor and records national documents in the catalog.
+
+    Documents are written on a thread pool, meta data is collected and written in batches. A batch is written once
+    it is full or when no document writes are left that could fill it.
+    At most FILE_WRITER_MAX_PENDING writes are in flight. As process_item returns a Deferred that fires once
+    the document and its meta data are written, Scrapy stops downloading new responses while the disk is behind and
+    an item is only done when nothing of it can be lost anymore.
+    """
+
+    def __init__(self, threads: int, max_pending: int, meta_batch_size: int) -> None:
+        self.threads = threads
+        self.max_pending = max_pending
+        self.meta_batch_size = meta_batch_size
+        self.threadpool = None
+        self.semaphore = None
+        self.meta_batch = []
+        self.pending = set()
+        # Documents whose write has not finished yet
+        self.writing = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(threads=settings.getint('FILE_WRITER_THREADS'),
+                   max_pending=settings.getint('FILE_WRITER_MAX_PENDING'),
+                   meta_batch_size=settings.getint('FILE_WRITER_META_BATCH_SIZE'))
+
+    def open_spider(self, spider):
+        self.threadpool = ThreadPool(minthreads=1, maxthreads=self.threads, name='file-writer')
+        self.threadpool.start()
+        self.semaphore = DeferredSemaphore(self.max_pending)
+
+    def close_spider(self, spider):
+        # Write the remaining meta data and wait for all writes before the thread pool is stopped
+        self._flush_meta()
+        d = DeferredList(list(self.pending))
+        d.addBoth(lambda _: self.threadpool.stop())
+        return d
+
     def process_item(self, item, spider):
-        return item
+        if not isinstance(item, SourceDocumentItem):
+            return item
+        adapter = ItemAdapter(item)
+        self.writing += 1
+        d = self._run(self._write_document, adapter.get('path'), adapter.get('body'), adapter.get('meta'))
+        d.addBoth(self._document_written, adapter.get('meta_path'), adapter.get('meta'))
+        d.addCallback(lambda _: item)
+        return d
+
+    def _run(self, f, *args):
+        d = self.semaphore.run(deferToThreadPool, reactor, self.threadpool, f, *args)
+        self.pending.add(d)
+
+        def _done(result):
+            self.pending.discard(d)
+            return result
+        return d.addBoth(_done)
+
+    def _document_written(self, result, meta_path, meta):
+        """Adds the meta data of a written document to the batch, the result fires once the batch is written."""
+        self.writing -= 1
+        if not isinstance(result, Failure) and meta is not None:
+            result = Deferred()
+            self.meta_batch.append((meta_path, meta, result))
+        # Without writes in flight the batch would only be written when the spider closes
+        if len(self.meta_batch) >= self.meta_batch_size or self.writing == 0:
+            self._flush_meta()
+        return result
+
+    def _flush_meta(self):
+        if not self.meta_batch:
+            return
+        batch, self.meta_batch = self.meta_batch, []
+        d = self._run(self._write_meta_batch, [(path, meta) for path, meta, _ in batch])
+
+        def _written(result):
+            if isinstance(result, Failure):
+                logger.error(f'Writing meta data failed: {result.getErrorMessage()}')
+            for _, _, item_d in batch:
+                if isinstance(result, Failure):
+                    item_d.errback(result)
+                else:
+                    item_d.callback(None)
+        d.addBoth(_written)
+
+    @staticmethod
+    def _write_document(path, body, meta):
+        if isinstance(body, str):
+            write_txt(path, body)
+        else:
+            digest = write_source_doc(path, body)
+            get_document_catalog().add(path, digest, len(body), meta)
+
+    @staticmethod
+    def _write_meta_batch(batch):
+        for path, meta in batch:
+            write_meta(path, meta)
@@ -0,0 +1,115 @@
+# Run several spiders in one process
+#
+# All spiders share one Twisted reactor: while a site waits for its download delay, the others keep downloading.
+# The per-domain delays and slots of every spider are kept, the total number of downloads in flight is limited
+# by SHARED_CONCURRENCY (see downloader.SharedConcurrencyDownloader).
+# Run from the ./eia_crawling directory, e.g.:
+#   python -m eia_crawling.run_crawls austria denmark italy -a italy:legislatures=16,17 --concurrency 24
+# See: https://docs.scrapy.org/en/latest/topics/practices.html#running-multiple-spiders-in-the-same-process
+
+import json
+import datetime
+from argparse import ArgumentParser
+from scrapy.crawler import CrawlerProcess
+from scrapy.utils.project import get_project_settings
+
+from eia_crawling.spiders.source_store import DATA
+
+# Define string constants
+REPORTS = 'reports'
+# The EU spider (legislative observatory) is not a parliament crawl
+EXCLUDED_SPIDERS = ['eu']
+CONCURRENCY = 32
+
+
+def parse_spider_arguments(arguments: list) -> dict:
+    """<spider>:<name>=<value> -> {spider: {name: value}}"""
+    spider_arguments = {}
+    for argument in arguments or []:
+        spider, name_value = argument.split(':', 1)
+        name, value = name_value.split('=', 1)
+        spider_arguments.setdefault(spider, {})[name] = value
+    return spider_arguments
+
+
+def build_report(crawlers: dict, started: datetime.datetime, finished: datetime.datetime) -> dict:
+    """Stats of all spiders and the totals of the numeric stats."""
+    spiders = {}
+    totals = {}
+    for name, crawler in crawlers.items():
+        stats = crawler.stats.get_stats()
+        spiders[name] = stats
+        for key, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                totals[key] = totals.get(key, 0) + value
+
+    def elapsed(stats):
+        if 'start_time' in stats and 'finish_time' in stats:
+            return (stats['finish_time'] - stats['start_time']).total_seconds()
+        return None
+
+    durations = {name: elapsed(stats) for name, stats in spiders.items()}
+    return {
+        'started': started.isoformat(timespec='seconds'),
+        'finished': finished.isoformat(timespec='seconds'),
+        'elapsed_seconds': (finished - started).total_seconds(),
+        # Wall clock of the spiders if they had been run one after another
+        'sequential_seconds': sum(duration for duration in durations.values() if duration is not None),
+        'spider_seconds': durations,
+        'totals': totals,
+        'spiders': spiders,
+    }
+
+
+def main(spiders: list = None,
+         spider_arguments: dict = None,
+         concurrency: int = CONCURRENCY) -> dict:
+    """
+    Crawl the given spiders (default: all parliament spiders) in one CrawlerProcess and write a consolidated
+    stats report to <data>/reports/crawl_run_<timestamp>.json.
+    """
+    settings = get_project_settings()
+    settings.set('SHARED_CONCURRENCY', concurrency, priority='cmdline')
+    process = CrawlerProcess(settings)
+    if not spiders:
+        spiders = [name for name in process.spider_loader.list() if name not in EXCLUDED_SPIDERS]
+    spider_arguments = spider_arguments or {}
+
+    crawlers = {}
+    for name in spiders:
+        crawler = process.create_crawler(name)
+        crawlers[name] = crawler
+        process.crawl(crawler, **spider_arguments.get(name, {}))
+
+    started = datetime.datetime.now()
+    process.start()
+    finished = datetime.datetime.now()
+
+    report = build_report(crawlers, started, finished)
+    path = DATA.joinpath(REPORTS, f'crawl_run_{started.strftime("%Y%m%d_%H%M%S")}.json')
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2, default=str)
+
+    print(f'Crawled {len(spiders)} spiders in {report["elapsed_seconds"]:.0f}s '
+          f'(sequential: {report["sequential_seconds"]:.0f}s)')
+    for name, seconds in report['spider_seconds'].items():
+        stats = report['spiders'][name]
+        print(f'{name}: {seconds}s, {stats.get("downloader/response_count", 0)} responses, '
+              f'{stats.get("item_scraped_count", 0)} items, finish reason {stats.get("finish_reason")}')
+    print(f'Report: {path}')
+    return report
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("spiders", type=str, nargs='*', help="spiders to run (default: all parliament spiders)")
+    parser.add_argument("-a", dest="arguments", action="append",
+                        help="spider argument, <spider>:<name>=<value> (e.g. italy:legislatures=16,17)")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY,
+                        help="maximum number of downloads in flight over all spiders")
+    args = parser.parse_args()
+
+    main(spiders=args.spiders,
+         spider_arguments=parse_spider_arguments(args.arguments),
+         concurrency=args.concurrency)
@@ -12,9 +12,20 @@ BOT_NAME = "eia_crawling"
 SPIDER_MODULES = ["eia_crawling.spiders"]
 NEWSPIDER_MODULE = "eia_crawling.spiders"
 
-# HTTP response codes that are retried (sometimes 404 is retrieved although site is reachable)
-RETRY_TIMES = 1
-RETRY_HTTP_CODES = [500, 503, 504, 400, 408, 404]
+# Retries per status code, status class or exception (see middlewares.SmartRetryMiddleware)
+# 404 is not retried, spiders of sites that answer 404 for existing documents opt in with e.g.
+# smart_retry_policies = {'404': 1}
+# Statuses that a request handles itself (handle_httpstatus_list, e.g. probes) are never retried
+SMART_RETRY_ENABLED = True
+SMART_RETRY_POLICIES = {'404': 0, '408': 5, '429': 5, '4xx': 0, '5xx': 5, 'exception': 3}
+# Retry n waits base delay * 2^(n-1) seconds (+-50%)
+SMART_RETRY_BASE_DELAY = 2
+SMART_RETRY_MAX_DELAY = 120
+# Pause a domain for the cooldown (seconds) after this number of consecutive failures
+CIRCUIT_BREAKER_THRESHOLD = 5
+CIRCUIT_BREAKER_COOLDOWN = 300
+# Request the failed URLs of earlier runs (data/store/retry_queue/<spider>.pickle) first
+RETRY_QUEUE_DRAIN = True
 
 # Crawl responsibly by identifying yourself (and your website) on the user-agent
 # USER_AGENT = 'eia_crawling (+http://www.yourdomain.com)'
@@ -49,26 +60,52 @@ DOWNLOAD_DELAY = 3
 # Enable or disable spider middlewares
 # See https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 SPIDER_MIDDLEWARES = {
-   'eia_crawling.middlewares.LegisObservatorySpiderMiddleware': 543,
+   'eia_crawling.middlewares.CrawlMetricsSpiderMiddleware': 543,
+   'eia_crawling.middlewares.RetryQueueSpiderMiddleware': 544,
 }
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
-# DOWNLOADER_MIDDLEWARES = {
-#    'eia_crawling.middlewares.LegisObservatoryDownloaderMiddleware': 543,
-# }
+DOWNLOADER_MIDDLEWARES = {
+   'scrapy.downloadermiddlewares.retry.RetryMiddleware': None,
+   'eia_crawling.middlewares.LegisObservatoryDownloaderMiddleware': 543,
+   'eia_crawling.middlewares.SmartRetryMiddleware': 550,
+   # Close to the downloader to measure every attempt (including retries)
+   'eia_crawling.middlewares.CrawlMetricsDownloaderMiddleware': 950,
+}
+
+# Incremental crawling: send conditional requests for documents that were already downloaded
+# (known from the <report_name>.json metadata) and skip them if they did not change
+INCREMENTAL_CRAWL_ENABLED = True
+
+# Crawl instrumentation (latency histograms, sizes, status codes, retries, items and files written per domain and
+# callback), exported to data/reports/metrics_<spider>.json and .prom every CRAWL_METRICS_EXPORT_INTERVAL seconds
+CRAWL_METRICS_ENABLED = True
+CRAWL_METRICS_EXPORT_INTERVAL = 60
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
-# EXTENSIONS = {
-#    'scrapy.extensions.telnet.TelnetConsole': None,
-# }
+EXTENSIONS = {
+   'eia_crawling.throttling.AdaptiveThrottle': 500,
+}
+
+# Per-domain adaptive throttling (see throttling.py). The profiles per parliament site are read from
+# config/throttling.json, DOWNLOAD_DELAY is only used as fallback and as baseline of the throughput report
+ADAPTIVE_THROTTLE_ENABLED = True
+# ADAPTIVE_THROTTLE_PROFILES = 'config/throttling.json'
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
-# ITEM_PIPELINES = {
-#    'eia_crawling.pipelines.LegisObservatoryPipeline': 300,
-# }
+ITEM_PIPELINES = {
+   'eia_crawling.pipelines.LegisObservatoryPipeline': 300,
+}
+
+# Source documents are written on a thread pool (see pipelines.py)
+FILE_WRITER_THREADS = 4
+# Maximum number of writes in flight, Scrapy stops fetching new responses while the disk is behind
+FILE_WRITER_MAX_PENDING = 32
+# Number of <report_name>.json files that are written together
+FILE_WRITER_META_BATCH_SIZE = 50
 
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
@@ -85,8 +122,28 @@ SPIDER_MIDDLEWARES = {
 
 # Enable and configure HTTP caching (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html#httpcache-middleware-settings
+# Record: -s HTTPCACHE_ENABLED=True, replay without the network: additionally -s HTTPCACHE_IGNORE_MISSING=True
 # HTTPCACHE_ENABLED = True
-# HTTPCACHE_EXPIRATION_SECS = 0
-# HTTPCACHE_DIR = 'httpcache'
-# HTTPCACHE_IGNORE_HTTP_CODES = []
-# HTTPCACHE_STORAGE = 'scrapy.extensions.httpcache.FilesystemCacheStorage'
+HTTPCACHE_EXPIRATION_SECS = 0
+# 304: a conditional request's answer cannot be replayed (no validators are sent while the cache is enabled)
+HTTPCACHE_IGNORE_HTTP_CODES = [304, 500, 502, 503, 504, 408, 429]
+HTTPCACHE_POLICY = 'scrapy.extensions.httpcache.DummyPolicy'
+HTTPCACHE_STORAGE = 'eia_crawling.httpcache.CompressedCacheStorage'
+# Cache folder (default: spiders/data/httpcache) and request meta keys that are part of the cache key
+# REPLAY_CACHE_DIR = ''
+REPLAY_CACHE_META_KEYS = []
+
+# Shared crawl frontier: several crawler processes drain the requests of one spider together, e.g. on every worker
+# scrapy crawl france -s SCHEDULER=eia_crawling.frontier.FrontierScheduler -s FRONTIER_BACKEND=redis
+# SCHEDULER = 'eia_crawling.frontier.FrontierScheduler'
+FRONTIER_BACKEND = 'sqlite'
+# FRONTIER_REDIS_URL = 'redis://localhost:6379/0'
+# FRONTIER_SQLITE_PATH = ''
+# The frontier is cleared when the last worker finishes, a worker without heartbeat for FRONTIER_LEASE seconds is dead
+# FRONTIER_JOB = ''
+FRONTIER_HEARTBEAT = 30
+FRONTIER_LEASE = 120
+
+# Maximum number of downloads in flight over all spiders of one process (run_crawls.py, 0: no shared limit)
+DOWNLOADER = 'eia_crawling.downloader.SharedConcurrencyDownloader'
+SHARED_CONCURRENCY = 0
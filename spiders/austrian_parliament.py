@@ -1,16 +1,14 @@
 import pathlib
 import scrapy
 import datetime
-import requests
 from scrapy.http.request import Request
 from lxml import etree
 import re
 
 from .utils import (
     prepare_folder_national,
-    write_meta,
-    write_source_doc,
 )
+from eia_crawling.items import SourceDocumentItem
 
 ROOT = pathlib.Path(__file__).absolute().parent
 DATA = ROOT.joinpath("data")
@@ -27,45 +25,45 @@ NATIONAL = 'national'
 
 class AustriaParliamentSpider(scrapy.Spider):
     name = COUNTRY
-    start_urls = []
+    base_url = 'https://www.parlament.gv.at'
+    # Legislative periods (Gesetzgebungsperioden) to crawl
+    legislative_periods = ['XXVI', 'XXVII']
 
     def __init__(self, **kwargs) -> None:
-        # Do the api call to the open data api of ireland
-        self.urls = []
-        base_url = 'https://www.parlament.gv.at'
-        for gp in ['XXVI', 'XXVII']:
-            resp = requests.get(f'https://www.parlament.gv.at/filter.psp?view=xml&FBEZ=FP_011&R_NBVS=N&GP={gp}')
-            if resp.status_code != 200:
-                raise AssertionError
-            # Get the results and retrieve the URLs for the HTML documents
-            xml = etree.fromstring(resp.content)
-            item_list = xml.xpath('//item')
-            for item in item_list:
-                date = item.xpath('./Datum/text()')[0]
-                date = re.sub('\s', '', date)
-                date = datetime.datetime.strptime(date, '%d.%m.%Y')
-                # Get the number for naming the documents
-                session = item.xpath('./Sitzung/text()')[0]
-                # Only get the required docs
-                if date < datetime.datetime.strptime('14.12.2018', '%d.%m.%Y'):
-                    break
-                session = re.sub('\s', '', session)
-                number = re.search('\d+(?=.)', session).group()
-                try:
-                    # Get the URL of the protocol
-                    uri = item.xpath('./Gesamtprotokoll//a[contains(@href, ".html")]/@href')[0]
-                except IndexError:
-                    # Protocol not yet available
-                    continue
-                url = base_url + uri
-                self.urls.append({'url': url, 'date': date, 'number': number})
         prepare_folder_national(DATA, COUNTRY)
         super().__init__(**kwargs)
 
     def start_requests(self) -> Request:
-        for data in self.urls:
-            url = data['url']
-            yield Request(url, callback=self.parse, meta=data)
+        # Query the filter of the open data api for the protocols of each legislative period
+        for gp in self.legislative_periods:
+            url = f'{self.base_url}/filter.psp?view=xml&FBEZ=FP_011&R_NBVS=N&GP={gp}'
+            yield Request(url, callback=self.parse_filter)
+
+    def parse_filter(self, response, **kwargs):
+        if response.status != 200:
+            raise AssertionError
+        # Get the results and retrieve the URLs for the HTML documents
+        xml = etree.fromstring(response.body)
+        item_list = xml.xpath('//item')
+        for item in item_list:
+            date = item.xpath('./Datum/text()')[0]
+            date = re.sub('\s', '', date)
+            date = datetime.datetime.strptime(date, '%d.%m.%Y')
+            # Get the number for naming the documents
+            session = item.xpath('./Sitzung/text()')[0]
+            # Only get the required docs
+            if date < datetime.datetime.strptime('14.12.2018', '%d.%m.%Y'):
+                break
+            session = re.sub('\s', '', session)
+            number = re.search('\d+(?=.)', session).group()
+            try:
+                # Get the URL of the protocol
+                uri = item.xpath('./Gesamtprotokoll//a[contains(@href, ".html")]/@href')[0]
+            except IndexError:
+                # Protocol not yet available
+                continue
+            url = self.base_url + uri
+            yield Request(url, callback=self.parse, meta={'date': date, 'number': number})
 
     def parse(self, response, **kwargs):
         # get meta data
@@ -80,14 +78,15 @@ class AustriaParliamentSpider(scrapy.Spider):
         # Build the report name from the date and the chamber
         report_name = "_".join([REPORT, number])
 
-        # Download the source page
-        path = DATA.joinpath(NATIONAL, COUNTRY, year, SOURCE, f'{report_name}.html')
-        write_source_doc(path, response.body)
-
-        # Parse the report
-        # Write meta data
+        # Build the meta data
         meta_data = {
             report_name: {FULL_TITLE: report_name, FILING_DATE: filing_date, URL: url}
         }
-        path = DATA.joinpath(NATIONAL, COUNTRY, year, SOURCE, f"{report_name}.json")
-        write_meta(path, meta_data)
\ No newline at end of file
+
+        # Download the source page and write the meta data
+        yield SourceDocumentItem(
+            path=DATA.joinpath(NATIONAL, COUNTRY, year, SOURCE, f'{report_name}.html'),
+            body=response.body,
+            meta_path=DATA.joinpath(NATIONAL, COUNTRY, year, SOURCE, f"{report_name}.json"),
+            meta=meta_data,
+        )
\ No newline at end of file
@@ -5,9 +5,8 @@ import datetime
 
 from .utils import (
     prepare_folder_national,
-    write_meta,
-    write_source_doc,
 )
+from eia_crawling.items import SourceDocumentItem
 
 ROOT = pathlib.Path(__file__).absolute().parent
 DATA = ROOT.joinpath("data")
@@ -84,15 +83,16 @@ class BelgianParliamentSpider(scrapy.Spider):
         title = response.meta.get("title")
         report_name = response.meta.get("report_name")
 
-        # Download the source page
-        path = DATA.joinpath(NATIONAL, COUNTRY, year, SOURCE, f'{report_name}.pdf')
-        write_source_doc(path, response.body)
-
-        # Parse the report
-        # Write meta data
+        # Build the meta data
         meta_data = {
             report_name: {FULL_TITLE: title, FILING_DATE: filing_date, URL: url}
         }
-        path = DATA.joinpath(NATIONAL, COUNTRY, year, SOURCE, f"{report_name}.json")
-        write_meta(path, meta_data)
+
+        # Download the source page and write the meta data
+        yield SourceDocumentItem(
+            path=DATA.joinpath(NATIONAL, COUNTRY, year, SOURCE, f'{report_name}.pdf'),
+            body=response.body,
+            meta_path=DATA.joinpath(NATIONAL, COUNTRY, year, SOURCE, f"{report_name}.json"),
+            meta=meta_data,
+        )
 
@@ -0,0 +1,206 @@
+import os
+import pathlib
+import hashlib
+import json
+import sqlite3
+import threading
+import fnmatch
+import datetime
+from argparse import ArgumentParser
+from typing import Iterable, List
+
+from .source_store import get_source_store, DATA
+
+# Define string constants
+CATALOG = 'catalog.sqlite'
+NATIONAL = 'national'
+SOURCE = 'source'
+FULL_TITLE = 'full_title'
+FILING_DATE = 'filing_date'
+URL = 'URL'
+CRAWLED = 'crawled'
+PARSED = 'parsed'
+FAILED = 'failed'
+# Seconds a writer waits for the database lock
+BUSY_TIMEOUT = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    country TEXT NOT NULL,
+    year TEXT NOT NULL,
+    report_name TEXT NOT NULL,
+    source_path TEXT NOT NULL,
+    url TEXT,
+    filing_date TEXT,
+    sha256 TEXT,
+    size INTEGER,
+    parse_status TEXT NOT NULL DEFAULT 'crawled',
+    parser_version TEXT,
+    parsed_at TEXT,
+    PRIMARY KEY (country, year, report_name)
+);
+CREATE INDEX IF NOT EXISTS documents_status ON documents (country, parse_status);
+CREATE TABLE IF NOT EXISTS parsed_rows (
+    country TEXT NOT NULL,
+    year TEXT NOT NULL,
+    report_name TEXT NOT NULL,
+    row_number INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (country, year, report_name, row_number)
+);
+"""
+
+
+def describe_source_path(key: str):
+    """(country, year, report_name) of national/<country>/<year>/source/<report_name>.<suffix>, None otherwise."""
+    parts = key.split('/')
+    if len(parts) == 5 and parts[0] == NATIONAL and parts[3] == SOURCE and not parts[4].endswith('.json'):
+        return parts[1], parts[2], pathlib.PurePosixPath(parts[4]).stem
+    return None
+
+
+class DocumentCatalog:
+    """
+    SQLite catalog of the crawled national source documents (<data>/catalog.sqlite).
+
+    One row per (country, year, report_name) with the source path (relative to the data folder), URL, filing date,
+    content hash, size, parse status and parser version. The rows are written by the item pipeline while crawling
+    and read by parsing/parse_national.py instead of globbing the source folders.
+    """
+
+    def __init__(self, data_path: pathlib.Path = DATA) -> None:
+        self.data_path = pathlib.Path(data_path).absolute()
+        self.data_path.mkdir(parents=True, exist_ok=True)
+        # The pipeline writes from its thread pool, all access goes through the lock
+        self._lock = threading.Lock()
+        # Parser processes write to the catalog at the same time, wait for the others' (short) transactions
+        self.connection = sqlite3.connect(str(self.data_path.joinpath(CATALOG)), check_same_thread=False,
+                                          timeout=BUSY_TIMEOUT)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+
+    def key(self, path) -> str:
+        return get_source_store(self.data_path).key(path)
+
+    def add(self, path, sha256: str, size: int, meta: dict = None) -> bool:
+        """Add or update a source document, returns False for paths outside the national layout."""
+        source_path = self.key(path)
+        described = describe_source_path(source_path)
+        if described is None:
+            return False
+        country, year, report_name = described
+        # Meta data of a document: {report_name: {full_title, filing_date, URL}}
+        meta = next(iter(meta.values()), {}) if meta else {}
+        with self._lock, self.connection:
+            self.connection.execute(
+                """
+                INSERT INTO documents (country, year, report_name, source_path, url, filing_date, sha256, size)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (country, year, report_name) DO UPDATE SET
+                    source_path = excluded.source_path,
+                    url = COALESCE(excluded.url, url),
+                    filing_date = COALESCE(excluded.filing_date, filing_date),
+                    sha256 = excluded.sha256,
+                    size = excluded.size,
+                    parse_status = CASE WHEN sha256 IS excluded.sha256 THEN parse_status ELSE 'crawled' END
+                """,
+                (country, year, report_name, source_path, meta.get(URL), meta.get(FILING_DATE), sha256, size))
+        return True
+
+    def source_paths(self, country: str, year, pattern: str = '*') -> List[pathlib.Path]:
+        """Source documents of a country and year whose file name matches the pattern, ordered by path."""
+        with self._lock:
+            rows = self.connection.execute(
+                'SELECT source_path FROM documents WHERE country = ? AND year = ? ORDER BY source_path',
+                (country, str(year))).fetchall()
+        return [self.data_path.joinpath(source_path) for source_path, in rows
+                if fnmatch.fnmatch(pathlib.PurePosixPath(source_path).name, pattern)]
+
+    def set_parse_status(self, path, status: str, parser_version: str = None) -> None:
+        described = describe_source_path(self.key(path))
+        if described is None:
+            return
+        with self._lock, self.connection:
+            self.connection.execute(
+                """
+                UPDATE documents SET parse_status = ?, parser_version = ?, parsed_at = ?
+                WHERE country = ? AND year = ? AND report_name = ?
+                """,
+                (status, parser_version, datetime.datetime.now().isoformat(timespec='seconds'), *described))
+
+    def replace_rows(self, path, rows: Iterable[str]) -> int:
+        """
+        Replace the parsed rows (json) of a source document in one short transaction (see parsing/row_sinks.py),
+        returns the number of rows.
+        """
+        described = describe_source_path(self.key(path))
+        if described is None:
+            raise ValueError(f'Not a national source document: {path}')
+        count = 0
+
+        def numbered_rows():
+            nonlocal count
+            for count, row in enumerate(rows, start=1):
+                yield (*described, count - 1, row)
+
+        with self._lock, self.connection:
+            self.connection.execute('DELETE FROM parsed_rows WHERE country = ? AND year = ? AND report_name = ?',
+                                    described)
+            self.connection.executemany('INSERT INTO parsed_rows VALUES (?, ?, ?, ?, ?)', numbered_rows())
+        return count
+
+    def backfill(self, country: str = None) -> int:
+        """Add the documents crawled before the catalog existed (stored and plain files), returns their number."""
+        store = get_source_store(self.data_path)
+        paths = {key: entry for key, entry in store.manifest.items() if describe_source_path(key)}
+        national_p = self.data_path.joinpath(NATIONAL)
+        for path in national_p.glob(f'{country or "*"}/*/{SOURCE}/*'):
+            key = self.key(path)
+            if key not in paths and path.is_file() and describe_source_path(key):
+                paths[key] = None
+
+        count = 0
+        for key, entry in sorted(paths.items()):
+            if country is not None and describe_source_path(key)[0] != country:
+                continue
+            path = self.data_path.joinpath(key)
+            if entry is None:
+                with open(path, 'rb') as file:
+                    content = file.read()
+                entry = {'sha256': hashlib.sha256(content).hexdigest(), 'size': len(content)}
+            meta = None
+            meta_p = path.with_suffix('.json')
+            if meta_p.is_file():
+                with open(meta_p, 'r', encoding='utf-8') as file:
+                    try:
+                        meta = json.load(file)
+                    except ValueError:
+                        meta = None
+            count += self.add(path, entry['sha256'], entry['size'], meta)
+        return count
+
+
+# (process id, data folder) -> catalog
+_catalogs = {}
+
+
+def get_document_catalog(data_path: pathlib.Path = DATA) -> DocumentCatalog:
+    """
+    Returns the (process wide) catalog for the given data folder.
+    A SQLite connection must not be used across a fork, a forked process (e.g. a parse_national worker) opens its own.
+    """
+    key = (os.getpid(), pathlib.Path(data_path).absolute())
+    # Catalogs inherited from the parent stay referenced, so their connections are never closed in the child
+    if key not in _catalogs:
+        _catalogs[key] = DocumentCatalog(key[1])
+    return _catalogs[key]
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--country", type=str, help="only catalog the documents of this national folder")
+    args = parser.parse_args()
+
+    n = get_document_catalog().backfill(country=args.country)
+    print(f'Catalogued {n} documents')
@@ -1,6 +1,7 @@
 import pathlib
 import scrapy
-from eia_crawling.spiders.utils import prepare_folder_national, write_source_doc, write_meta, normalize_string
+from eia_crawling.spiders.utils import prepare_folder_national, normalize_string
+from eia_crawling.items import SourceDocumentItem
 import re
 import datetime
 
@@ -79,15 +80,16 @@ class DannishParlimentSpider(scrapy.Spider):
         title = response.meta.get("title")
         report_name = response.meta.get("report_name")
 
-        # Download the source page
-        path = DATA.joinpath(NATIONAL, COUNTRY, year, SOURCE, f'{report_name}.html')
-        write_source_doc(path, response.body)
-
-        # Parse the report
-        # Write meta data
+        # Build the meta data
         meta_data = {
             report_name: {FULL_TITLE: title, FILING_DATE: filing_date, URL: url}
         }
-        path = DATA.joinpath(NATIONAL, COUNTRY, year, SOURCE, f"{report_name}.json")
-        write_meta(path, meta_data)
+
+        # Download the source page and write the meta data
+        yield SourceDocumentItem(
+            path=DATA.joinpath(NATIONAL, COUNTRY, year, SOURCE, f'{report_name}.html'),
+            body=response.body,
+            meta_path=DATA.joinpath(NATIONAL, COUNTRY, year, SOURCE, f"{report_name}.json"),
+            meta=meta_data,
+        )
 
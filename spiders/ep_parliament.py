@@ -1,15 +1,14 @@
 import pathlib
 import scrapy
 import datetime
+import json
+import re
 
 from scrapy import Request
-from scrapy.linkextractors import LinkExtractor
 from .utils import (
     prepare_folder_national,
-    write_meta,
-    write_source_doc,
-    normalize_string
 )
+from eia_crawling.items import SourceDocumentItem
 
 ROOT = pathlib.Path(__file__).absolute().parent
 DATA = ROOT.joinpath("data")
@@ -22,45 +21,141 @@ URL = 'URL'
 SOURCE = 'source'
 REPORT = 'session'
 NATIONAL = 'national'
+LANGUAGE = 'language'
+
+# First and last day to crawl per legislative period (required for URL construction)
+TERMS = {
+    8: (datetime.date(2017, 7, 7), datetime.date(2019, 4, 18)),
+    9: (datetime.date(2019, 4, 19), datetime.date(2019, 12, 31)),
+}
+CALENDAR_URL = 'https://www.europarl.europa.eu/plenary/en/ajax/getSessionCalendar.html?family=CRE&termId={term}'
+CRE_URL = 'https://www.europarl.europa.eu/doceo/document/CRE-{term}-{date}_{language}.html'
+# Days that are known to have no plenary sitting (persisted between runs)
+NON_SITTING_DATES_FILE = 'non_sitting_dates.json'
+# Responses for days without a sitting (the EP redirects to the search page or answers with 404)
+NON_SITTING_HTTP_CODES = [301, 302, 303, 404]
+ISO_DATE_MATCH = r'(\d{4})-(\d{2})-(\d{2})'
+# Fields of the calendar entries that hold the day of a sitting (other dates, e.g. of publications, are ignored)
+CALENDAR_DATE_FIELDS = ['date', 'sittingDate', 'sessionDate']
 
 
 class EpParliamentSpider(scrapy.Spider):
+    """
+    Verbatim reports (CRE) of the plenary sittings of the European Parliament.
+
+    The sitting days are taken from the plenary calendar of each term, only those days are requested.
+    If the calendar is not available, every day of the term is requested instead. Days without a sitting, found by
+    these probes or missing from the calendar, are remembered per term and language in
+    <data>/national/ep/non_sitting_dates.json and not probed by later runs.
+
+    Arguments (e.g. scrapy crawl ep -a terms=9 -a languages=EN,DE):
+    - terms: comma-separated legislative periods (default: all in TERMS)
+    - languages: comma-separated language codes (default: EN)
+    """
     name = 'ep'
-    # handle_httpstatus_list = [200]
-
-    def __init__(self, **kwargs) -> None:
-        self.start_urls = []
-
-        # Define the end dates of the legislative periods
-        # This is required for URL construction
-        legislative_period_list = [(8, datetime.date(2019, 4, 18)), (9, datetime.date(2019, 12, 31))]
-        date_dict = {}
-        # Contstruct URLs to query
-        for index, value in enumerate(legislative_period_list):
-            legislative_period = value[0]
-            date = value[1]
-            if index == 0:
-                start_date = datetime.date(2017, 7, 7)
-            else:
-                # Get the day after the end date of the legislative period
-                start_date = legislative_period_list[index - 1][1] + datetime.timedelta(1)
-            delta = date - start_date
-            date_dict[legislative_period] = [start_date + datetime.timedelta(days=i) for i in range(delta.days + 1)]
-
-        # Construct the URLs
-        for legislative_period, date_list in date_dict.items():
-            for date in date_list:
-                self.start_urls.append(f'https://www.europarl.europa.eu/doceo/document/CRE-{legislative_period}-{date.isoformat()[:10]}_EN.html')
+
+    def __init__(self, terms: str = None, languages: str = 'EN', **kwargs) -> None:
+        self.terms = [int(term) for term in terms.split(',')] if terms else list(TERMS)
+        self.languages = [language.strip().upper() for language in languages.split(',')]
+
         # Slight misuse of the function, but should do the job
         prepare_folder_national(DATA, COUNTRY, NATIONAL)
+        self.non_sitting_dates_path = DATA.joinpath(NATIONAL, COUNTRY, NON_SITTING_DATES_FILE)
+        # (term, date, language): a failed language of a day does not hide the other languages
+        self.non_sitting_dates = set()
+        if self.non_sitting_dates_path.is_file():
+            with open(self.non_sitting_dates_path, 'r', encoding='utf-8') as f:
+                # Entries of earlier runs without term and language are dropped, they may hide sittings
+                self.non_sitting_dates = {tuple(entry) for entry in json.load(f) if isinstance(entry, list)}
         super().__init__(**kwargs)
 
     def start_requests(self):
-        meta = {'dont_redirect': True}
-        for url in self.start_urls:
-            yield Request(url, callback=self.parse, meta=meta)
+        for term in self.terms:
+            yield Request(CALENDAR_URL.format(term=term),
+                          callback=self.parse_calendar,
+                          errback=self.calendar_failed,
+                          meta={'term': term},
+                          dont_filter=True)
+
+    def parse_calendar(self, response):
+        term = response.meta['term']
+        start_date, end_date = TERMS[term]
+        sitting_dates = {date for date in self.extract_dates(response.text) if start_date <= date <= end_date}
+        if not sitting_dates:
+            self.logger.warning(f'No sitting days found in the calendar of term {term}, requesting every day')
+            yield from self.enumerate_days(term)
+            return
+        self.logger.info(f'Term {term}: {len(sitting_dates)} sitting days')
+        # Past days the calendar has no sitting for are not probed when a later run has to fall back to every day
+        today = datetime.date.today()
+        for date in self.term_days(term):
+            if date not in sitting_dates and date < today:
+                self.non_sitting_dates.update((term, date.isoformat(), language) for language in self.languages)
+        for date in sorted(sitting_dates):
+            yield from self.sitting_requests(term, date)
+
+    def calendar_failed(self, failure):
+        term = failure.request.meta['term']
+        self.logger.warning(f'Calendar of term {term} not available ({failure.value!r}), requesting every day')
+        yield from self.enumerate_days(term)
+
+    @staticmethod
+    def extract_dates(text: str) -> set:
+        """Sitting days of the calendar, either as day/month/year objects or as ISO dates in the date fields."""
+        dates = set()
+        try:
+            calendar = json.loads(text)
+        except ValueError:
+            calendar = None
+        stack = [calendar]
+        while stack:
+            value = stack.pop()
+            if isinstance(value, dict):
+                if {'year', 'month', 'day'} <= value.keys():
+                    try:
+                        dates.add(datetime.date(int(value['year']), int(value['month']), int(value['day'])))
+                    except (TypeError, ValueError):
+                        pass
+                for field in CALENDAR_DATE_FIELDS:
+                    match = re.match(ISO_DATE_MATCH, value[field]) if isinstance(value.get(field), str) else None
+                    if match:
+                        try:
+                            dates.add(datetime.date(*(int(group) for group in match.groups())))
+                        except ValueError:
+                            pass
+                stack.extend(value.values())
+            elif isinstance(value, list):
+                stack.extend(value)
+        return dates
+
+    @staticmethod
+    def term_days(term: int):
+        start_date, end_date = TERMS[term]
+        for i in range((end_date - start_date).days + 1):
+            yield start_date + datetime.timedelta(days=i)
+
+    def enumerate_days(self, term: int):
+        """Fallback: request every day of the term that is not known to be without a sitting."""
+        for date in self.term_days(term):
+            yield from self.sitting_requests(term, date, probe=True)
+
+    def sitting_requests(self, term: int, date: datetime.date, probe: bool = False):
+        meta = {'dont_redirect': True, 'term': term, 'date': date.isoformat()}
+        if probe:
+            meta['handle_httpstatus_list'] = NON_SITTING_HTTP_CODES
+        for language in self.languages:
+            if probe and (term, date.isoformat(), language) in self.non_sitting_dates:
+                continue
+            url = CRE_URL.format(term=term, date=date.isoformat(), language=language)
+            yield Request(url, callback=self.parse, meta=dict(meta, language=language))
 
     def parse(self, response, **kwargs):
+        if response.status in NON_SITTING_HTTP_CODES:
+            date = response.meta['date']
+            # Future days may still get a sitting
+            if date < datetime.date.today().isoformat():
+                self.non_sitting_dates.add((response.meta['term'], date, response.meta[LANGUAGE]))
+            return
 
         # Get meta data
         url = response.url
@@ -70,16 +165,24 @@ class EpParliamentSpider(scrapy.Spider):
         legislative_period = title.split("-")[1]
         date = title[-10:]
         year = date[:4]
-        report_name = title
+        language = response.meta.get(LANGUAGE, 'EN')
+        # Keep the names of the English reports of earlier crawls
+        report_name = title if language == 'EN' else f'{title}_{language}'
 
-        # Download the source page
-        path = DATA.joinpath(NATIONAL, COUNTRY, year, SOURCE, f'{report_name}.html')
-        write_source_doc(path, response.body)
-
-        # Parse the report
-        # Write meta data
+        # Build the meta data
         meta_data = {
-            report_name: {FULL_TITLE: title, FILING_DATE: filing_date, URL: url, "legislative_period": legislative_period}
+            report_name: {FULL_TITLE: title, FILING_DATE: filing_date, URL: url, "legislative_period": legislative_period,
+                          LANGUAGE: language}
         }
-        path = DATA.joinpath(NATIONAL, COUNTRY, year, SOURCE, f"{report_name}.json")
-        write_meta(path, meta_data)
\ No newline at end of file
+
+        # Download the source page and write the meta data
+        yield SourceDocumentItem(
+            path=DATA.joinpath(NATIONAL, COUNTRY, year, SOURCE, f'{report_name}.html'),
+            body=response.body,
+            meta_path=DATA.joinpath(NATIONAL, COUNTRY, year, SOURCE, f"{report_name}.json"),
+            meta=meta_data,
+        )
+
+    def closed(self, reason):
+        with open(self.non_sitting_dates_path, 'w', encoding='utf-8') as f:
+            json.dump(sorted(self.non_sitting_dates), f, indent=2)
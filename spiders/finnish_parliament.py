@@ -8,9 +8,8 @@ import re
 
 from .utils import (
     prepare_folder_national,
-    write_meta,
-    write_source_doc,
 )
+from eia_crawling.items import SourceDocumentItem
 
 ROOT = pathlib.Path(__file__).absolute().parent
 DATA = ROOT.joinpath("data")
@@ -50,5 +49,7 @@ class FinnishParliamentSpider(scrapy.Spider):
         number = stem.split("_")[-1].split("+")[0]
 
         # Download the source page
-        path = DATA.joinpath(NATIONAL, COUNTRY, str(year), SOURCE, f'{number}.pdf')
-        write_source_doc(path, response.body)
+        yield SourceDocumentItem(
+            path=DATA.joinpath(NATIONAL, COUNTRY, str(year), SOURCE, f'{number}.pdf'),
+            body=response.body,
+        )
@@ -10,11 +10,10 @@ from .utils import (
     parse_url,
     write_txt,
     prepare_folder_national,
-    write_meta,
     normalize_name,
-    write_source_doc,
     write_csv
 )
+from eia_crawling.items import SourceDocumentItem
 
 MONTHS = {
     'janvier': '1',
@@ -123,14 +122,15 @@ class FrenchParliamentSpider(scrapy.Spider):
         filing_date = datetime.date.today().isoformat()
 
         if year >= '2009':
-            # Download the source page
-            path = DATA.joinpath(NATIONAL, COUNTRY, year, SOURCE, f'{report_name}.html')
-            write_source_doc(path, response.body)
-
-            # Parse the report
-            # Write meta data
+            # Build the meta data
             meta_data = {
                 report_name: {FULL_TITLE: title, FILING_DATE: filing_date, URL: url}
             }
-            path = DATA.joinpath(NATIONAL, COUNTRY, year, SOURCE, f"{report_name}.json")
-            write_meta(path, meta_data)
\ No newline at end of file
+
+            # Download the source page and write the meta data
+            yield SourceDocumentItem(
+                path=DATA.joinpath(NATIONAL, COUNTRY, year, SOURCE, f'{report_name}.html'),
+                body=response.body,
+                meta_path=DATA.joinpath(NATIONAL, COUNTRY, year, SOURCE, f"{report_name}.json"),
+                meta=meta_data,
+            )
\ No newline at end of file
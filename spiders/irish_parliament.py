@@ -10,11 +10,10 @@ from .utils import (
     parse_url,
     write_txt,
     prepare_folder_national,
-    write_meta,
     normalize_name,
-    write_source_doc,
     write_csv
 )
+from eia_crawling.items import SourceDocumentItem
 
 ROOT = pathlib.Path(__file__).absolute().parent
 DATA = ROOT.joinpath("data")
@@ -76,14 +75,15 @@ class IrishParliamentSpider(scrapy.Spider):
         report_name = "_".join([date_str, chamber_str])
         report_name = str.lower(report_name)[:80]
 
-        # Download the source page
-        path = DATA.joinpath(NATIONAL, COUNTRY, year, SOURCE, f'{report_name}.xml')
-        write_source_doc(path, response.body)
-
-        # Parse the report
-        # Write meta data
+        # Build the meta data
         meta_data = {
             report_name: {FULL_TITLE: report_name, FILING_DATE: filing_date, URL: url}
         }
-        path = DATA.joinpath(NATIONAL, COUNTRY, year, SOURCE, f"{report_name}.json")
-        write_meta(path, meta_data)
\ No newline at end of file
+
+        # Download the source page and write the meta data
+        yield SourceDocumentItem(
+            path=DATA.joinpath(NATIONAL, COUNTRY, year, SOURCE, f'{report_name}.xml'),
+            body=response.body,
+            meta_path=DATA.joinpath(NATIONAL, COUNTRY, year, SOURCE, f"{report_name}.json"),
+            meta=meta_data,
+        )
\ No newline at end of file
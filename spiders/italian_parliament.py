@@ -1,13 +1,11 @@
 import pathlib
 import scrapy
-import locale
 import datetime
 
 from .utils import (
     prepare_folder_national,
-    write_meta,
-    write_source_doc,
 )
+from eia_crawling.items import SourceDocumentItem
 
 ROOT = pathlib.Path(__file__).absolute().parent
 DATA = ROOT.joinpath("data")
@@ -22,26 +20,134 @@ REPORT = 'session'
 NATIONAL = 'national'
 
 
+BASE_URL = 'https://documenti.camera.it/apps/resoconto/getXmlStenografico.aspx?idNumero={sitting}&idLegislatura={legislature}'
+# First year of our time window
+FIRST_YEAR = 2009
+# Upper bound for the exponential search of the last sitting
+MAX_SITTING = 10000
+
+
 class ItalianParliamentSpider(scrapy.Spider):
+    """
+    Stenographic reports of the Camera dei deputati.
+
+    The sittings of a legislature are numbered consecutively. Before crawling, the spider probes single sittings:
+    an exponential and a binary search find the last existing sitting, a second binary search (on the date of the
+    sitting) finds the first sitting of our time window. Only the sittings in between are requested, probes that
+    already fall into the window are parsed directly.
+    Only a 404 marks a sitting as absent. Server errors are retried by the retry middleware; a probe that still fails
+    aborts the search of its legislature, since the bounds found without it could be wrong.
+
+    Arguments (e.g. scrapy crawl italy -a legislatures=16,17,18):
+    - legislatures: comma-separated legislatures (default: 16)
+    """
     name = "italy"
 
-    def __init__(self, **kwargs) -> None:
-        # Hard code upper limits for sittings per legislation, as API is fully in Italian
-        # legis_sitting_pair = {18: 552, 17: 906, 16: 740}
-        legis_sitting_pair = {16: 740}
-        self.start_urls = []
-        for key, value in legis_sitting_pair.items():
-            for sitting in range(1, value):
-                self.start_urls.append(f"https://documenti.camera.it/apps/resoconto/getXmlStenografico.aspx?idNumero={sitting}&idLegislatura={key}")
+    def __init__(self, legislatures: str = '16', **kwargs) -> None:
+        self.legislatures = [int(legislature) for legislature in legislatures.split(',')]
+        # Probed sittings per legislature: number -> year (None if the sitting does not exist)
+        self.probes = {legislature: {} for legislature in self.legislatures}
+        # Sittings that were already parsed during the search
+        self.parsed = {legislature: set() for legislature in self.legislatures}
+        self.search = {legislature: {'phase': 'last', 'lo': 0, 'hi': None} for legislature in self.legislatures}
 
         prepare_folder_national(DATA, COUNTRY)
         super().__init__(**kwargs)
 
+    def start_requests(self):
+        for legislature in self.legislatures:
+            yield from self.advance_search(legislature)
+
+    def probe_request(self, legislature: int, sitting: int) -> scrapy.Request:
+        return scrapy.Request(BASE_URL.format(sitting=sitting, legislature=legislature),
+                              callback=self.parse_probe,
+                              errback=self.probe_failed,
+                              meta={'legislature': legislature, 'sitting': sitting, 'handle_httpstatus_list': [404]},
+                              dont_filter=True)
+
+    def probe_failed(self, failure):
+        legislature = failure.request.meta['legislature']
+        sitting = failure.request.meta['sitting']
+        self.search[legislature]['phase'] = 'failed'
+        self.logger.error(f'Legislature {legislature}: probe of sitting {sitting} failed ({failure.value!r}), '
+                          f'search aborted')
+
+    def parse_probe(self, response):
+        legislature = response.meta['legislature']
+        sitting = response.meta['sitting']
+        year = response.xpath('//seduta/@anno').get() if response.status == 200 else None
+        year = int(year.strip()) if year and year.strip().isdigit() else None
+        self.probes[legislature][sitting] = year
+        if year is not None and year >= FIRST_YEAR:
+            self.parsed[legislature].add(sitting)
+            yield from self.parse(response)
+        yield from self.advance_search(legislature)
+
+    def advance_search(self, legislature: int):
+        """
+        Continue the search of a legislature with the probed sittings.
+        Yields the next probe or, once both ends are known, the requests for the remaining sittings of the window.
+        """
+        search = self.search[legislature]
+        probes = self.probes[legislature]
+        if search['phase'] == 'failed':
+            return
+        while True:
+            if search['phase'] == 'last':
+                # Exponential search for an upper bound, then binary search for the last existing sitting
+                lo, hi = search['lo'], search['hi']
+                if hi is None:
+                    sitting = max(1, lo * 2)
+                    if sitting > MAX_SITTING:
+                        search['hi'] = sitting
+                        continue
+                elif hi - lo > 1:
+                    sitting = (lo + hi) // 2
+                else:
+                    search.update(phase='first', last=lo, lo=0, hi=lo)
+                    continue
+                if sitting not in probes:
+                    yield self.probe_request(legislature, sitting)
+                    return
+                if probes[sitting] is not None:
+                    search['lo'] = sitting
+                else:
+                    search['hi'] = sitting
+
+            elif search['phase'] == 'first':
+                # Binary search for the first sitting of the window (lo: before the window, hi: in the window)
+                last = search['last']
+                if last == 0 or probes[last] < FIRST_YEAR:
+                    search.update(phase='done', first=last + 1)
+                    continue
+                lo, hi = search['lo'], search['hi']
+                if hi - lo <= 1:
+                    search.update(phase='done', first=hi)
+                    continue
+                sitting = (lo + hi) // 2
+                if sitting not in probes:
+                    yield self.probe_request(legislature, sitting)
+                    return
+                # Gaps in the numbering count as part of the window, so that no sitting is lost
+                if probes[sitting] is not None and probes[sitting] < FIRST_YEAR:
+                    search['lo'] = sitting
+                else:
+                    search['hi'] = sitting
+
+            else:
+                first, last = search['first'], search['last']
+                self.logger.info(f'Legislature {legislature}: sittings {first} to {last}')
+                for sitting in range(first, last + 1):
+                    if sitting not in self.parsed[legislature]:
+                        yield scrapy.Request(BASE_URL.format(sitting=sitting, legislature=legislature),
+                                             callback=self.parse)
+                return
+
     def parse(self, response, **kwargs):
 
         year = response.xpath('//seduta/@anno').get()
         year = year.strip()
-        if int(year) > 2008:
+        if int(year) >= FIRST_YEAR:
             month = response.xpath('//seduta/@mese').get()
             month = month.strip()
             day = response.xpath('//seduta/@giorno').get()
@@ -54,15 +160,16 @@ class ItalianParliamentSpider(scrapy.Spider):
             title = year + month + day + "_" + sitting_number + "_" + REPORT
             report_name = title
 
-            # Download the source page
-            path = DATA.joinpath(NATIONAL, COUNTRY, year, SOURCE, f'{report_name}.xml')
-            write_source_doc(path, response.body)
-
-            # Parse the report
-            # Write meta data
+            # Build the meta data
             meta_data = {
                 report_name: {FULL_TITLE: title, FILING_DATE: filing_date, URL: url}
             }
-            path = DATA.joinpath(NATIONAL, COUNTRY, year, SOURCE, f"{report_name}.json")
-            write_meta(path, meta_data)
+
+            # Download the source page and write the meta data
+            yield SourceDocumentItem(
+                path=DATA.joinpath(NATIONAL, COUNTRY, year, SOURCE, f'{report_name}.xml'),
+                body=response.body,
+                meta_path=DATA.joinpath(NATIONAL, COUNTRY, year, SOURCE, f"{report_name}.json"),
+                meta=meta_data,
+            )
 
@@ -8,12 +8,10 @@ import glob
 
 from .utils import (
     parse_url,
-    write_txt,
     prepare_folder_eu,
-    write_meta,
     normalize_name,
-    write_source_doc,
 )
+from eia_crawling.items import SourceDocumentItem
 
 ROOT = pathlib.Path(__file__).absolute().parent
 DATA = ROOT.joinpath("data")
@@ -255,12 +253,12 @@ class LegislativeObservatorySpider(scrapy.Spider):
 
         # Write source document
         response.meta[SUFFIX_DOC] = '.html'
-        self.download_document(response, is_full_doc=False, is_parsed=False)
+        yield self.download_document(response, is_full_doc=False, is_parsed=False)
 
         # Write main text
         response.meta[SUFFIX_DOC] = '.txt'
         response.meta[PARSED_TEXT] = text
-        self.download_document(response, is_full_doc=False, is_parsed=True)
+        yield self.download_document(response, is_full_doc=False, is_parsed=True)
 
     def parse_committee_report_full(self, response):
         """
@@ -273,7 +271,7 @@ class LegislativeObservatorySpider(scrapy.Spider):
 
         # Write source document
         response.meta[SUFFIX_DOC] = '.html'
-        self.download_document(response, is_full_doc=True, is_parsed=False)
+        yield self.download_document(response, is_full_doc=True, is_parsed=False)
 
         # todo: Implement parsing for committee report full
 
@@ -288,7 +286,7 @@ class LegislativeObservatorySpider(scrapy.Spider):
 
         # Write source document
         response.meta[SUFFIX_DOC] = '.html'
-        self.download_document(response, is_full_doc=True, is_parsed=False)
+        yield self.download_document(response, is_full_doc=True, is_parsed=False)
 
         # todo: Implement parsing for final act and legislative proposal full
 
@@ -303,11 +301,11 @@ class LegislativeObservatorySpider(scrapy.Spider):
 
         # Write source document
         response.meta[SUFFIX_DOC] = '.pdf'
-        self.download_document(response, is_full_doc=True, is_parsed=False)
+        yield self.download_document(response, is_full_doc=True, is_parsed=False)
 
         # todo: Implement parsing for council position full
 
-    def download_document(self, response, is_full_doc: bool, is_parsed: bool):
+    def download_document(self, response, is_full_doc: bool, is_parsed: bool) -> SourceDocumentItem:
 
         # Get meta data
         uid = response.meta[UID]
@@ -331,16 +329,15 @@ class LegislativeObservatorySpider(scrapy.Spider):
         else:
             path = DATA.joinpath(EU, uid, SUMMARY, file_name)
 
-        # Write document
+        # Document to write
         if is_parsed:
-            text = response.meta[PARSED_TEXT]
-            # Write the parsed document
-            write_txt(path, text)
+            # The parsed document
+            body = response.meta[PARSED_TEXT]
         else:
-            # Write the unparsed/source document
-            write_source_doc(path, response.body)
+            # The unparsed/source document
+            body = response.body
 
-        # Write meta data
+        # Build the meta data
         meta_data = {
             normalized_title: {FULL_TITLE: title, FILING_DATE: filing_date, URL: url}
         }
@@ -354,7 +351,7 @@ class LegislativeObservatorySpider(scrapy.Spider):
             meta_data[normalized_title][CELEX] = celex
 
         if is_full_doc:
-            path = DATA.joinpath(EU, uid, FULL, SOURCE, f"{normalized_title}.json")
+            meta_path = DATA.joinpath(EU, uid, FULL, SOURCE, f"{normalized_title}.json")
         else:
-            path = DATA.joinpath(EU, uid, SUMMARY, SOURCE, f"{normalized_title}.json")
-        write_meta(path, meta_data)
+            meta_path = DATA.joinpath(EU, uid, SUMMARY, SOURCE, f"{normalized_title}.json")
+        return SourceDocumentItem(path=path, body=body, meta_path=meta_path, meta=meta_data)
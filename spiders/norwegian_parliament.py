@@ -1,15 +1,13 @@
 import pathlib
 import scrapy
 import datetime
-import requests
-import locale
-import time
-from bs4 import BeautifulSoup
+import re
+from urllib.parse import urlparse
+from scrapy.http.request import Request
 from .utils import (
     prepare_folder_national,
-    write_meta,
-    write_source_doc,
 )
+from eia_crawling.items import SourceDocumentItem
 
 ROOT = pathlib.Path(__file__).absolute().parent
 DATA = ROOT.joinpath("data")
@@ -27,92 +25,67 @@ YEARS = ["2016", "2017", "2018", "2019", "2020", "2021"]
 
 class NorwegianParliamentSpider(scrapy.Spider):
     name = COUNTRY
-    base_urls = []
-    all_urls = []
+    base_url = "https://www.stortinget.no"
+
     def __init__(self, years=None, **kwargs) -> None:
 
         if years is None:
             years = YEARS
-
-        self.base_url = "https://www.stortinget.no"
-        #self.session_default_id = 0
-        self.session_id = 0
-        # First Year
-        #corr_url = self.base_url + "/no/Saker-og-publikasjoner/Publikasjoner/Referater/?pid={}-{}#primaryfilter".format(
-        #    int(YEARS[0]) - 1, YEARS[0])
-        #self.base_urls.append(corr_url)
-
-        for single_year in years:
-            corr_url = self.base_url + "/no/Saker-og-publikasjoner/Publikasjoner/Referater/?pid={}-{}#primaryfilter".format(
-                single_year, int(single_year) + 1)
-
-            self.base_urls.append(corr_url)
+        elif isinstance(years, str):
+            # Passed on the command line, e.g. -a years=2019,2020
+            years = years.split(',')
+        self.years = years
 
         prepare_folder_national(DATA, COUNTRY)
-        self.download_html_and_metadata()
         super().__init__(**kwargs)
 
-    def download_html_and_metadata(self):
-
-        # Get all URLS to the meetings
-        self.construct_all_urls()
-
-        for url in self.all_urls:
-
-            # Open HTML
-            website = requests.get(url)
-            results = BeautifulSoup(website.content, 'html.parser')
-            time.sleep(1)
-
-            # Get Meta Data
-            try:
-                meta_data, path_html, path_json, year = self.construct_meta_data(url, results)
-                if int(year) < int(YEARS[0]):
-                    continue
-            except:
-                return
-
-            # Create HTML and Json File
-            self.download_html_json(website, path_html, path_json, meta_data)
-
-
-    def construct_all_urls(self):
-
-        for url in self.base_urls:
-            website = requests.get(url)
-            time.sleep(2)
-            results = BeautifulSoup(website.content, 'html.parser')
-
-            # List items are all urls to the meetings
-            find_all = results.find_all('h3', class_='listitem-title')
-            for element in find_all:
-
-                # href contains the link to the meetings
-                element_a = element.find_all('a', href=True)
-                for single_href in element_a:
-                    self.all_urls.append(single_href['href'])
-
-        # View whole meeting in HTML
-        open_meeting = "?all=true"
-        for index, url in enumerate(self.all_urls):
-            # Construct url with base and with opening the meeting in HTML
-            self.all_urls[index] = self.base_url + url + open_meeting
-
-    def construct_meta_data(self, url, results):
-
-        #try:
-        #    session_id = results.find('meta', attrs={'name': 'MA.Meeting-id'})["content"]
-        #except:
-        #    session_id = '{:05}'.format(self.session_default_id)
-        #    self.session_default_id += 1
-        self.session_id += 1
-
-        date = results.find('meta', attrs={'name': 'DC.Date'})["content"].strip('\t\n\r ')
-
-        # Set locale to Belgium in order to parse Belgian dates
-        locale.setlocale(locale.LC_TIME, 'no_NO')
+    def start_requests(self) -> Request:
+        # The listing of each parliamentary year contains the links to all meetings
+        for single_year in self.years:
+            url = self.base_url + "/no/Saker-og-publikasjoner/Publikasjoner/Referater/?pid={}-{}#primaryfilter".format(
+                single_year, int(single_year) + 1)
+            yield Request(url, callback=self.parse)
+
+    def parse(self, response, **kwargs):
+        # List items are all urls to the meetings
+        hrefs = response.xpath(
+            '//h3[contains(concat(" ", normalize-space(@class), " "), " listitem-title ")]//a/@href').getall()
+        for href in hrefs:
+            # View whole meeting in HTML
+            url = response.urljoin(href) + "?all=true"
+            yield Request(url, callback=self.parse_meeting)
+
+    def parse_meeting(self, response, **kwargs):
+        # Get Meta Data
+        date = response.xpath('//meta[@name="DC.Date"]/@content').get()
+        if date is None:
+            self.logger.warning(f'No date found for meeting {response.url}')
+            return
+        meta_data, path_html, path_json, year = self.construct_meta_data(response.url, date,
+                                                                          self.get_session_id(response))
+        if int(year) < int(min(self.years)):
+            return
+
+        # Download the source page and write the meta data
+        yield SourceDocumentItem(
+            path=path_html,
+            body=response.body,
+            meta_path=path_json,
+            meta=meta_data,
+        )
+
+    @staticmethod
+    def get_session_id(response) -> str:
+        """Id of the meeting (MA.Meeting-id), or the last part of the meeting URL, independent of the crawl order."""
+        session_id = response.xpath('//meta[@name="MA.Meeting-id"]/@content').get()
+        if not session_id or not session_id.strip():
+            session_id = urlparse(response.url).path.rstrip('/').split('/')[-1]
+        return re.sub(r'[^\w-]+', '-', session_id.strip())
+
+    def construct_meta_data(self, url, date, session_id):
+
+        date = date.strip('\t\n\r ')
         date_format = datetime.datetime.strptime(date, '%Y-%m-%d %H:%M:%S')
-        locale.setlocale(locale.LC_TIME, 'nl_BE')
         year = str(date_format.year)
         date = date_format.strftime('%Y%m%d')
         date_month_day = date_format.strftime('%m%d')
@@ -121,8 +94,8 @@ class NorwegianParliamentSpider(scrapy.Spider):
         # Build the meta data
         date_abbreviation = year[2:] + date_month_day
 
-        report_name = f'{date_abbreviation}_{self.session_id}_{REPORT}'
-        title = f'{date}_{self.session_id}'
+        report_name = f'{date_abbreviation}_{session_id}_{REPORT}'
+        title = f'{date}_{session_id}'
 
         meta_data = {
             report_name: {FULL_TITLE: title, FILING_DATE: filing_date, URL: url}
@@ -133,14 +106,3 @@ class NorwegianParliamentSpider(scrapy.Spider):
         path_json = DATA.joinpath(NATIONAL, COUNTRY, year, SOURCE, f"{report_name}.json")
 
         return meta_data, path_html, path_json, year
-
-
-    def download_html_json(self, response, path_html, path_json, meta_data, **kwargs):
-        # Start URLs lead to the overview page of a legislative period
-        # Go through all documents/rows of the legislative period and download them
-        # Download the source page
-        write_source_doc(path_html, response.content)
-
-        # Parse the report
-        # Write meta data
-        write_meta(path_json, meta_data)
@@ -0,0 +1,147 @@
+import pathlib
+import hashlib
+import json
+import os
+import threading
+import fnmatch
+import zstandard
+
+ROOT = pathlib.Path(__file__).absolute().parent
+DATA = ROOT.joinpath("data")
+
+# Define string constants
+STORE = 'store'
+BLOBS = 'blobs'
+MANIFEST = 'manifest.jsonl'
+NATIONAL = 'national'
+SOURCE = 'source'
+COMPRESSION_LEVEL = 10
+
+
+class SourceStore:
+    """
+    Content-addressed store for the raw source documents (HTML, XML, PDF, ...) written by the spiders.
+
+    Every body is compressed with zstd and written once per content hash to <data>/store/blobs/<h[:2]>/<h>.zst.
+    The manifest (<data>/store/manifest.jsonl) maps the logical source path of a document
+    (e.g. national/austria/2019/source/session_1.html) to its blob, together with country, year and report name.
+    It is append-only, the last entry of a path wins.
+    """
+
+    def __init__(self, data_path: pathlib.Path = DATA) -> None:
+        self.data_path = pathlib.Path(data_path).absolute()
+        self.root = self.data_path.joinpath(STORE)
+        self._manifest = None
+        self._lock = threading.Lock()
+
+    def key(self, path) -> str:
+        """Logical key of a source path (relative to the data folder if possible)."""
+        path = pathlib.Path(path).absolute()
+        try:
+            return path.relative_to(self.data_path).as_posix()
+        except ValueError:
+            return path.as_posix()
+
+    def blob_path(self, digest: str) -> pathlib.Path:
+        return self.root.joinpath(BLOBS, digest[:2], f'{digest}.zst')
+
+    @property
+    def manifest(self) -> dict:
+        if self._manifest is None:
+            with self._lock:
+                if self._manifest is None:
+                    self._manifest = self._load_manifest()
+        return self._manifest
+
+    def _load_manifest(self) -> dict:
+        manifest = {}
+        path = self.root.joinpath(MANIFEST)
+        if path.is_file():
+            with open(path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    entry = json.loads(line)
+                    manifest[entry['path']] = entry
+        return manifest
+
+    def put(self, path, content: bytes) -> str:
+        """
+        Store the content for the given source path and return its hash.
+        Nothing is written if the path already points to a blob with the same content.
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        key = self.key(path)
+        manifest = self.manifest
+        entry = manifest.get(key)
+        blob_p = self.blob_path(digest)
+        if entry is not None and entry['sha256'] == digest and blob_p.is_file():
+            return digest
+
+        if not blob_p.is_file():
+            blob_p.parent.mkdir(parents=True, exist_ok=True)
+            compressed = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL).compress(content)
+            # Write to a temporary file first, so that a crashed crawl never leaves a truncated blob behind
+            tmp_p = blob_p.with_name(f'{blob_p.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+            with open(tmp_p, 'wb') as file:
+                file.write(compressed)
+            os.replace(tmp_p, blob_p)
+
+        entry = {'path': key, 'sha256': digest, 'size': len(content)}
+        entry.update(self._describe(key))
+        with self._lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            with open(self.root.joinpath(MANIFEST), 'a', encoding='utf-8') as file:
+                file.write(json.dumps(entry) + '\n')
+            manifest[key] = entry
+        return digest
+
+    def get(self, path) -> bytes:
+        entry = self.manifest[self.key(path)]
+        with open(self.blob_path(entry['sha256']), 'rb') as file:
+            return zstandard.ZstdDecompressor().decompress(file.read(), max_output_size=entry['size'])
+
+    def head(self, path, size: int) -> bytes:
+        """First bytes of a stored document, only the beginning of the blob is decompressed."""
+        with open(self.blob_path(self.manifest[self.key(path)]['sha256']), 'rb') as file:
+            with zstandard.ZstdDecompressor().stream_reader(file) as reader:
+                return reader.read(size)
+
+    def contains(self, path) -> bool:
+        return self.key(path) in self.manifest
+
+    def digest(self, path):
+        entry = self.manifest.get(self.key(path))
+        if entry is None:
+            return None
+        return entry['sha256']
+
+    def glob(self, directory, pattern: str = '*') -> list:
+        """Paths of all stored documents located directly in the directory and matching the pattern."""
+        directory = pathlib.Path(directory).absolute()
+        prefix = self.key(directory) + '/'
+        paths = []
+        for key in self.manifest:
+            if key.startswith(prefix) and '/' not in key[len(prefix):] and fnmatch.fnmatch(key[len(prefix):], pattern):
+                paths.append(directory.joinpath(key[len(prefix):]))
+        return paths
+
+    @staticmethod
+    def _describe(key: str) -> dict:
+        # national/<country>/<year>/source/<report_name>.<suffix>
+        parts = key.split('/')
+        if len(parts) == 5 and parts[0] == NATIONAL and parts[3] == SOURCE:
+            return {'country': parts[1], 'year': parts[2], 'report_name': pathlib.PurePosixPath(parts[4]).stem}
+        return {'country': None, 'year': None, 'report_name': pathlib.PurePosixPath(key).stem}
+
+
+_stores = {}
+
+
+def get_source_store(data_path: pathlib.Path = DATA) -> SourceStore:
+    """Returns the (process wide) store for the given data folder."""
+    data_path = pathlib.Path(data_path).absolute()
+    if data_path not in _stores:
+        _stores[data_path] = SourceStore(data_path)
+    return _stores[data_path]
@@ -5,7 +5,11 @@ import json
 import csv
 import codecs
 import unicodedata
+import contextlib
+import hashlib
+import tempfile
 import pandas as pd
+from .source_store import get_source_store, DATA
 
 
 def prepare_folder_eu(data_path: pathlib.Path, uid: str, summary: str, full: str):
@@ -66,12 +70,76 @@ def write_meta(path: pathlib.Path, meta: dict) -> None:
             raise NotImplementedError
 
 
-def write_source_doc(path, content) -> None:
-    with open(path, "wb") as file:
-        file.write(content)
-
-
-def write_csv(path: pathlib.Path, data: List[dict], fieldnames: List[str]):
+def write_source_doc(path, content, data_path: pathlib.Path = DATA) -> str:
+    # Source documents are kept in the content-addressed store, unchanged documents are not rewritten
+    return get_source_store(data_path).put(path, content)
+
+
+def read_source_doc(path, data_path: pathlib.Path = DATA) -> bytes:
+    """Read a source document from the store (falls back to plain files crawled before the store existed)."""
+    store = get_source_store(data_path)
+    if store.contains(path):
+        return store.get(path)
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def read_source_head(path, size: int, data_path: pathlib.Path = DATA) -> bytes:
+    """First bytes of a source document (e.g. to check its file signature) without reading all of it."""
+    store = get_source_store(data_path)
+    if store.contains(path):
+        return store.head(path, size)
+    with open(path, "rb") as file:
+        return file.read(size)
+
+
+def source_doc_digest(path) -> str:
+    """sha256 of a source document (taken from the store manifest for stored documents)."""
+    digest = get_source_store().digest(path)
+    if digest is None:
+        with open(path, "rb") as file:
+            digest = hashlib.sha256(file.read()).hexdigest()
+    return digest
+
+
+def source_doc_exists(path, data_path: pathlib.Path = DATA) -> bool:
+    return get_source_store(data_path).contains(path) or pathlib.Path(path).is_file()
+
+
+def glob_source_docs(directory: pathlib.Path, pattern: str) -> List[pathlib.Path]:
+    """Source documents in the directory matching the pattern, either stored or plain files."""
+    paths = set(get_source_store().glob(directory, pattern))
+    paths.update(pathlib.Path(directory).glob(pattern))
+    return sorted(paths)
+
+
+@contextlib.contextmanager
+def materialize_source_doc(path: pathlib.Path):
+    """
+    Yields a file system path to the source document for libraries that only read from disk (textract, tika, ...).
+    Stored documents are written to a temporary file with the same name, which is removed afterwards.
+    """
+    path = pathlib.Path(path)
+    store = get_source_store()
+    if not store.contains(path):
+        yield path
+        return
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_path = pathlib.Path(tmp_dir).joinpath(path.name)
+        with open(tmp_path, "wb") as file:
+            file.write(store.get(path))
+        yield tmp_path
+
+
+def write_csv(path: pathlib.Path, data: List[dict], fieldnames: List[str], output_format: str = None):
+    """
+    output_format 'parquet' (default: the PARSE_OUTPUT_FORMAT set by parse_national) writes <name>.parquet instead,
+    see parsing/row_sinks.py
+    """
+    from eia_crawling.parsing.row_sinks import get_output_format, write_rows, PARQUET
+    if isinstance(data, list) and (output_format or get_output_format()) == PARQUET:
+        write_rows(path, data, fieldnames, output_format=PARQUET)
+        return
     with codecs.open(path, "w", encoding="utf-8") as file:
         if isinstance(data, list):
             writer = csv.DictWriter(file, fieldnames=fieldnames)
@@ -0,0 +1,109 @@
+# Writes belgian_plenary.pdf: two pages in the layout of a De Kamer plenary report (CRABV), Dutch in the left and
+# French in the right column. It reproduces the cases the column split has to handle: an opening phrase wrapped over
+# two rows, vote tables running across both columns and headers, footers and page numbers.
+# Run from the ./eia_crawling directory (requires reportlab):
+#   python tests/fixtures/make_belgian_fixture.py
+
+import pathlib
+
+FIXTURE = pathlib.Path(__file__).absolute().parent.joinpath('belgian_plenary.pdf')
+LEFT = 50
+RIGHT = 315
+TOP = 790
+PITCH = 12
+PARAGRAPH = 22
+
+PAGES = [
+    {
+        'nl': [
+            'De vergadering wordt geopend om',
+            '14.15 uur en voorgezeten door',
+            'de heer André Flahaut.',
+            None,
+            '01 Mondelinge vragen',
+            None,
+            '01.01 Jan Jambon (N-VA): Mijnheer de',
+            'voorzitter, ik heb een vraag over',
+            'de begroting.',
+        ],
+        'fr': [
+            'La séance est',
+            'ouverte à 14.15 heures et présidée',
+            'par M. André Flahaut.',
+            None,
+            '01 Questions orales',
+            None,
+            '01.01 Jan Jambon (N-VA): Monsieur le',
+            'président, j\'ai une question sur le',
+            'budget.',
+            None,
+            'Il faut réduire les dépenses.',
+        ],
+    },
+    {
+        'nl': [
+            'De voorzitter: Wij gaan over tot de',
+            'stemming.',
+            None,
+        ],
+        'fr': [
+            'Le président: Nous passons au vote.',
+            None,
+        ],
+        # Dutch label, number and French label of the vote table
+        'votes': [
+            ('(Stemming/', None, 'vote 1)'),
+            ('Ja', '75', 'Oui'),
+            ('Nee', None, '40 Non'),
+            ('Onthoudingen', '3', 'Abstentions'),
+            ('Totaal', '118', 'Total'),
+        ],
+        'after': {
+            'nl': ['De voorzitter: Het wetsontwerp is', 'aangenomen.'],
+            'fr': ['Le président: Le projet de loi est', 'adopté.'],
+        },
+    },
+]
+
+
+def write_column(canvas, x: float, y: float, lines: list) -> float:
+    for line in lines:
+        if line is None:
+            y -= PARAGRAPH - PITCH
+            continue
+        canvas.drawString(x, y, line)
+        y -= PITCH
+    return y
+
+
+def main(path: pathlib.Path = FIXTURE) -> pathlib.Path:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas as pdf_canvas
+    canvas = pdf_canvas.Canvas(str(path), pagesize=A4, invariant=1)
+    for number, page in enumerate(PAGES, start=1):
+        canvas.setFont('Helvetica', 10)
+        canvas.drawString(LEFT, TOP + 20, 'CRABV 52 PLEN 123')
+        canvas.drawString(RIGHT + 150, TOP + 20, '23/04/2009')
+        y_nl = write_column(canvas, LEFT, TOP, page['nl'])
+        y_fr = write_column(canvas, RIGHT, TOP, page['fr'])
+        y = min(y_nl, y_fr)
+        for dutch, count, french in page.get('votes', []):
+            canvas.drawString(LEFT + 60, y, dutch)
+            if count is not None:
+                canvas.drawString(LEFT + 200, y, count)
+            canvas.drawString(RIGHT + 40, y, french)
+            y -= PITCH
+        if 'after' in page:
+            y -= PARAGRAPH - PITCH
+            write_column(canvas, LEFT, y, page['after']['nl'])
+            write_column(canvas, RIGHT, y, page['after']['fr'])
+        canvas.drawString(LEFT, 40, 'KAMER-4E ZITTING VAN DE 52E ZITTINGSPERIODE')
+        canvas.drawString(RIGHT, 40, 'CHAMBRE-4E SESSION DE LA 52E LÉGISLATURE')
+        canvas.drawString(RIGHT + 200, 28, str(number))
+        canvas.showPage()
+    canvas.save()
+    return path
+
+
+if __name__ == "__main__":
+    main()
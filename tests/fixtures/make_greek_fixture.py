@@ -0,0 +1,53 @@
+# Writes greek_protocol.docx: a minimal Word document (a zip archive with the document, content types and
+# relationships parts) with two paragraphs of a plenary protocol of the Hellenic Parliament.
+# Run from the ./eia_crawling directory:
+#   python tests/fixtures/make_greek_fixture.py
+
+import pathlib
+import zipfile
+
+FIXTURE = pathlib.Path(__file__).absolute().parent.joinpath('greek_protocol.docx')
+# Fixed timestamp, so the archive does not change between runs
+DATE_TIME = (2019, 3, 12, 0, 0, 0)
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+RELATIONSHIPS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+PARAGRAPHS = [
+    'ΠΡΑΚΤΙΚΑ ΒΟΥΛΗΣ',
+    'ΠΡΟΕΔΡΕΥΩΝ (Νικήτας Κακλαμάνης): Αρχίζει η συνεδρίαση.',
+]
+
+
+def document() -> str:
+    paragraphs = ''.join(f'<w:p><w:r><w:t>{paragraph}</w:t></w:r></w:p>' for paragraph in PARAGRAPHS)
+    return ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+            f'<w:body>{paragraphs}</w:body></w:document>')
+
+
+def main(path: pathlib.Path = FIXTURE) -> pathlib.Path:
+    parts = [('[Content_Types].xml', CONTENT_TYPES), ('_rels/.rels', RELATIONSHIPS), ('word/document.xml', document())]
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in parts:
+            archive.writestr(zipfile.ZipInfo(name, date_time=DATE_TIME), content.encode('utf-8'),
+                             compress_type=zipfile.ZIP_DEFLATED)
+    return path
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import csv
+import json
+import pathlib
+import pytest
+
+from eia_crawling.parsing.pdf_extraction import PDF_CACHE_ENV, iter_pdf_columns
+from eia_crawling.parsing.parsing_belgian_parliament import parse_belgian_parliament
+
+# Generated by tests/fixtures/make_belgian_fixture.py
+FIXTURE = pathlib.Path(__file__).absolute().parent.joinpath('fixtures', 'belgian_plenary.pdf')
+
+
+@pytest.fixture(autouse=True)
+def no_extraction_cache(monkeypatch):
+    monkeypatch.setenv(PDF_CACHE_ENV, '0')
+
+
+def test_columns_split_vote_tables():
+    pages = list(iter_pdf_columns(FIXTURE))
+    assert len(pages) == 2
+    dutch, french = ([text for text, _ in column] for column in pages[1]['columns'])
+    # The vote table lines are cut at the column boundary
+    assert 'Ja 75' in dutch and 'Oui' in french
+    assert 'Nee' in dutch and '40 Non' in french
+
+
+def test_parse_belgian_parliament(tmp_path):
+    meta_json_path = tmp_path.joinpath('belgian_plenary.json')
+    with open(meta_json_path, 'w') as file:
+        json.dump({'belgian_plenary': {'full_title': '20090423_123_session'}}, file)
+
+    # The opening phrase is wrapped over two rows
+    parse_belgian_parliament(year_path=tmp_path, year=2009, source_pdf_path=FIXTURE, meta_json_path=meta_json_path)
+
+    with open(tmp_path.joinpath('belgian_plenary_parsed.csv'), newline='', encoding='utf-8') as file:
+        rows = list(csv.DictReader(file))
+    assert [(row['speechnumber'], row['paragraphnumber'], row['speaker'], row['party'], row['text']) for row in rows] \
+        == [('2', '1', 'Jan Jambon', 'N-VA', "Monsieur le président, j'ai une question sur le budget."),
+            ('2', '2', 'Jan Jambon', 'N-VA', 'Il faut réduire les dépenses.'),
+            ('3', '1', 'Le président', '', 'Nous passons au vote.'),
+            ('4', '1', 'Le président', '', 'Le projet de loi est adopté.')]
+    assert {row['agenda'] for row in rows} == {'01 Questions orales'}
+    assert {row['date'] for row in rows} == {'2009-04-23T00:00:00'}
+    # Neither the Dutch column nor the French halves of the vote table leak into the text
+    text = ' '.join(row['text'] for row in rows)
+    for word in ('Oui', 'Non', 'Abstentions', 'Total', 'vote 1', 'voorzitter', 'CHAMBRE'):
+        assert word not in text
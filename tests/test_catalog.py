@@ -0,0 +1,33 @@
+import multiprocessing
+import pathlib
+from concurrent.futures import ProcessPoolExecutor
+
+from eia_crawling.spiders.catalog import get_document_catalog
+
+
+def source_path(data_path: pathlib.Path, number: int) -> pathlib.Path:
+    return data_path.joinpath('national', 'france', '2019', 'source', f'seance_{number}.pdf')
+
+
+def write_rows(data_path: pathlib.Path, number: int, parent_connection: int) -> tuple:
+    catalog = get_document_catalog(data_path)
+    rows = catalog.replace_rows(source_path(data_path, number), (f'{{"row": {i}}}' for i in range(number)))
+    # The inherited catalog stays alive in the worker, a new connection cannot have the same id
+    return id(catalog.connection) != parent_connection, rows
+
+
+def test_forked_workers_open_their_own_connection(tmp_path):
+    catalog = get_document_catalog(tmp_path)
+    for number in range(1, 9):
+        catalog.add(source_path(tmp_path, number), 'sha256', 1)
+    # Used by the parent before the workers fork, like parse_national does
+    assert len(catalog.source_paths('france', 2019)) == 8
+
+    context = multiprocessing.get_context('fork')
+    with ProcessPoolExecutor(max_workers=4, mp_context=context) as executor:
+        results = list(executor.map(write_rows, [tmp_path] * 8, range(1, 9), [id(catalog.connection)] * 8))
+    assert results == [(True, rows) for rows in range(1, 9)]
+
+    assert get_document_catalog(tmp_path) is catalog
+    count, = catalog.connection.execute('SELECT COUNT(*) FROM parsed_rows').fetchone()
+    assert count == sum(range(1, 9))
@@ -0,0 +1,74 @@
+import datetime
+import json
+from scrapy import Request
+from scrapy.http import HtmlResponse, TextResponse
+from twisted.python.failure import Failure
+
+from eia_crawling.spiders import ep_parliament
+
+CALENDAR = {'sessions': [{'sittingDate': '2019-07-02'}, {'year': 2019, 'month': 7, 'day': 3},
+                         {'publicationDate': '2019-07-05'}]}
+
+
+def get_spider(tmp_path, monkeypatch, languages='EN,DE'):
+    monkeypatch.setattr(ep_parliament, 'DATA', tmp_path)
+    return ep_parliament.EpParliamentSpider(terms='9', languages=languages)
+
+
+def probe_response(request, status):
+    return HtmlResponse(request.url, status=status, body=b'', request=request)
+
+
+def probed_days(requests):
+    return sorted({(request.meta['date'], request.meta['language']) for request in requests})
+
+
+def test_calendar_records_days_without_sitting(tmp_path, monkeypatch):
+    spider = get_spider(tmp_path, monkeypatch)
+    request = Request(ep_parliament.CALENDAR_URL.format(term=9), meta={'term': 9})
+    response = TextResponse(request.url, body=json.dumps(CALENDAR).encode(), request=request)
+    requests = list(spider.parse_calendar(response))
+
+    assert probed_days(requests) == [('2019-07-02', 'DE'), ('2019-07-02', 'EN'), ('2019-07-03', 'DE'),
+                                     ('2019-07-03', 'EN')]
+    assert not any('handle_httpstatus_list' in request.meta for request in requests)
+    # Every other day of the term is known to be without a sitting, also the publication date
+    assert (9, '2019-07-05', 'EN') in spider.non_sitting_dates
+    assert (9, '2019-07-02', 'EN') not in spider.non_sitting_dates
+    start_date, end_date = ep_parliament.TERMS[9]
+    assert len(spider.non_sitting_dates) == 2 * ((end_date - start_date).days + 1 - 2)
+
+
+def test_fallback_skips_known_non_sitting_days(tmp_path, monkeypatch):
+    spider = get_spider(tmp_path, monkeypatch)
+    failure = Failure(ConnectionRefusedError())
+    failure.request = Request(ep_parliament.CALENDAR_URL.format(term=9), meta={'term': 9})
+    requests = list(spider.calendar_failed(failure))
+    start_date, end_date = ep_parliament.TERMS[9]
+    assert len(requests) == 2 * ((end_date - start_date).days + 1)
+    assert all(request.meta['handle_httpstatus_list'] == ep_parliament.NON_SITTING_HTTP_CODES for request in requests)
+
+    # A redirect to the search page marks the English report of the day as missing, a report is stored
+    by_day = {(request.meta['date'], request.meta['language']): request for request in requests}
+    assert list(spider.parse(probe_response(by_day[('2019-07-05', 'EN')], 302))) == []
+    items = list(spider.parse(probe_response(by_day[('2019-07-02', 'EN')], 200)))
+    assert items[0]['path'].name == 'CRE-9-2019-07-02.html'
+    spider.closed('finished')
+
+    # The next run does not probe the missing day again, the other language of that day is still probed
+    spider = get_spider(tmp_path, monkeypatch)
+    assert spider.non_sitting_dates == {(9, '2019-07-05', 'EN')}
+    days = probed_days(spider.calendar_failed(failure))
+    assert ('2019-07-05', 'EN') not in days
+    assert ('2019-07-05', 'DE') in days
+    assert ('2019-07-02', 'EN') in days
+    assert len(days) == len(requests) - 1
+
+
+def test_future_days_are_not_recorded(tmp_path, monkeypatch):
+    spider = get_spider(tmp_path, monkeypatch, languages='EN')
+    tomorrow = (datetime.date.today() + datetime.timedelta(days=1)).isoformat()
+    request = Request(ep_parliament.CRE_URL.format(term=9, date=tomorrow, language='EN'),
+                      meta={'term': 9, 'date': tomorrow, 'language': 'EN'})
+    list(spider.parse(probe_response(request, 404)))
+    assert spider.non_sitting_dates == set()
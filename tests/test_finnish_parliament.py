@@ -0,0 +1,81 @@
+import asyncio
+import importlib.util
+import pathlib
+from aiohttp import web
+
+from eia_crawling.spiders.source_store import get_source_store
+
+ROOT = pathlib.Path(__file__).absolute().parent.parent
+
+spec = importlib.util.spec_from_file_location(
+    'finnish_parliament', ROOT.joinpath('non-scrapy-spiders', 'finnish_parliament.py'))
+finnish_parliament = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(finnish_parliament)
+
+PDF = b'%PDF-1.4\n%fixture protocol\n%%EOF\n'
+
+
+def run_download(data_path: pathlib.Path, responses: dict, requested: list, **kwargs) -> dict:
+    """Serve the responses (protocol number -> list of (status, body), the last one is repeated) and download 2019."""
+    async def handler(request):
+        number = int(request.match_info['number'])
+        requested.append(number)
+        answers = responses.get(number, [(404, b'')])
+        status, body = answers.pop(0) if len(answers) > 1 else answers[0]
+        return web.Response(status=status, body=body, content_type='application/pdf')
+
+    async def download():
+        app = web.Application()
+        app.router.add_get('/PTK_{number}+2019.pdf', handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            return await finnish_parliament.download([2019], base_url=f'http://127.0.0.1:{port}', data_path=data_path,
+                                                     retry_delay=0, **kwargs)
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(download())
+
+
+def test_download_year(tmp_path):
+    responses = {
+        1: [(200, PDF)],
+        # Transient server errors are retried
+        2: [(503, b''), (503, b''), (200, PDF)],
+        # An HTML error page is not a protocol
+        3: [(200, b'<html>Not found</html>')],
+        4: [(200, PDF)],
+    }
+    requested = []
+    assert run_download(tmp_path, responses, requested, concurrency=2, max_misses=4) == {2019: 4}
+
+    store = get_source_store(tmp_path)
+    source_p = tmp_path.joinpath('national', 'finland', '2019', 'source')
+    assert sorted(path.name for path in store.glob(source_p, '*.pdf')) == ['1.pdf', '2.pdf', '4.pdf']
+    assert store.get(source_p.joinpath('2.pdf')) == PDF
+    # Nothing is written to the global store
+    assert not get_source_store().contains(source_p.joinpath('1.pdf'))
+
+    # Downloaded protocols are not requested again
+    requested.clear()
+    assert run_download(tmp_path, {}, requested, concurrency=2, max_misses=4) == {2019: 4}
+    assert not {1, 2, 4} & set(requested)
+
+
+def test_failures_are_not_misses(tmp_path):
+    # Protocol 2 keeps failing, it neither ends the year nor hides the protocols after it
+    responses = {1: [(200, PDF)], 2: [(500, b'')], 3: [(200, PDF)]}
+    requested = []
+    assert run_download(tmp_path, responses, requested, concurrency=1, max_misses=2) == {2019: 3}
+    assert requested.count(2) == finnish_parliament.RETRIES + 1
+
+
+def test_server_down_aborts_year(tmp_path):
+    requested = []
+    assert run_download(tmp_path, {n: [(503, b'')] for n in range(1, 10)}, requested, concurrency=1,
+                        max_misses=3) == {2019: 0}
+    assert len(requested) == 3 * (finnish_parliament.RETRIES + 1)
@@ -0,0 +1,89 @@
+import asyncio
+import importlib.util
+import json
+import pathlib
+from aiohttp import web
+
+from eia_crawling.spiders.source_store import get_source_store
+
+ROOT = pathlib.Path(__file__).absolute().parent.parent
+FIXTURES = ROOT.joinpath('tests', 'fixtures')
+
+spec = importlib.util.spec_from_file_location(
+    'greek_parliament', ROOT.joinpath('non-scrapy-spiders', 'greek_parliament.py'))
+greek_parliament = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(greek_parliament)
+
+LISTING = FIXTURES.joinpath('greek_listing.html').read_text(encoding='utf-8')
+DOCX = FIXTURES.joinpath('greek_protocol.docx').read_bytes()
+DOCX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+ERROR_PAGE = b'<html><body>Runtime Error</body></html>'
+DIRECT_PATH = '/UserFiles/a08fc2dd-61a9-4a83-b09a-09f4c564609d/es20190312.docx'
+POSTBACK_TARGET = 'ctl00$ContentPlaceHolder1$rr$repSearchResults$ctl{:02d}$lnkTxt'
+
+
+def run_download(data_path: pathlib.Path, postbacks: dict, requested: list) -> dict:
+    """Serve the listing fixture, the direct .docx and the postback answers (result row -> body), download page 31."""
+    async def listing(request):
+        requested.append(('GET', request.path))
+        return web.Response(text=LISTING, content_type='text/html', charset='utf-8')
+
+    async def postback(request):
+        form = await request.post()
+        assert form['__VIEWSTATE'] and form['__EVENTVALIDATION']
+        row = int(form['__EVENTTARGET'].split('$')[-2][3:])
+        requested.append(('POST', row))
+        # The site sends error pages with the content type of the document
+        return web.Response(body=postbacks[row], headers={'Content-Type': DOCX_CONTENT_TYPE})
+
+    async def document(request):
+        requested.append(('GET', request.path))
+        return web.Response(body=DOCX, headers={'Content-Type': DOCX_CONTENT_TYPE})
+
+    async def download():
+        app = web.Application()
+        app.router.add_get(greek_parliament.LISTING_PATH, listing)
+        app.router.add_post(greek_parliament.LISTING_PATH, postback)
+        app.router.add_get(DIRECT_PATH, document)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            return await greek_parliament.download([31], base_url=f'http://127.0.0.1:{port}', data_path=data_path,
+                                                   concurrency=2)
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(download())
+
+
+def test_parse_listing():
+    form_fields, links = greek_parliament.parse_listing(LISTING, 'https://www.hellenicparliament.gr/en/Praktika')
+    assert sorted(form_fields) == ['__EVENTVALIDATION', '__VIEWSTATE', '__VIEWSTATEGENERATOR']
+    assert links[0] == {'url': f'https://www.hellenicparliament.gr{DIRECT_PATH}', 'title': 'es20190312.docx'}
+    assert links[1] == {'postback': (POSTBACK_TARGET.format(2), ''), 'title': 'Συνεδρίαση 13/03/2019'}
+    assert len(links) == 3
+
+
+def test_download_page(tmp_path):
+    requested = []
+    assert run_download(tmp_path, {2: DOCX, 3: ERROR_PAGE}, requested) == {31: False}
+
+    store = get_source_store(tmp_path)
+    country_p = tmp_path.joinpath('national', 'greece')
+    # The title of a postback link is a file name without the slashes of its date, the error page is not stored
+    assert sorted(path.name for path in store.glob(country_p, '*.docx')) == [
+        'es20190312.docx', 'Συνεδρίαση 13_03_2019.docx']
+    assert store.get(country_p.joinpath('Συνεδρίαση 13_03_2019.docx')) == DOCX
+    assert json.loads(country_p.joinpath(greek_parliament.PROGRESS_FILE).read_text()) == []
+
+    # The next run only requests the documents that are missing and records the complete page
+    requested.clear()
+    assert run_download(tmp_path, {2: DOCX, 3: DOCX}, requested) == {31: True}
+    assert ('GET', DIRECT_PATH) not in requested
+    assert store.get(country_p.joinpath('Συνεδρίαση 14_03_2019.docx')) == DOCX
+    assert json.loads(country_p.joinpath(greek_parliament.PROGRESS_FILE).read_text()) == [31]
+    # Nothing is written to the global store
+    assert not get_source_store().contains(country_p.joinpath('Συνεδρίαση 13_03_2019.docx'))
@@ -0,0 +1,53 @@
+from scrapy import Request, Spider
+from scrapy.http import Response
+from scrapy.utils.test import get_crawler
+
+from eia_crawling.middlewares import SmartRetryMiddleware, RETRY_AT
+
+SETTINGS = {
+    'SMART_RETRY_ENABLED': True,
+    'SMART_RETRY_POLICIES': {'404': 0, '408': 5, '429': 5, '4xx': 0, '5xx': 5, 'exception': 3},
+    'CIRCUIT_BREAKER_THRESHOLD': 5,
+    'CIRCUIT_BREAKER_COOLDOWN': 300,
+}
+
+
+def get_middleware(tmp_path, **settings):
+    crawler = get_crawler(Spider, dict(SETTINGS, **settings))
+    crawler.stats.open_spider(None)
+    return SmartRetryMiddleware(crawler, data_path=tmp_path), Spider('test')
+
+
+def fetch(middleware, spider, status: int, path: str = '/document'):
+    request = Request(f'https://www.example.org{path}')
+    return middleware.process_response(request, Response(request.url, status=status, request=request), spider)
+
+
+def test_permanent_client_errors_do_not_open_the_circuit(tmp_path):
+    middleware, spider = get_middleware(tmp_path)
+    for i in range(20):
+        for status in (404, 410):
+            response = fetch(middleware, spider, status, f'/missing/{i}')
+            # Passed to the spider without a retry
+            assert isinstance(response, Response) and response.status == status
+    assert middleware.open_until == {}
+    assert middleware.failed == []
+
+
+def test_client_errors_do_not_reset_the_failures(tmp_path):
+    middleware, spider = get_middleware(tmp_path)
+    for _ in range(4):
+        assert RETRY_AT in fetch(middleware, spider, 503).meta
+        fetch(middleware, spider, 404)
+    assert middleware.open_until == {}
+    # The fifth consecutive server error opens the circuit
+    fetch(middleware, spider, 503)
+    assert 'www.example.org' in middleware.open_until
+
+
+def test_overload_opens_the_circuit_without_retries(tmp_path):
+    middleware, spider = get_middleware(tmp_path)
+    spider.smart_retry_policies = {'429': 0}
+    for _ in range(5):
+        assert fetch(middleware, spider, 429).status == 429
+    assert 'www.example.org' in middleware.open_until
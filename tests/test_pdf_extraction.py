@@ -0,0 +1,35 @@
+import pathlib
+
+from eia_crawling.parsing import pdf_extraction
+
+FIXTURE = pathlib.Path(__file__).absolute().parent.joinpath('fixtures', 'belgian_plenary.pdf')
+
+
+def cache_files(cache_p: pathlib.Path) -> list:
+    return sorted(path.name[len(path.name.split('.')[0]):] for path in cache_p.rglob('*') if path.is_file())
+
+
+def test_lines_are_streamed_through_the_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv(pdf_extraction.PDF_CACHE_DIR_ENV, str(tmp_path))
+    expected = list(pdf_extraction.iter_pdf_lines(FIXTURE))
+    assert expected
+
+    # A partially consumed extraction is not cached
+    lines = pdf_extraction.iter_pdfminer_lines(FIXTURE)
+    next(lines)
+    lines.close()
+    assert cache_files(tmp_path) == []
+
+    assert list(pdf_extraction.iter_pdfminer_lines(FIXTURE)) == expected
+    assert cache_files(tmp_path) == ['.jsonl.zst']
+
+    # Read from the cache without pdfminer
+    monkeypatch.setattr(pdf_extraction, 'iter_pdf_lines', None)
+    assert list(pdf_extraction.iter_pdfminer_lines(FIXTURE)) == expected
+
+
+def test_lines_without_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv(pdf_extraction.PDF_CACHE_DIR_ENV, str(tmp_path))
+    monkeypatch.setenv(pdf_extraction.PDF_CACHE_ENV, '0')
+    assert list(pdf_extraction.iter_pdfminer_lines(FIXTURE)) == list(pdf_extraction.iter_pdf_lines(FIXTURE))
+    assert cache_files(tmp_path) == []
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from eia_crawling.parsing.row_sinks import ParquetRowSink, is_integer
+
+pq = pytest.importorskip('pyarrow.parquet')
+
+FIELDNAMES = ['date', 'speechnumber', 'paragraphnumber', 'text']
+
+
+def write_parquet(path, rows: list, batch_rows: int = 2):
+    sink = ParquetRowSink(path, FIELDNAMES, batch_rows=batch_rows)
+    for row in rows:
+        sink.write(row)
+    sink.close()
+    return pq.read_table(path.with_suffix('.parquet'))
+
+
+def test_is_integer():
+    assert all(is_integer(value) for value in [None, '', 3, np.int64(3), 3.0, np.float64(4), float('nan'), ' -2 '])
+    assert not any(is_integer(value) for value in ['12a', 1.5, True])
+
+
+def test_integer_columns(tmp_path):
+    rows = [{'date': 'd', 'speechnumber': np.int64(1), 'paragraphnumber': 1.0, 'text': 'a'},
+            {'date': 'd', 'speechnumber': '2', 'paragraphnumber': float('nan'), 'text': float('nan')},
+            {'date': 'd', 'speechnumber': 3, 'paragraphnumber': np.float64(3), 'text': 'c'}]
+    table = write_parquet(tmp_path.joinpath('session_parsed.csv'), rows)
+    assert str(table.schema.field('speechnumber').type) == 'int64'
+    assert table.column('speechnumber').to_pylist() == [1, 2, 3]
+    assert table.column('paragraphnumber').to_pylist() == [1, None, 3]
+    assert table.column('text').to_pylist() == ['a', None, 'c']
+
+
+def test_non_integral_values_in_a_later_batch(tmp_path):
+    rows = [{'date': 'd', 'speechnumber': 1, 'paragraphnumber': 1, 'text': 'a'},
+            {'date': 'd', 'speechnumber': 2, 'paragraphnumber': 2, 'text': 'b'},
+            {'date': 'd', 'speechnumber': '12a', 'paragraphnumber': 3.0, 'text': 'c'}]
+    table = write_parquet(tmp_path.joinpath('session_parsed.csv'), rows)
+    assert str(table.schema.field('speechnumber').type) == 'string'
+    assert table.column('speechnumber').to_pylist() == ['1', '2', '12a']
+    assert table.column('paragraphnumber').to_pylist() == [1, 2, 3]
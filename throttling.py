@@ -0,0 +1,171 @@
+# Per-domain adaptive throttling
+#
+# Replaces the single global DOWNLOAD_DELAY by a throttling profile per parliament site (config/throttling.json).
+# The extension works on Scrapy's downloader slots, like the built-in AutoThrottle extension:
+# See: https://docs.scrapy.org/en/latest/topics/autothrottle.html
+
+import pathlib
+import json
+import time
+import datetime
+from urllib.parse import urlparse
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+from eia_crawling.spiders.source_store import DATA
+
+ROOT = pathlib.Path(__file__).absolute().parent
+
+# Define string constants
+CONFIG = 'config'
+PROFILES_FILE = 'throttling.json'
+DEFAULT = 'default'
+REPORTS = 'reports'
+
+# Status codes that make the controller back off
+BACKOFF_HTTP_CODES = {429, 500, 502, 503, 504}
+
+
+def load_throttle_profiles(path: pathlib.Path = None) -> dict:
+    """Read the throttling profiles (domain -> profile), the 'default' profile is used for all other domains."""
+    if path is None:
+        path = ROOT.joinpath(CONFIG, PROFILES_FILE)
+    with open(path) as f:
+        return json.load(f)
+
+
+class DomainThrottleState:
+    """Throttling parameters and throughput counters of a single domain."""
+
+    def __init__(self, profile: dict) -> None:
+        self.profile = profile
+        self.delay = profile['start_delay']
+        self.concurrency = profile['start_concurrency']
+        self.requests = 0
+        self.backoffs = 0
+        self.bytes = 0
+        self.latency_sum = 0.0
+        self.first_seen = None
+        self.last_seen = None
+
+    def record(self, latency: float, size: int) -> None:
+        now = time.time()
+        if self.first_seen is None:
+            # The first response arrives one latency after the first request was sent
+            self.first_seen = now - latency
+        self.last_seen = now
+        self.requests += 1
+        self.bytes += size
+        self.latency_sum += latency
+
+    def adapt(self, latency: float, status: int) -> None:
+        """
+        Additive increase/multiplicative decrease:
+        - 429/5xx: double the delay and halve the concurrency
+        - latency above target: increase the delay by 25% and decrease the concurrency by one
+        - latency at or below target: decrease the delay by 20% and, once the delay is at its minimum,
+          increase the concurrency by one
+        """
+        profile = self.profile
+        if status in BACKOFF_HTTP_CODES:
+            self.backoffs += 1
+            self.delay = min(profile['max_delay'], max(self.delay * 2, profile['start_delay']))
+            self.concurrency = max(1, self.concurrency // 2)
+        elif latency > profile['target_latency']:
+            self.delay = min(profile['max_delay'], self.delay * 1.25)
+            self.concurrency = max(1, self.concurrency - 1)
+        else:
+            if self.delay <= profile['min_delay']:
+                self.concurrency = min(profile['max_concurrency'], self.concurrency + 1)
+            self.delay = max(profile['min_delay'], self.delay * 0.8)
+
+    def report(self, baseline_delay: float) -> dict:
+        elapsed = (self.last_seen - self.first_seen) if self.requests else 0.0
+        # With a fixed delay the requests would have been sent one after another, one delay apart
+        baseline_elapsed = self.requests * baseline_delay
+        return {
+            'requests': self.requests,
+            'backoffs': self.backoffs,
+            'bytes': self.bytes,
+            'mean_latency': round(self.latency_sum / self.requests, 3) if self.requests else None,
+            'elapsed_seconds': round(elapsed, 1),
+            'requests_per_minute': round(self.requests / elapsed * 60, 1) if elapsed else None,
+            'baseline_elapsed_seconds': round(baseline_elapsed, 1),
+            'gain': round(baseline_elapsed / elapsed, 2) if elapsed else None,
+            'final_delay': round(self.delay, 3),
+            'final_concurrency': self.concurrency,
+        }
+
+
+class AdaptiveThrottle:
+    """
+    Latency driven throttling per domain.
+
+    Each downloader slot starts with the delay/concurrency of its profile. After every response the controller
+    raises the concurrency while latencies stay below the profile's target latency and backs off on 429/5xx.
+    When the spider closes, a throughput report per domain is logged and written to <data>/reports.
+    """
+
+    def __init__(self, crawler, profiles: dict) -> None:
+        self.crawler = crawler
+        self.profiles = profiles
+        self.baseline_delay = crawler.settings.getfloat('DOWNLOAD_DELAY')
+        self.domains = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('ADAPTIVE_THROTTLE_ENABLED'):
+            raise NotConfigured
+        profiles_path = crawler.settings.get('ADAPTIVE_THROTTLE_PROFILES')
+        profiles = load_throttle_profiles(pathlib.Path(profiles_path) if profiles_path else None)
+        s = cls(crawler, profiles)
+        crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(s.request_reached_downloader, signal=signals.request_reached_downloader)
+        crawler.signals.connect(s.response_received, signal=signals.response_received)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def spider_opened(self, spider):
+        # Spiders may override single domains with a throttle_profiles attribute
+        self.profiles = dict(self.profiles, **getattr(spider, 'throttle_profiles', {}))
+
+    def request_reached_downloader(self, request, spider):
+        slot = self._get_slot(request)
+        if slot is None:
+            return
+        state = self._get_state(request)
+        # Apply the profile to new slots (Scrapy creates them with the global DOWNLOAD_DELAY)
+        slot.delay = state.delay
+        slot.concurrency = state.concurrency
+
+    def response_received(self, response, request, spider):
+        latency = request.meta.get('download_latency')
+        slot = self._get_slot(request)
+        if latency is None or slot is None:
+            return
+        state = self._get_state(request)
+        state.record(latency, len(response.body))
+        state.adapt(latency, response.status)
+        slot.delay = state.delay
+        slot.concurrency = state.concurrency
+
+    def spider_closed(self, spider):
+        report = {domain: state.report(self.baseline_delay) for domain, state in self.domains.items()}
+        for domain, domain_report in report.items():
+            spider.logger.info(f'Throughput {spider.name} {domain}: {domain_report}')
+
+        path = DATA.joinpath(REPORTS, f'throughput_{spider.name}_{datetime.datetime.now().strftime("%Y%m%d_%H%M%S")}.json')
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({'spider': spider.name, 'baseline_delay': self.baseline_delay, 'domains': report}, file, indent=2)
+
+    def _get_slot(self, request):
+        key = request.meta.get('download_slot')
+        return self.crawler.engine.downloader.slots.get(key)
+
+    def _get_state(self, request) -> DomainThrottleState:
+        domain = urlparse(request.url).hostname or ''
+        if domain not in self.domains:
+            profile = self.profiles.get(domain, self.profiles[DEFAULT])
+            self.domains[domain] = DomainThrottleState(profile)
+        return self.domains[domain]